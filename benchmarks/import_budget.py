@@ -0,0 +1,76 @@
+"""
+Import-time budget check for short-lived batch jobs.
+
+Each module is imported in fresh interpreters, and the check fails when the median import time
+exceeds its budget, or when the import pulls in a heavy optional dependency (e.g. matplotlib,
+which is only needed for plotting).
+
+Usage:
+    python benchmarks/import_budget.py [--repeat 7] [--scale 1.0]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Median cold-start import time in seconds, including numpy and scipy
+IMPORT_BUDGETS = {'fem.node': 0.3, 'fem.element': 0.3, 'fem.model': 0.8}
+
+# Packages each module must not import
+FORBIDDEN_IMPORTS = {
+    'fem.node': ['matplotlib', 'scipy'],
+    'fem.element': ['matplotlib', 'scipy'],
+    'fem.model': ['matplotlib'],
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'time': elapsed, 'modules': sorted({{name.split('.')[0] for name in sys.modules}})}}))
+"""
+
+
+def measure(module, repeat):
+    """
+    Import a module in fresh interpreters.
+
+    :param module: Name of the module.
+    :param repeat: Number of interpreters.
+    :return: Tuple (median import time in seconds, set of top-level packages loaded).
+    """
+    times, loaded = [], set()
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', PROBE.format(module=module)], cwd=ROOT,
+                                capture_output=True, text=True, check=True)
+        sample = json.loads(result.stdout)
+        times.append(sample['time'])
+        loaded.update(sample['modules'])
+    return statistics.median(times), loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=7, help='interpreters started per module')
+    parser.add_argument('--scale', type=float, default=1.0, help='factor applied to all budgets (slow machines)')
+    args = parser.parse_args()
+
+    failed = False
+    for module, budget in IMPORT_BUDGETS.items():
+        elapsed, loaded = measure(module, args.repeat)
+        budget *= args.scale
+        forbidden = [name for name in FORBIDDEN_IMPORTS.get(module, []) if name in loaded]
+        ok = elapsed <= budget and not forbidden
+        failed |= not ok
+        print(f"{module:12s} {1000 * elapsed:7.1f} ms  (budget {1000 * budget:.0f} ms)"
+              f"{'  imports ' + ', '.join(forbidden) if forbidden else ''}  {'ok' if ok else 'FAILED'}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""
+Scaling benchmark of the solver pipeline.
+
+Rod (Warren truss), beam (portal frame) and CST (cantilever plate) models are generated at
+growing DOF counts, and each phase of Model.solve (assign_global_dof, assemble_stiffness_matrix,
+assemble_force_vector, solve_eqs) is timed together with the Output recovery and plotting.
+Timings are the best of several runs on a freshly generated mesh; the peak memory of each phase
+is measured in a separate run with tracemalloc, so tracing does not slow the timed runs. It counts
+Python and numpy allocations; workspace allocated inside native solvers (e.g. SuperLU) is not traced.
+
+Results are written as JSON and compared against the stored baseline (benchmarks/baseline.json
+by default): a phase regresses when it is slower (or uses more memory) than the baseline by more
+than the threshold. A missing baseline is an error; timings depend on the machine, so store a
+baseline of your own with --save-baseline before comparing changes.
+Everything runs offline, and plots are rendered headless to a temporary directory.
+
+Usage:
+    python benchmarks/scaling.py [--sizes 1000 10000 100000] [--output results.json]
+                                 [--baseline benchmarks/baseline.json] [--save-baseline] [--no-compare]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import scipy
+
+from fem.boundary_condition import nodal_constraints, nodal_loads
+from fem.material import Material
+from fem.mesh_generation import portal_frame, rectangle, warren_truss
+from fem.model import Model
+from fem.property import Beam2D, Membrane, Rod
+
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+PHASES = ['assign_global_dof', 'assemble_stiffness_matrix', 'assemble_force_vector', 'solve_eqs',
+          'compute_nodal_results', 'compute_element_results', 'plot']
+
+# Allowed relative slowdown and memory growth before a phase counts as a regression
+TIME_THRESHOLD = 0.25
+MEMORY_THRESHOLD = 0.10
+
+# Changes below these absolute amounts are noise, whatever the ratio
+MIN_TIME = 0.005  # s
+MIN_MEMORY = 2**20  # bytes
+
+
+def rod_model(n_dof):
+    """
+    Warren truss, pinned at one end and on rollers at the other, loaded on the top chord.
+    """
+    steel = Material('Steel', 210e9, 0.3)
+    rod = Rod('Rod', steel, 1e-3)
+    n_panels = max(1, round((n_dof / 2 - 1) / 2))
+    mesh = warren_truss(n_panels * 2.0, 1.5, n_panels, rod)
+    constraints = (nodal_constraints(mesh.node_sets['left_support'], [0, 1])
+                   + nodal_constraints(mesh.node_sets['right_support'], 1))
+    loads = nodal_loads(mesh.node_sets['top_chord'], 1, -1e4)
+    return Model(mesh=mesh, materials=[steel], properties=[rod], loads=loads, constraints=constraints), 'bars'
+
+
+def beam_model(n_dof):
+    """
+    Square portal frame with fixed column bases and a lateral load at every roof node.
+    """
+    steel = Material('Steel', 210e9, 0.3)
+    beam = Beam2D('Beam', steel, 5e-3, 8e-5)
+    segments = 4
+    # A grid of n x n joints with subdivided members has about 3 (2 n^2 (segments - 1) + n^2) DOFs
+    n = max(2, round(np.sqrt(n_dof / (3 * (2 * segments - 1)))))
+    mesh = portal_frame((6.0, n - 1), (3.5, n - 1), beam, segments=segments)
+    constraints = nodal_constraints(mesh.node_sets['base'], [0, 1, 2])
+    loads = nodal_loads(mesh.node_sets['roof'], 0, 1e4)
+    return Model(mesh=mesh, materials=[steel], properties=[beam], loads=loads, constraints=constraints), 'bars'
+
+
+def cst_model(n_dof):
+    """
+    Cantilever plate, clamped on the left edge and loaded in shear on the right edge.
+    """
+    steel = Material('Steel', 210e9, 0.3)
+    membrane = Membrane('Membrane', steel, 0.01)
+    ny = max(1, round(np.sqrt(n_dof / 4)) - 1)
+    mesh = rectangle(4.0, 2.0, 2 * ny, ny, membrane)
+    constraints = nodal_constraints(mesh.node_sets['left'], [0, 1])
+    right = mesh.node_sets['right']
+    loads = nodal_loads(right, 1, -1e5 / len(right))
+    return Model(mesh=mesh, materials=[steel], properties=[membrane], loads=loads, constraints=constraints), 'area'
+
+
+MODELS = {'rod': rod_model, 'beam': beam_model, 'cst': cst_model}
+
+
+def run_phases(model, kind, plot_path, measure):
+    """
+    Run the solve, recovery and plotting phases of a model in order.
+
+    :param model: Unsolved Model.
+    :param kind: 'bars' or 'area', selecting the plot.
+    :param plot_path: File the plot is saved to.
+    :param measure: Context factory called with each phase name, wrapping the phase.
+    """
+    with measure('assign_global_dof'):
+        model.assign_global_dof()
+    with measure('assemble_stiffness_matrix'):
+        model.assemble_stiffness_matrix()
+    with measure('assemble_force_vector'):
+        model.assemble_displacements_vector()
+        model.assemble_force_vector()
+    with measure('solve_eqs'):
+        model.solve_eqs()
+        output = model._outputs()
+    with measure('compute_nodal_results'):
+        output.compute_nodal_results()
+    with measure('compute_element_results'):
+        output.compute_element_results()
+    with measure('plot'):
+        if kind == 'bars':
+            output.plot2DBars(factor=1, contour='Force', path=plot_path)
+        else:
+            output.plot2DArea(factor=1, contour='Stress', path=plot_path)
+
+
+class Timer:
+    def __init__(self):
+        """
+        Initialize a Timer, which records the wall time of each phase.
+        """
+        self.times = {}
+
+    def __call__(self, phase):
+        self.phase = phase
+        return self
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.times[self.phase] = time.perf_counter() - self.start
+
+
+class MemoryTracer:
+    def __init__(self):
+        """
+        Initialize a MemoryTracer, which records the peak traced allocation of each phase above
+        the memory already in use when the phase starts. numpy reports its buffers to tracemalloc.
+        """
+        self.peaks = {}
+
+    def __call__(self, phase):
+        self.phase = phase
+        return self
+
+    def __enter__(self):
+        tracemalloc.reset_peak()
+        self.start = tracemalloc.get_traced_memory()[0]
+
+    def __exit__(self, *exc):
+        self.peaks[self.phase] = tracemalloc.get_traced_memory()[1] - self.start
+
+
+def benchmark(name, n_dof, repeat, workdir):
+    """
+    Benchmark one model at one size.
+
+    :param name: Key of MODELS.
+    :param n_dof: Target number of DOFs.
+    :param repeat: Number of timed runs; the fastest time of each phase is kept.
+    :param workdir: Directory for the plots.
+    :return: List of result dicts, one per phase.
+    """
+    plot_path = os.path.join(workdir, f'{name}_{n_dof}.png')
+    times = {phase: np.inf for phase in PHASES}
+    for _ in range(repeat):
+        model, kind = MODELS[name](n_dof)
+        timer = Timer()
+        run_phases(model, kind, plot_path, timer)
+        times = {phase: min(times[phase], timer.times[phase]) for phase in PHASES}
+
+    model, kind = MODELS[name](n_dof)
+    tracer = MemoryTracer()
+    tracemalloc.start()
+    try:
+        run_phases(model, kind, plot_path, tracer)
+    finally:
+        tracemalloc.stop()
+
+    return [{'model': name, 'size': n_dof, 'dof': int(model.K.shape[0]), 'elements': model.mesh.n_elements,
+             'phase': phase, 'time': times[phase], 'peak_memory': int(tracer.peaks[phase])} for phase in PHASES]
+
+
+def compare(results, baseline, time_threshold, memory_threshold):
+    """
+    Compare results against a baseline run.
+
+    :param results: Result dicts of this run.
+    :param baseline: Result dicts of the baseline run.
+    :param time_threshold: Allowed relative slowdown.
+    :param memory_threshold: Allowed relative growth of the peak memory.
+    :return: Tuple (list of regression messages, list of model and size labels the baseline lacks).
+    """
+    reference = {(r['model'], r['size'], r['phase']): r for r in baseline}
+    regressions, missing = [], []
+    for result in results:
+        base = reference.get((result['model'], result['size'], result['phase']))
+        if base is None:
+            if f"{result['model']} {result['size']}" not in missing:
+                missing.append(f"{result['model']} {result['size']}")
+            continue
+        label = f"{result['model']} {result['size']} {result['phase']}"
+        if (result['time'] > base['time'] * (1 + time_threshold)
+                and result['time'] - base['time'] > MIN_TIME):
+            regressions.append(f"{label}: time {1000 * base['time']:.1f} -> {1000 * result['time']:.1f} ms")
+        if (result['peak_memory'] > base['peak_memory'] * (1 + memory_threshold)
+                and result['peak_memory'] - base['peak_memory'] > MIN_MEMORY):
+            regressions.append(f"{label}: peak memory {base['peak_memory'] / 2**20:.1f} -> "
+                               f"{result['peak_memory'] / 2**20:.1f} MiB")
+    return regressions, missing
+
+
+def environment():
+    """
+    Describe the machine and library versions, stored with the results.
+    """
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'scipy': scipy.__version__,
+            'platform': platform.platform(), 'processor': platform.processor() or platform.machine(),
+            'cpus': os.cpu_count(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='target DOF counts')
+    parser.add_argument('--models', nargs='+', choices=list(MODELS), default=list(MODELS), help='models to run')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per model and size')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON file to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--no-compare', action='store_true', help='only measure, without a baseline')
+    parser.add_argument('--time-threshold', type=float, default=TIME_THRESHOLD, help='allowed relative slowdown')
+    parser.add_argument('--memory-threshold', type=float, default=MEMORY_THRESHOLD,
+                        help='allowed relative growth of the peak memory')
+    args = parser.parse_args()
+
+    import fem.plotting  # Keep the matplotlib import out of the first plot timing
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.models:
+            for n_dof in args.sizes:
+                rows = benchmark(name, n_dof, args.repeat, workdir)
+                results += rows
+                print(f"{name:4s} {rows[0]['dof']:8d} DOF  " + '  '.join(
+                    f"{row['phase']} {1000 * row['time']:.1f} ms / {row['peak_memory'] / 2**20:.1f} MiB" for row in rows))
+
+    report = {'environment': environment(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=1)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=1)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if args.no_compare:
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"ERROR no baseline at {args.baseline}; run with --save-baseline to store one, "
+              f"or with --no-compare to skip the comparison.", file=sys.stderr)
+        return 2
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    regressions, missing = compare(results, baseline['results'], args.time_threshold, args.memory_threshold)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    if missing:
+        print(f"WARNING {len(missing)} results have no baseline entry: {', '.join(missing)}", file=sys.stderr)
+    print(f"{len(regressions)} regressions against the baseline of {baseline['environment']['date']}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Throughput benchmark of the local solve service.
+
+A cantilever plate of CST elements is solved with a new load per request, three ways: in
+process from scratch with Model.solve (what every short-lived script pays, interpreter startup
+aside), through a SolveServer on a Unix socket with a new client connection per request, and
+with several client threads sending requests at once. After the first request the server holds
+the factorized system, so the others only cost the transfer of the loads, a back-substitution
+and the transfer of the solution.
+
+Usage:
+    python benchmarks/service_throughput.py [--sizes 10000 100000] [--requests 50] [--clients 4]
+                                            [--workers 2] [--output results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from benchmarks.scaling import cst_model, environment
+from fem.boundary_condition import nodal_loads
+from fem.service import SolveClient, SolveServer
+
+DEFAULT_SIZES = [10000, 100000]
+
+
+def loaded_model(n_dof, request):
+    """
+    Cantilever plate with a shear load that changes with the request number.
+    """
+    model, _ = cst_model(n_dof)
+    right = model.mesh.node_sets['right']
+    model.loads = nodal_loads(right, 1, -1e5 * (1 + request % 7) / len(right))
+    return model
+
+
+def solve_remote(path, n_dof, request):
+    """
+    Solve one request on the server with its own connection, as a separate script would.
+
+    :return: Tuple (wall time, whether the server had the system cached).
+    """
+    model = loaded_model(n_dof, request)
+    start = time.perf_counter()
+    with SolveClient(path) as client:
+        client.solve(model)
+    return time.perf_counter() - start, client.last_response['cached']
+
+
+def benchmark(path, n_dof, requests, clients):
+    """
+    Benchmark one model size.
+
+    :param path: Socket path of a running server.
+    :param n_dof: Target number of DOFs.
+    :param requests: Number of requests of each kind.
+    :param clients: Number of concurrent client threads.
+    :return: Result dict.
+    """
+    local = []
+    for request in range(min(requests, 5)):
+        model = loaded_model(n_dof, request)
+        start = time.perf_counter()
+        model.solve()
+        local.append(time.perf_counter() - start)
+
+    first, _ = solve_remote(path, n_dof, 0)
+    repeated = [solve_remote(path, n_dof, request) for request in range(1, requests + 1)]
+    assert all(cached for _, cached in repeated)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        list(pool.map(lambda request: solve_remote(path, n_dof, request), range(requests)))
+    concurrent = time.perf_counter() - start
+
+    latencies = np.array([latency for latency, _ in repeated])
+    return {'size': n_dof, 'dof': int(loaded_model(n_dof, 0).mesh.node_dof.sum()), 'local_solve': float(np.median(local)),
+            'first_request': first, 'repeat_median': float(np.median(latencies)),
+            'repeat_p95': float(np.percentile(latencies, 95)), 'serial_throughput': float(1 / latencies.mean()),
+            'concurrent_throughput': requests / concurrent, 'clients': clients}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='target DOF counts')
+    parser.add_argument('--requests', type=int, default=50, help='requests of each kind per size')
+    parser.add_argument('--clients', type=int, default=4, help='concurrent client threads')
+    parser.add_argument('--workers', type=int, help='server worker processes (default is the number of CPUs)')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'fem.sock')
+        server = SolveServer(path, workers=args.workers)
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not os.path.exists(path):
+            time.sleep(0.01)
+
+        results = []
+        try:
+            for n_dof in args.sizes:
+                result = benchmark(path, n_dof, args.requests, args.clients)
+                results.append(result)
+                print(f"{result['dof']:8d} DOF  local solve {1000 * result['local_solve']:.1f} ms  "
+                      f"first request {1000 * result['first_request']:.1f} ms  "
+                      f"repeat {1000 * result['repeat_median']:.1f} ms (p95 {1000 * result['repeat_p95']:.1f} ms)  "
+                      f"{result['serial_throughput']:.1f} req/s serial, "
+                      f"{result['concurrent_throughput']:.1f} req/s with {args.clients} clients")
+        finally:
+            with SolveClient(path) as client:
+                client.shutdown()
+            thread.join()
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'environment': environment(), 'results': results}, file, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
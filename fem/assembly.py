@@ -0,0 +1,195 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import scipy.sparse as sp
+
+MAX_COLORS = 256  # Beyond this, elements at saturated nodes are left uncolored and assembled serially
+WORD = 64  # Colors used at a node are tracked as bits of uint64 words, added as needed
+
+
+def color_elements(connectivities, n_nodes, seed=0, max_colors=MAX_COLORS):
+    """
+    Color the elements of a mesh so that no two elements of the same color share a node, with
+    the Jones-Plassmann algorithm: in each round, every uncolored element whose random priority
+    is the highest among the uncolored elements at all of its nodes takes the smallest color
+    not yet used at its nodes. The elements colored in a round never share a node, so each
+    round is one vectorized pass and about log(n) rounds are needed.
+
+    Nodes shared by many elements (hubs of fans and cable nets) need as many colors as
+    elements. Once max_colors are used at a node, or at the nodes of an element, its remaining
+    elements get color -1; they are assembled serially after the colored ones.
+
+    :param connectivities: List of connectivity arrays, one per element set, shape (N_i, k_i).
+    :param n_nodes: Number of nodes of the mesh.
+    :param seed: Seed of the priorities, so that the coloring is reproducible.
+    :param max_colors: Maximum number of colors, a multiple of 64.
+    :return: List of color arrays, one per element set, shape (N_i,).
+    """
+    sizes = [len(connectivity) for connectivity in connectivities]
+    n = sum(sizes)
+    starts = np.cumsum([0] + sizes[:-1])
+    element = np.concatenate([np.repeat(start + np.arange(len(c)), c.shape[1]) for start, c in zip(starts, connectivities)]
+                             or [np.empty(0, dtype=np.int64)])
+    node = np.concatenate([c.ravel() for c in connectivities] or [np.empty(0, dtype=np.int64)])
+
+    priority = np.random.default_rng(seed).permutation(n)
+    colors = np.full(n, -1, dtype=np.int64)
+    max_words = max(1, max_colors // WORD)
+    full = np.iinfo(np.uint64).max
+    used = np.zeros((n_nodes, 1), dtype=np.uint64)  # Bit c of word w is set if color 64 w + c touches the node
+    uncolored = np.ones(n, dtype=bool)
+    while uncolored.any():
+        if used.shape[1] == max_words:
+            # Elements at a node where every color is taken stop competing
+            saturated = (used == full).all(axis=1)
+            uncolored[element[saturated[node]]] = False
+            if not uncolored.any():
+                break
+        active = uncolored[element]
+        best = np.full(n_nodes, -1, dtype=np.int64)
+        np.maximum.at(best, node[active], priority[element[active]])
+        winner = uncolored.copy()
+        winner[element[active & (priority[element] < best[node])]] = False
+
+        entries = winner[element]
+        forbidden = np.zeros((n, used.shape[1]), dtype=np.uint64)
+        np.bitwise_or.at(forbidden, element[entries], used[node[entries]])
+        forbidden = forbidden[winner]
+        available = forbidden != full
+        if not available.any(axis=1).all() and used.shape[1] < max_words:
+            used = np.concatenate([used, np.zeros((n_nodes, 1), dtype=np.uint64)], axis=1)
+            forbidden = np.concatenate([forbidden, np.zeros((len(forbidden), 1), dtype=np.uint64)], axis=1)
+            available = forbidden != full
+        colorable = available.any(axis=1)  # False if the nodes of an element use every color
+        word = available.argmax(axis=1)
+        mask = forbidden[np.arange(len(forbidden)), word]
+        lowest = ~mask & (mask + np.uint64(1))  # Lowest zero bit of the first word with one
+        winners = np.flatnonzero(winner)
+        colors[winners[colorable]] = WORD * word[colorable] + np.log2(lowest[colorable].astype(float)).astype(np.int64)
+        bits = np.zeros((n, used.shape[1]), dtype=np.uint64)
+        bits[winners[colorable], word[colorable]] = lowest[colorable]
+        np.bitwise_or.at(used, node[entries], bits[element[entries]])
+        uncolored &= ~winner
+    return np.split(colors, starts[1:])
+
+
+class AssemblyPlan:
+    def __init__(self, mesh, size, dense=False, seed=0, chunk_size=4096):
+        """
+        Initialize an AssemblyPlan, the symbolic part of the stiffness assembly of a mesh: the
+        CSR sparsity pattern of the global matrix, the position of every element matrix entry
+        in its data array, and the elements grouped by color into batches.
+
+        The elements of one color share no node, hence no matrix entry, so their batches scatter
+        into disjoint positions and can run on any number of threads without locks. Colors are
+        processed in order, so every entry receives its contributions in the same order whatever
+        the number of threads, and the result is bitwise identical to a serial assembly.
+
+        :param mesh: Mesh with assigned global DOFs.
+        :param size: Total number of global DOFs.
+        :param dense: If True, plan for a dense (size, size) array instead of a CSR matrix.
+        :param seed: Seed of the element coloring.
+        :param chunk_size: Maximum number of elements per batch.
+        """
+        self.mesh = mesh
+        self.size = size
+        self.dense = dense
+        self.element_sets = list(mesh.element_sets)
+        self.lengths = [len(element_set) for element_set in self.element_sets]
+        self.global_dof = mesh.global_dof.copy()
+
+        keys = []
+        for element_set in self.element_sets:
+            dofs = mesh.element_dofs(element_set)
+            keys.append((dofs[:, :, None] * size + dofs[:, None, :]).reshape(len(dofs), -1))
+        if dense:
+            positions = keys
+            self.indices = self.indptr = None
+            self.nnz = size * size
+        else:
+            unique, inverse = _unique_inverse(np.concatenate([k.ravel() for k in keys] or [np.empty(0, dtype=np.int64)]))
+            index_dtype = np.int32 if max(size, len(unique)) < 2 ** 31 else np.int64
+            self.indices = (unique % size).astype(index_dtype)
+            self.indptr = np.concatenate([[0], np.cumsum(np.bincount(unique // size, minlength=size))]).astype(index_dtype)
+            self.nnz = len(unique)
+            positions = np.split(inverse, np.cumsum([k.size for k in keys])[:-1])
+            positions = [p.reshape(k.shape) for p, k in zip(positions, keys)]
+
+        colors = color_elements([element_set.connectivity for element_set in self.element_sets], mesh.n_nodes, seed)
+        self.n_colors = max((int(c.max()) + 1 for c in colors if len(c)), default=0)
+        self.batches = [[] for _ in range(self.n_colors)]  # Per color: (set number, elements, positions)
+        self.serial = []  # Batches of the uncolored elements, whose positions may repeat
+        for number, (set_colors, set_positions) in enumerate(zip(colors, positions)):
+            order = np.argsort(set_colors, kind='stable')
+            bounds = np.searchsorted(set_colors[order], np.arange(-1, self.n_colors + 1))
+            for color in range(-1, self.n_colors):
+                elements = order[bounds[color + 1]:bounds[color + 2]]
+                for start in range(0, len(elements), chunk_size):
+                    chunk = elements[start:start + chunk_size]
+                    (self.serial if color < 0 else self.batches[color]).append((number, chunk, set_positions[chunk].ravel()))
+
+    def matches(self, mesh):
+        """
+        Check if the plan is still valid for a mesh (same element sets and DOF numbering).
+        """
+        return (mesh is self.mesh and len(mesh.element_sets) == len(self.element_sets)
+                and all(a is b and len(a) == n for a, b, n in zip(mesh.element_sets, self.element_sets, self.lengths))
+                and np.array_equal(mesh.global_dof, self.global_dof))
+
+    def assemble(self, matrices, workers=1):
+        """
+        Sum element matrices into the global matrix.
+
+        :param matrices: List of batched element matrices in global coordinates, one per element
+                         set of the plan, shape (N_i, k_i, k_i), or (stack, index) pairs of
+                         shared matrices as returned by ElementSet.compact.
+        :param workers: Number of threads scattering the batches of each color.
+        :return: Global matrix, CSR or dense.
+        """
+        data = np.zeros(self.nnz)
+        if workers > 1 and any(len(batches) > 1 for batches in self.batches):
+            with ThreadPoolExecutor(workers) as pool:
+                for batches in self.batches:
+                    # Batches of a color touch disjoint entries; the next color waits for all of them
+                    list(pool.map(lambda batch: _scatter(data, matrices, batch), batches))
+        else:
+            for batches in self.batches:
+                for batch in batches:
+                    _scatter(data, matrices, batch)
+        for batch in self.serial:
+            _scatter(data, matrices, batch, unique=False)
+        if self.dense:
+            return data.reshape(self.size, self.size)
+        return sp.csr_matrix((data, self.indices, self.indptr), shape=(self.size, self.size))
+
+    def __repr__(self):
+        return (f"AssemblyPlan:\n Size = {self.size}\n Stored entries = {self.nnz}\n Colors = {self.n_colors}\n"
+                f" Batches = {sum(len(batches) for batches in self.batches)}\n"
+                f" Serial elements = {sum(len(elements) for _, elements, _ in self.serial)}\n")
+
+
+def _scatter(data, matrices, batch, unique=True):
+    """
+    Add one batch of element matrices to the data array. Positions within a batch of one color
+    are unique, so plain fancy indexing (which runs without the GIL) replaces np.add.at.
+    """
+    number, elements, positions = batch
+    stack, index = matrices[number] if isinstance(matrices[number], tuple) else (matrices[number], None)
+    values = (stack[elements] if index is None else stack[index[elements]]).ravel()
+    if unique:
+        data[positions] += values
+    else:
+        np.add.at(data, positions, values)
+
+
+def _unique_inverse(keys):
+    """
+    Sorted unique values of an integer array and the index of each value among them, like
+    np.unique(keys, return_inverse=True) but with an unstable (several times faster) sort.
+    """
+    order = np.argsort(keys)
+    ordered = keys[order]
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = ordered[1:] != ordered[:-1]
+    inverse = np.empty(len(keys), dtype=np.int64)
+    inverse[order] = np.cumsum(first) - 1
+    return ordered[first], inverse
@@ -1,5 +1,5 @@
-constraint_count = 0
-load_count = 0
+import numpy as np
+
 
 class NodalConstraint:
     def __init__(self, node, dof, value):
@@ -10,9 +10,7 @@ class NodalConstraint:
         :param dof: The degree of freedom at which the constraint is applied.
         :param value: The value of the constraint (e.g., displacement or rotation).
         """
-        global constraint_count
-        self.id = constraint_count
-        constraint_count = constraint_count + 1
+        self.id = None  # Assigned by the Model
         self.node = node
         self.dof = dof
         self.value = value
@@ -22,20 +20,81 @@ class NodalConstraint:
 
 
 class NodalLoad:
-    def __init__(self, node, dof, value):
+    def __init__(self, node, dof, value, time_function=None):
         """
         Initialize a NodalLoad.
         
         :param node: The Node object where the load is applied.
         :param dof: The degree of freedom at which the load is applied.
         :param value: The magnitude of the load.
+        :param time_function: Optional function of time scaling the load in a transient analysis,
+                              called with an array of times and returning the factors (e.g.
+                              np.sin or a time_table). Static solves apply the value unscaled.
         """
-        global load_count
-        self.id = load_count
-        load_count = load_count + 1
+        self.id = None  # Assigned by the Model or LoadCase
         self.node = node
         self.dof = dof
         self.value = value
+        self.time_function = time_function
 
     def __repr__(self):
         return f"NodalLoad:\n ID = {self.id}\n Node = {self.node}\n DOF = {self.dof}\n Value = {self.value}"
+
+
+class LoadCase:
+    def __init__(self, name, loads):
+        """
+        Initialize a LoadCase.
+
+        :param name: Name of the load case.
+        :param loads: List of NodalLoad objects applied together in this case.
+        """
+        self.name = name
+        self.loads = loads
+        for i, load in enumerate(loads):
+            load.id = i
+
+    def __repr__(self):
+        return f"LoadCase:\n Name = {self.name}\n Loads = {[load.id for load in self.loads]}"
+
+
+def nodal_constraints(nodes, dofs, value=0.0):
+    """
+    Constrain some DOFs of a set of nodes, e.g. a node set of a generated mesh.
+
+    :param nodes: Node indices.
+    :param dofs: DOF or list of DOFs constrained at every node.
+    :param value: Prescribed displacement.
+    :return: List of NodalConstraint objects.
+    """
+    dofs = [dofs] if np.ndim(dofs) == 0 else dofs
+    return [NodalConstraint(int(node), int(dof), value) for node in np.ravel(nodes) for dof in dofs]
+
+
+def nodal_loads(nodes, dof, value, time_function=None):
+    """
+    Load one DOF of a set of nodes, e.g. a node set of a generated mesh.
+
+    :param nodes: Node indices.
+    :param dof: Loaded DOF.
+    :param value: Load at every node, or array with one load per node.
+    :param time_function: Optional time function shared by all the loads (see NodalLoad).
+    :return: List of NodalLoad objects.
+    """
+    nodes = np.ravel(nodes)
+    values = np.broadcast_to(np.asarray(value, dtype=float), nodes.shape)
+    return [NodalLoad(int(node), dof, float(v), time_function) for node, v in zip(nodes, values)]
+
+
+def time_table(times, factors):
+    """
+    Piecewise linear time function through tabulated points, constant beyond the first and
+    last ones, e.g. time_table([0, 0.1], [0, 1]) for a load ramped up in 0.1 s and then held.
+
+    :param times: Increasing times.
+    :param factors: Load factor at each time.
+    :return: Function of an array of times returning the interpolated factors.
+    """
+    times = np.asarray(times, dtype=float)
+    factors = np.asarray(factors, dtype=float)
+    return lambda t: np.interp(t, times, factors)
@@ -1,7 +1,9 @@
 import numpy as np
+from fem.element_set import (ElementRodSet, ElementBeamSet, ElementCSTSet, ElementQ4Set, ElementQ8Set, ElementT6Set,
+                             ElementSuperSet)
 
 class Element:
-    element_count = 0
+    set_class = None
 
     def __init__(self, nodes, property):
         """
@@ -10,10 +12,94 @@ class Element:
         :param nodes: List of nodes that define the element.
         :param property: Property of the element, which includes material properties.
         """
-        self.id = Element.element_count
-        Element.element_count += 1
         self.nodes = nodes
         self.property = property
+        self.element_set = None
+        self.set_index = None
+
+    @classmethod
+    def view(cls, element_set, index):
+        """
+        Create an element view over one entry of a mesh element set, without building
+        the element from node objects.
+
+        :param element_set: ElementSet belonging to a Mesh.
+        :param index: Position of the element in the set.
+        """
+        element = cls.__new__(cls)
+        element.nodes = [element_set.mesh.node(i) for i in element_set.connectivity[index]]
+        element.property = element_set.properties[element_set.property_index[index]]
+        element.bind(element_set, index)
+        return element
+
+    @property
+    def id(self):
+        """
+        Element ID within its model (None until the element is part of a model mesh).
+        """
+        if self.element_set is None or self.element_set.ids is None:
+            return None
+        return int(self.element_set.ids[self.set_index])
+
+    def bind(self, element_set, index):
+        """
+        Make the element a view over one entry of an element set.
+
+        :param element_set: ElementSet holding the batched element arrays.
+        :param index: Position of this element in the set.
+        """
+        self.element_set = element_set
+        self.set_index = index
+
+    def _set_value(self, name):
+        """
+        Read this element's entry of a batched element set array.
+        Elements that are not part of a set yet are wrapped in a set of their own.
+
+        :param name: Name of the element set array.
+        """
+        if self.element_set is None:
+            self.set_class.from_elements([self])
+        return self.element_set.value(name, self.set_index)
+
+    def __getattr__(self, name):
+        # Results of the last Output.compute_element_results of the model (e.g. element.force)
+        element_set = self.__dict__.get('element_set')
+        mesh = getattr(element_set, 'mesh', None)
+        if mesh is not None and mesh.element_results is not None and name in dict(element_set.result_fields):
+            return mesh.element_results[name][self.id]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    @property
+    def group(self):
+        """
+        Key of the element set this element belongs to in a mesh built from objects.
+        """
+        return self.set_class
+
+    @property
+    def T(self):
+        return self._set_value('T')
+
+    @property
+    def K(self):
+        return self._set_value('K')
+
+    @property
+    def K_global_coord(self):
+        return self._set_value('K_global_coord')
+
+    def calculate_local_results(self):
+        """
+        Calculate the local results of the element from the displacements of its nodes.
+        Each result of the element set (e.g. force) becomes an attribute of the element.
+        """
+        if self.element_set is None:
+            self.set_class.from_elements([self])
+        n = self.element_set.dof_per_node
+        u = np.concatenate([node.displacement[:n] for node in self.nodes])
+        for name, value in self.element_set.local_results(u[None], [self.set_index]).items():
+            setattr(self, name, value[0])
 
     def rotate_K(self):
         """
@@ -34,27 +120,31 @@ class Element2DLine(Element):
         :param property: Property of the element, which includes material properties.
         """
         super().__init__(nodes, property)
-        self.length = self.calculate_length()
-        self.theta = self.calculate_rotation()
+
+    @property
+    def length(self):
+        return self._set_value('length')
+
+    @property
+    def theta(self):
+        return self._set_value('theta')
 
     def calculate_length(self):
         """
         Calculate the length of the element (assuming 2D for simplicity).
         """
-        x0, y0 = self.nodes[0].position
-        x1, y1 = self.nodes[1].position
-        return np.sqrt((x1 - x0) ** 2 + (y1 - y0) ** 2)
+        return self.length
 
     def calculate_rotation(self):
         """
         Calculate the rotation angle of the element (assuming 2D for simplicity).
         """
-        x0, y0 = self.nodes[0].position
-        x1, y1 = self.nodes[1].position
-        return np.arctan2(y1 - y0, x1 - x0)
+        return self.theta
 
 
 class ElementRod(Element2DLine):
+    set_class = ElementRodSet
+
     def __init__(self, nodes, property):
         """
         Initialize a 2D Rod Element.
@@ -65,51 +155,23 @@ class ElementRod(Element2DLine):
         super().__init__(nodes, property)
         for node in nodes:
             node.assign_dof(2)
-        self.T = self.calculate_rotation_matrix()
-        self.K = self.calculate_stiffness_matrix()
-        self.K_global_coord = self.rotate_K()
 
     def calculate_rotation_matrix(self):
         """
         Calculate the transformation matrix for the rod element.
         """
-        cos_theta = np.cos(self.theta)
-        sin_theta = np.sin(self.theta)
-        return np.array(
-            [[cos_theta, sin_theta, 0, 0],
-            [0, 0, cos_theta, sin_theta]]
-        )
+        return self.T
 
     def calculate_stiffness_matrix(self):
         """
         Calculate the local stiffness matrix for the rod element.
         """
-        E = self.property.material.youngs_modulus
-        L = self.length
-        A = self.property.area
-
-        k = (E * A) / L
-
-        # 2x2 stiffness matrix for a 1D rod element
-        return k * np.array(
-            [[1, -1],
-            [-1, 1]]
-        )
-
-    def calculate_local_results(self):
-        """
-        Calculate the local deformation and force results for the rod element.
-        """
-        q_global = np.array(self.nodes[0].displacement + self.nodes[1].displacement)
-        q_local = self.T @ q_global
-        E = self.property.material.youngs_modulus
-        A = self.property.area
-        L = self.length
-        self.deformation = (q_local[1] - q_local[0])
-        self.force = E * A * self.deformation / L
+        return self.K
 
 
 class ElementBeam(Element2DLine):
+    set_class = ElementBeamSet
+
     def __init__(self, nodes, property):
         """
         Initialize a 2D Beam Element.
@@ -120,64 +182,31 @@ class ElementBeam(Element2DLine):
         super().__init__(nodes, property)
         for node in nodes:
             node.assign_dof(3)
-        self.T = self.calculate_rotation_matrix()
-        self.K = self.calculate_stiffness_matrix()
-        self.K_global_coord = self.rotate_K()
 
     def calculate_rotation_matrix(self):
         """
         Calculate the transformation matrix for the beam element.
         """
-        cos_theta = np.cos(self.theta)
-        sin_theta = np.sin(self.theta)
-        return np.array(
-            [[cos_theta, sin_theta, 0, 0, 0, 0],
-            [-sin_theta, cos_theta, 0, 0, 0, 0],
-            [0, 0, 1, 0, 0, 0],
-            [0, 0, 0, cos_theta, sin_theta, 0],
-            [0, 0, 0, -sin_theta, cos_theta, 0],
-            [0, 0, 0, 0, 0, 1]]
-        )
+        return self.T
 
     def calculate_stiffness_matrix(self):
         """
         Calculate the local stiffness matrix for the beam element.
         """
-        E = self.property.material.youngs_modulus
-        L = self.length
-        A = self.property.area
-        Izz = self.property.Izz
-
-        k0 = (E * A) / L
-        k1 = (E * Izz) / L
-        k2 = (E * Izz) / L**2
-        k3 = (E * Izz) / L**3
-
-        # 6x6 stiffness matrix for a beam element
-        return np.array(
-            [[k0, 0, 0, -k0, 0, 0],
-            [0, 12*k3, 6*k2, 0, -12*k3, 6*k2],
-            [0, 6*k2, 4*k1, 0, -6*k2, 2*k1],
-            [-k0, 0, 0, k0, 0, 0],
-            [0, -12*k3, -6*k2, 0, 12*k3, -6*k2],
-            [0, 6*k2, 2*k1, 0, -6*k2, 4*k1]]
-        )
+        return self.K
 
-    def calculate_local_results(self):
+    @property
+    def axialdeform(self):
         """
-        Calculate the local deformation and force results for the beam element.
+        Axial deformation, under its original name.
         """
-        q_global = np.array(self.nodes[0].displacement + self.nodes[1].displacement)
-        q_local = self.T @ q_global
-        self.axialdeform = (q_local[4] - q_local[0])
-        self.transvdeform = None
-        self.axialFmean = None
-        self.bendingSmean = None
-        self.bendingMmean = None
+        return self.deformation
 
 import numpy as np
 
 class ElementCST(Element):
+    set_class = ElementCSTSet
+
     def __init__(self, nodes, property):
         """
         Initialize a Constant Strain Triangle (CST) element.
@@ -188,26 +217,18 @@ class ElementCST(Element):
         super().__init__(nodes, property)
         for node in nodes:
             node.assign_dof(2)  # CST elements typically have 2 degrees of freedom per node
-        self.area = self.calculate_area()
-        self.K_global_coord = self.calculate_stiffness_matrix()
+
+    @property
+    def area(self):
+        return self._set_value('area')
 
     def calculate_area(self):
         """
-        Calculate the area of the triangular element using the determinant method.
+        Calculate the area of the triangular element.
 
         :return: Area of the triangle.
         """
-        x1, y1 = self.nodes[0].position
-        x2, y2 = self.nodes[1].position
-        x3, y3 = self.nodes[2].position
-        
-        # Matrix representation for area calculation
-        area_matrix = np.array([[1, x1, y1],
-                                [1, x2, y2],
-                                [1, x3, y3]])
-        
-        # Determinant of the area matrix divided by 2
-        return np.abs(np.linalg.det(area_matrix)) / 2
+        return self.area
 
     def calculate_stiffness_matrix(self):
         """
@@ -215,33 +236,7 @@ class ElementCST(Element):
 
         :return: Global stiffness matrix for the CST element.
         """
-        x1, y1 = self.nodes[0].position
-        x2, y2 = self.nodes[1].position
-        x3, y3 = self.nodes[2].position
-        A = self.area
-
-        # Strain-displacement matrix (B-matrix)
-        B = (1 / (2 * A)) * np.array([[y2 - y3, 0, y3 - y1, 0, y1 - y2, 0],
-                                      [0, x3 - x2, 0, x1 - x3, 0, x2 - x1],
-                                      [x3 - x2, y2 - y3, x1 - x3, y3 - y1, x2 - x1, y1 - y2]])
-
-        # Material properties (D-matrix)
-        E = self.property.material.youngs_modulus
-        nu = self.property.material.poissons_ratio
-        
-        # Modify for plane strain condition
-        if not self.property.plane_stress:
-            E /= (1 - nu ** 2)
-            nu /= (1 - nu ** 2)
-        
-        # Elasticity matrix (D-matrix)
-        D = (E / (1 - nu ** 2)) * np.array([[1, nu, 0],
-                                            [nu, 1, 0],
-                                            [0, 0, (1 - nu) / 2]])
-
-        # Element stiffness matrix in global coordinates
-        t = self.property.thickness
-        return (A * t) * (B.T @ D @ B)
+        return self.K_global_coord
 
     def __repr__(self):
         """
@@ -249,3 +244,85 @@ class ElementCST(Element):
         """
         return (f"ElementCST:\n ID = {self.id}\n Nodes = {[node.id for node in self.nodes]}\n"
                 f"Area = {self.area:.4f}\n")
+
+
+
+class ElementIsoparametric(Element):
+    def __init__(self, nodes, property):
+        """
+        Initialize an isoparametric membrane element.
+
+        :param nodes: List of nodes in the order of the element's shape functions (corners
+                      counter-clockwise, then midside nodes).
+        :param property: Membrane property of the element.
+        """
+        super().__init__(nodes, property)
+        if len(nodes) != self.set_class.nodes_per_element:
+            raise ValueError(f"{type(self).__name__} needs {self.set_class.nodes_per_element} nodes, got {len(nodes)}.")
+        for node in nodes:
+            node.assign_dof(2)
+
+    @property
+    def area(self):
+        return self._set_value('area')
+
+    def calculate_stiffness_matrix(self):
+        """
+        Calculate the global stiffness matrix of the element by Gauss quadrature.
+        """
+        return self.K_global_coord
+
+    def __repr__(self):
+        return (f"{type(self).__name__}:\n ID = {self.id}\n Nodes = {[node.id for node in self.nodes]}\n"
+                f"Area = {self.area:.4f}\n")
+
+
+class ElementQ4(ElementIsoparametric):
+    set_class = ElementQ4Set  # 4-node bilinear quadrilateral, 2 x 2 Gauss points
+
+
+class ElementQ8(ElementIsoparametric):
+    set_class = ElementQ8Set  # 8-node serendipity quadrilateral, 3 x 3 Gauss points
+
+
+class ElementT6(ElementIsoparametric):
+    set_class = ElementT6Set  # 6-node quadratic triangle, 3-point rule
+
+
+class Superelement(Element):
+    set_class = ElementSuperSet
+
+    def __init__(self, nodes, substructure):
+        """
+        Initialize a Superelement, one placement of a condensed substructure.
+
+        :param nodes: Parent nodes connected to the interface nodes of the substructure, in
+                      the same order; they must be a translated and rotated copy of them.
+        :param substructure: Substructure object, used as the property of the element.
+        """
+        super().__init__(nodes, substructure)
+        if len(nodes) != len(substructure.interface):
+            raise ValueError(f"Substructure '{substructure.name}' has {len(substructure.interface)} interface nodes, got {len(nodes)}.")
+        for node in nodes:
+            node.assign_dof(substructure.dof_per_node)
+
+    @property
+    def group(self):
+        return (self.set_class, id(self.property))  # One element set per substructure
+
+    @property
+    def substructure(self):
+        return self.property
+
+    def recover(self, output):
+        """
+        Recover the interior solution of this superelement from a solved parent model.
+
+        :param output: Output of the parent model.
+        :return: Output of the substructure's model.
+        """
+        return output.substructure_output(self.id)
+
+
+ELEMENT_CLASSES = {element_class.set_class: element_class
+                   for element_class in (ElementRod, ElementBeam, ElementCST, ElementQ4, ElementQ8, ElementT6, Superelement)}
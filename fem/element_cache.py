@@ -0,0 +1,105 @@
+from collections import OrderedDict
+import numpy as np
+
+
+class ElementMatrixCache:
+    def __init__(self, maxsize=4096):
+        """
+        Initialize an ElementMatrixCache, a bounded store of element matrices keyed by element
+        type, property values and normalized geometry, so that congruent elements (same shape,
+        orientation and property, anywhere in any mesh) are computed once. Beyond maxsize
+        entries, the least recently used ones are evicted.
+
+        :param maxsize: Maximum number of distinct elements kept.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    @property
+    def hit_rate(self):
+        """
+        Fraction of the lookups answered from the cache.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key):
+        """
+        :return: Tuple of read-only arrays stored under key, or None.
+        """
+        values = self._entries.get(key)
+        if values is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return values
+
+    def put(self, key, values):
+        """
+        Store the arrays of one element, evicting the least recently used entries if full.
+
+        :param key: Hashable key of the element (see ElementSet.share).
+        :param values: Tuple of arrays, one per array of the element set.
+        :return: The stored read-only copies of the arrays.
+        """
+        values = tuple(_read_only(value) for value in values)
+        self._entries[key] = values
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return values
+
+    def clear(self):
+        self._entries = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return (f"ElementMatrixCache:\n Entries = {len(self)}/{self.maxsize}\n Hits = {self.hits}\n"
+                f" Misses = {self.misses}\n Hit rate = {self.hit_rate:.3f}\n Evictions = {self.evictions}\n")
+
+
+DEFAULT_CACHE = ElementMatrixCache()  # Shared by all element sets unless ElementSet.matrix_cache is replaced
+
+
+def geometry_quantum(coords):
+    """
+    Resolution of the normalized geometry of a set of elements: a power of two about 1e-12
+    times the largest element extent, so that keys are exact integers and elements that
+    differ only by round-off share a key.
+
+    :param coords: Nodal coordinates of the elements, shape (N, nodes, 2).
+    :return: Quantum as a float.
+    """
+    scale = np.abs(coords[:, 1:] - coords[:, :1]).max(initial=0) or 1.0
+    return 2.0 ** (np.floor(np.log2(scale)) - 40)
+
+
+def geometry_keys(coords, property_index, quantum):
+    """
+    Normalized geometry of each element: the vectors from its first node to the others in
+    multiples of quantum, followed by its property index. Translated copies of an element
+    get the same key.
+
+    :param coords: Nodal coordinates of the elements, shape (N, nodes, 2).
+    :param property_index: Property index of each element, shape (N,).
+    :param quantum: Resolution returned by geometry_quantum.
+    :return: Integer array of shape (N, 2 nodes - 1).
+    """
+    edges = (coords[:, 1:] - coords[:, :1]).reshape(len(coords), -1)
+    return np.concatenate([np.round(edges / quantum).astype(np.int64), property_index[:, None]], axis=1)
+
+
+def _read_only(array):
+    array = np.array(array)
+    array.setflags(write=False)
+    return array
@@ -0,0 +1,840 @@
+import numpy as np
+from fem.element_cache import DEFAULT_CACHE, geometry_keys, geometry_quantum
+from utils.int_gauss import gauss_quadrilateral, gauss_triangle
+
+
+class ElementSet:
+    nodes_per_element = None
+    dof_per_node = None
+    arrays = ()  # Names of the per-element arrays computed by update()
+    shared = ()  # Arrays that depend only on the element shape and property, stored once per distinct element
+    matrix_cache = DEFAULT_CACHE  # ElementMatrixCache of the shared arrays, or None to compute every element
+    share_threshold = 0.5  # Largest fraction of distinct elements for which the cache is used
+    result_fields = ()  # (name, number of components) of the results of local_results()
+
+    def __init__(self, coords, properties, property_index=None, connectivity=None, node_coords=None):
+        """
+        Initialize an ElementSet, a batch of N elements of one type stored as arrays.
+
+        :param coords: Nodal coordinates of every element, shape (N, nodes_per_element, 2), or
+                       None to gather them from node_coords and connectivity on first use.
+        :param properties: Property object shared by all elements, or list of Property objects.
+        :param property_index: Index into properties for each element, shape (N,). Defaults to 0.
+        :param connectivity: Mesh node index of each element node, shape (N, nodes_per_element).
+        :param node_coords: Coordinates of all mesh nodes, shape (n_nodes, 2). Required if coords is None.
+        """
+        if coords is None:
+            self._node_coords = node_coords
+        else:
+            self.coords = np.asarray(coords, dtype=float).reshape(-1, self.nodes_per_element, 2)
+        if not isinstance(properties, (list, tuple)):
+            properties = [properties]
+        self.properties = list(properties)
+        if connectivity is not None:
+            connectivity = np.asarray(connectivity, dtype=np.int64).reshape(-1, self.nodes_per_element)
+        self.connectivity = connectivity
+        if property_index is None:
+            property_index = np.zeros(len(self.coords if connectivity is None else connectivity), dtype=np.int64)
+        self.property_index = np.asarray(property_index, dtype=np.int64)
+        self.mesh = None  # Mesh the set belongs to
+        self.ids = None  # Model element ID of each element, assigned by the mesh
+
+    def __getattr__(self, name):
+        # The element matrices are computed on first use, so opening a large mesh stays cheap
+        cls = type(self)
+        if name == 'coords' and '_node_coords' in self.__dict__:
+            self.coords = np.asarray(self._node_coords[self.connectivity], dtype=float)
+            return self.coords
+        if name in cls.arrays:
+            if 'matrix_index' not in self.__dict__:
+                if cls.shared and self.matrix_cache is not None:
+                    self.share()
+                else:
+                    self.update()
+            if name in self.__dict__:
+                return self.__dict__[name]
+            return self.unique[name][self.matrix_index]  # Gathered copy; see value() and compact()
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    @classmethod
+    def from_mesh(cls, coords, connectivity, properties, property_index=None):
+        """
+        Build an element set from mesh arrays, without creating element objects. The
+        coordinates of each element are gathered from the node coordinates on first use.
+
+        :param coords: Coordinates of all mesh nodes, shape (n_nodes, 2).
+        :param connectivity: Node indices of each element, shape (N, nodes_per_element).
+        :param properties: Property object or list of Property objects.
+        :param property_index: Index into properties for each element, shape (N,).
+        :return: ElementSet.
+        """
+        return cls(None, properties, property_index, connectivity, node_coords=coords)
+
+    @classmethod
+    def from_elements(cls, elements):
+        """
+        Build an element set from element objects and bind each element to it.
+
+        :param elements: List of elements of the type handled by this set.
+        :return: ElementSet holding the elements in the given order.
+        """
+        coords = [[node.position for node in element.nodes] for element in elements]
+        connectivity = [[node.index for node in element.nodes] for element in elements]
+        properties, property_index, lookup = [], [], {}
+        for element in elements:
+            key = id(element.property)
+            if key not in lookup:
+                lookup[key] = len(properties)
+                properties.append(element.property)
+            property_index.append(lookup[key])
+
+        element_set = cls(coords, properties, property_index, connectivity)
+        for i, element in enumerate(elements):
+            element.bind(element_set, i)
+        return element_set
+
+    def property_values(self, getter):
+        """
+        Gather one property value per element.
+
+        :param getter: Function mapping a Property object to a scalar.
+        :return: Array of shape (N,) with the value of each element.
+        """
+        return np.array([getter(p) for p in self.properties], dtype=float)[self.property_index]
+
+    def update(self):
+        """
+        Recompute the batched element matrices from the current coordinates and properties.
+        """
+        raise NotImplementedError
+
+    def share(self, indices=None):
+        """
+        Compute the arrays through the matrix cache. Elements with the same normalized geometry
+        and property (see geometry_keys) are computed once, for the first of them, and the
+        cache keeps the result for later sets of congruent elements. The shared arrays are
+        stored once per distinct element in self.unique, read-only, with self.matrix_index
+        pointing each element to its entry; the other arrays are stored per element. Sets with
+        more than share_threshold distinct elements are computed by update() instead.
+
+        :param indices: Positions of the elements to recompute in a set already computed through
+                        the cache (default is all elements).
+        """
+        cls = type(self)
+        initial = indices is None
+        if initial:
+            indices = np.arange(len(self))
+            self.quantum = geometry_quantum(self.coords)
+        coords = self.coords[indices]
+        property_index = self.property_index[indices]
+        rows, first, inverse = np.unique(geometry_keys(coords, property_index, self.quantum), axis=0,
+                                         return_index=True, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        if initial and len(rows) > self.share_threshold * len(self):
+            self.update()
+            return
+
+        prefixes = [repr((cls.__name__, p.key(), self.quantum)) for p in self.properties]
+        keys = [(prefixes[row[-1]], row[:-1].tobytes()) for row in rows]
+        values = [self.matrix_cache.get(key) for key in keys]
+        missing = [u for u, value in enumerate(values) if value is None]
+        if missing:
+            subset = cls(coords[first[missing]], self.properties, property_index[first[missing]])
+            subset.update()
+            for j, u in enumerate(missing):
+                values[u] = self.matrix_cache.put(keys[u], [getattr(subset, name)[j] for name in cls.arrays])
+
+        stacks = {name: np.stack([value[i] for value in values]) for i, name in enumerate(cls.arrays)}
+        if initial:
+            self.matrix_index = inverse
+            self.unique = {}
+        offset = len(self.unique[cls.shared[0]]) if self.unique else 0
+        self.matrix_index[indices] = offset + inverse
+        for name, stack in stacks.items():
+            if name not in cls.shared:
+                if initial:
+                    self.__dict__[name] = stack[inverse]
+                else:
+                    self.__dict__[name][indices] = stack[inverse]
+            else:
+                stack = stack if initial else np.concatenate([self.unique[name], stack])
+                stack.setflags(write=False)
+                self.unique[name] = stack
+
+    def value(self, name, indices):
+        """
+        Read the entries of some elements of a set array, without gathering the whole array
+        of a set computed through the matrix cache.
+
+        :param name: Name of the array.
+        :param indices: Positions of the elements in the set.
+        """
+        if name not in self.__dict__ and 'matrix_index' not in self.__dict__:
+            getattr(self, name)
+        if name in self.__dict__:
+            return self.__dict__[name][indices]
+        return self.unique[name][self.matrix_index[indices]]
+
+    def compact(self, name):
+        """
+        Get a set array in its stored form.
+
+        :param name: Name of the array.
+        :return: Tuple (stack, index): the entry of element i is stack[index[i]], or stack[i]
+                 if index is None.
+        """
+        if name not in self.__dict__ and 'matrix_index' not in self.__dict__:
+            getattr(self, name)
+        if name in self.__dict__:
+            return self.__dict__[name], None
+        return self.unique[name], self.matrix_index
+
+    def local_results(self, u, indices=slice(None)):
+        """
+        Recover the element results from the element displacements, for a batch of elements.
+
+        :param u: Displacements of the element DOFs in global coordinates, shape (n, k).
+        :param indices: Positions in the set of the n elements (default is all elements).
+        :return: Dict mapping each result name of result_fields to an array of shape (n,) or (n, components).
+        """
+        raise NotImplementedError
+
+    def corotational(self, u, tangent=True):
+        """
+        Internal forces and tangent stiffness of all elements for large displacements. Element
+        types without a corotational formulation respond linearly: f = K u and K_t = K.
+
+        :param u: Displacements of the element DOFs in global coordinates, shape (N, k).
+        :param tangent: If False, skip the tangent stiffness matrices.
+        :return: Tuple (f, K_t, results): internal forces (N, k), tangent stiffness matrices
+                 (N, k, k) or None, and dict of local results as returned by local_results.
+        """
+        K = self.K_global_coord
+        return np.einsum('nij,nj->ni', K, u), K if tangent else None, self.local_results(u)
+
+    def mass_matrices(self, lumped=False):
+        """
+        Compute the mass matrices of all elements in global coordinates.
+
+        :param lumped: If True, return diagonal lumped mass matrices instead of consistent ones.
+        :return: Array of shape (N, k, k).
+        """
+        raise NotImplementedError
+
+    def load_vectors(self):
+        """
+        Equivalent nodal loads of loads applied inside the elements, in global coordinates.
+
+        :return: Array of shape (N, k), or None if the elements carry no loads.
+        """
+        return None
+
+    def density(self):
+        """
+        Gather the material density of every element.
+
+        :return: Array of shape (N,).
+        """
+        missing = [p.material.name for p in self.properties if p.material.density is None]
+        if missing:
+            raise ValueError(f"Materials {sorted(set(missing))} have no density.")
+        return self.property_values(lambda p: p.material.density)
+
+    def update_elements(self, indices):
+        """
+        Recompute the matrices of some elements only, e.g. after their properties changed.
+
+        :param indices: Positions of the elements in the set.
+        """
+        getattr(self, self.arrays[0])  # Computes all arrays if needed
+        if 'matrix_index' in self.__dict__:
+            self.share(np.asarray(indices))
+            return
+        subset = type(self)(self.coords[indices], self.properties, self.property_index[indices])
+        for name in self.arrays:
+            getattr(self, name)[indices] = getattr(subset, name)
+
+    def __len__(self):
+        return len(self.property_index)
+
+    def __repr__(self):
+        return f"{type(self).__name__}:\n Elements = {len(self)}\n Properties = {[p.id for p in self.properties]}\n"
+
+
+class ElementLineSet(ElementSet):
+    nodes_per_element = 2
+
+    def update(self):
+        """
+        Compute the length and rotation angle of every line element.
+        """
+        d = self.coords[:, 1] - self.coords[:, 0]
+        self.length = np.hypot(d[:, 0], d[:, 1])
+        self.theta = np.arctan2(d[:, 1], d[:, 0])
+
+
+def _stretch(X, delta, L):
+    """
+    Elongation of line elements, computed as (l^2 - L^2) / (l + L) so that it stays accurate
+    when it is many orders of magnitude below the length.
+
+    :param X: Initial chords, shape (N, 2).
+    :param delta: Relative displacements of the end nodes, shape (N, 2).
+    :param L: Initial lengths, shape (N,).
+    :return: Tuple (stretch, d, l) with the current chords d and lengths l.
+    """
+    d = X + delta
+    l = np.hypot(d[:, 0], d[:, 1])
+    return (2 * np.einsum('ni,ni->n', X, delta) + np.einsum('ni,ni->n', delta, delta)) / (l + L), d, l
+
+
+class ElementRodSet(ElementLineSet):
+    dof_per_node = 2
+    arrays = ('length', 'theta', 'T', 'K', 'K_global_coord')
+    shared = ('T', 'K', 'K_global_coord')
+    result_fields = (('deformation', 1), ('force', 1))
+
+    def update(self):
+        """
+        Compute the transformation, local and global stiffness matrices of all rods at once.
+        """
+        super().update()
+        E = self.property_values(lambda p: p.material.youngs_modulus)
+        A = self.property_values(lambda p: p.area)
+        cos_theta = np.cos(self.theta)
+        sin_theta = np.sin(self.theta)
+
+        self.T = np.zeros((len(self), 2, 4))  # (N, 2, 4) transformation matrices
+        self.T[:, 0, 0] = cos_theta
+        self.T[:, 0, 1] = sin_theta
+        self.T[:, 1, 2] = cos_theta
+        self.T[:, 1, 3] = sin_theta
+
+        k = (E * A) / self.length
+        self.K = k[:, None, None] * np.array([[1., -1.], [-1., 1.]])  # (N, 2, 2) local stiffness
+        self.K_global_coord = np.einsum('nji,njk,nkl->nil', self.T, self.K, self.T, optimize=True)
+
+    def local_results(self, u, indices=slice(None)):
+        """
+        Recover the axial deformation and force of a batch of rods.
+        """
+        q_local = np.einsum('nij,nj->ni', self.value('T', indices), u)
+        E = self.property_values(lambda p: p.material.youngs_modulus)[indices]
+        A = self.property_values(lambda p: p.area)[indices]
+        deformation = q_local[:, 1] - q_local[:, 0]
+        return {'deformation': deformation, 'force': E * A * deformation / self.length[indices]}
+
+    def corotational(self, u, tangent=True):
+        """
+        Corotational response of all rods (large rotations, small strains): the axial force
+        N = EA (l - L) / L acts along the current chord e, so f = N [-e, e] and
+
+            K_t = EA / L b b^T + N / l z z^T,  b = [-e, e],  z = [-e_perp, e_perp].
+        """
+        EA = self.property_values(lambda p: p.material.youngs_modulus) * self.property_values(lambda p: p.area)
+        L = self.length
+        X = self.coords[:, 1] - self.coords[:, 0]
+        stretch, d, l = _stretch(X, u[:, 2:] - u[:, :2], L)
+        e = d / l[:, None]
+        N = EA * stretch / L
+        b = np.concatenate([-e, e], axis=1)
+        f = N[:, None] * b
+        K_t = None
+        if tangent:
+            z = np.stack([-e[:, 1], e[:, 0]], axis=1)
+            z = np.concatenate([-z, z], axis=1)
+            K_t = (EA / L)[:, None, None] * b[:, :, None] * b[:, None, :] + (N / l)[:, None, None] * z[:, :, None] * z[:, None, :]
+        return f, K_t, {'deformation': stretch, 'force': N}
+
+    def mass_matrices(self, lumped=False):
+        """
+        Compute the mass matrices of all rods: rho A L / 6 [[2, 1], [1, 2]] on each translation
+        (consistent), or rho A L / 2 at each node (lumped). Both are invariant under rotation.
+        """
+        m = self.density() * self.property_values(lambda p: p.area) * self.length
+        shape = np.eye(2) / 2 if lumped else np.array([[2., 1.], [1., 2.]]) / 6
+        return m[:, None, None] * np.kron(shape, np.eye(2))
+
+
+class ElementBeamSet(ElementLineSet):
+    dof_per_node = 3
+    arrays = ('length', 'theta', 'T', 'K', 'K_global_coord')
+    shared = ('T', 'K', 'K_global_coord')
+    result_fields = (('deformation', 1), ('force', 1), ('end_forces', 6))
+
+    def update(self):
+        """
+        Compute the transformation, local and global stiffness matrices of all beams at once.
+        """
+        super().update()
+        E = self.property_values(lambda p: p.material.youngs_modulus)
+        A = self.property_values(lambda p: p.area)
+        Izz = self.property_values(lambda p: p.Izz)
+        L = self.length
+        cos_theta = np.cos(self.theta)
+        sin_theta = np.sin(self.theta)
+
+        self.T = np.zeros((len(self), 6, 6))  # (N, 6, 6) transformation matrices
+        for i in (0, 3):
+            self.T[:, i, i] = cos_theta
+            self.T[:, i, i + 1] = sin_theta
+            self.T[:, i + 1, i] = -sin_theta
+            self.T[:, i + 1, i + 1] = cos_theta
+            self.T[:, i + 2, i + 2] = 1
+
+        k0 = (E * A) / L
+        k1 = (E * Izz) / L
+        k2 = (E * Izz) / L**2
+        k3 = (E * Izz) / L**3
+
+        K = np.zeros((len(self), 6, 6))  # (N, 6, 6) local stiffness
+        K[:, 0, 0] = K[:, 3, 3] = k0
+        K[:, 0, 3] = K[:, 3, 0] = -k0
+        K[:, 1, 1] = K[:, 4, 4] = 12 * k3
+        K[:, 1, 4] = K[:, 4, 1] = -12 * k3
+        K[:, 1, 2] = K[:, 2, 1] = K[:, 1, 5] = K[:, 5, 1] = 6 * k2
+        K[:, 2, 4] = K[:, 4, 2] = K[:, 4, 5] = K[:, 5, 4] = -6 * k2
+        K[:, 2, 2] = K[:, 5, 5] = 4 * k1
+        K[:, 2, 5] = K[:, 5, 2] = 2 * k1
+        self.K = K
+        self.K_global_coord = np.einsum('nji,njk,nkl->nil', self.T, self.K, self.T, optimize=True)
+
+    def local_results(self, u, indices=slice(None)):
+        """
+        Recover the axial deformation, axial force and local end forces (N1, V1, M1, N2, V2, M2)
+        of a batch of beams.
+        """
+        q_local = np.einsum('nij,nj->ni', self.value('T', indices), u)
+        end_forces = np.einsum('nij,nj->ni', self.value('K', indices), q_local)
+        return {'deformation': q_local[:, 3] - q_local[:, 0], 'force': end_forces[:, 3], 'end_forces': end_forces}
+
+    def corotational(self, u, tangent=True):
+        """
+        Corotational response of all beams (Crisfield's formulation: large rotations, small
+        strains). The rigid rotation alpha of the chord is removed from the nodal rotations,
+        leaving the local deformations u_l = l - L, theta_1 - alpha and theta_2 - alpha, which
+        the linear beam turns into N, M1 and M2. With c, s the direction of the current chord,
+        r = [-c, -s, 0, c, s, 0] and z = [s, -c, 0, -s, c, 0]:
+
+            f = B^T [N, M1, M2],  B = [r; -z / l + e_3; -z / l + e_6],
+            K_t = B^T K_l B + N / l z z^T + (M1 + M2) / l^2 (r z^T + z r^T).
+        """
+        E = self.property_values(lambda p: p.material.youngs_modulus)
+        A = self.property_values(lambda p: p.area)
+        Izz = self.property_values(lambda p: p.Izz)
+        L = self.length
+        X = self.coords[:, 1] - self.coords[:, 0]
+        stretch, d, l = _stretch(X, u[:, 3:5] - u[:, 0:2], L)
+        c, s = d[:, 0] / l, d[:, 1] / l
+        alpha = np.arctan2(X[:, 0] * d[:, 1] - X[:, 1] * d[:, 0], X[:, 0] * d[:, 0] + X[:, 1] * d[:, 1])
+        # Nodal rotations accumulate past pi while alpha stays in (-pi, pi]; the local rotations
+        # are small, so they are wrapped into [-pi, pi] (exactly unchanged when already there)
+        theta = u[:, [2, 5]] - alpha[:, None]
+        theta_1, theta_2 = (theta - 2 * np.pi * np.round(theta / (2 * np.pi))).T
+
+        N = E * A * stretch / L
+        k = E * Izz / L
+        M1 = k * (4 * theta_1 + 2 * theta_2)
+        M2 = k * (2 * theta_1 + 4 * theta_2)
+        zero = np.zeros(len(self))
+        r = np.stack([-c, -s, zero, c, s, zero], axis=1)
+        z = np.stack([s, -c, zero, -s, c, zero], axis=1)
+        B = np.stack([r, -z / l[:, None], -z / l[:, None]], axis=1)
+        B[:, 1, 2] += 1
+        B[:, 2, 5] += 1
+        f = np.einsum('nji,nj->ni', B, np.stack([N, M1, M2], axis=1))
+
+        K_t = None
+        if tangent:
+            K_l = np.zeros((len(self), 3, 3))
+            K_l[:, 0, 0] = E * A / L
+            K_l[:, 1, 1] = K_l[:, 2, 2] = 4 * k
+            K_l[:, 1, 2] = K_l[:, 2, 1] = 2 * k
+            rz = r[:, :, None] * z[:, None, :]
+            K_t = (np.einsum('nji,njk,nkl->nil', B, K_l, B, optimize=True)
+                   + (N / l)[:, None, None] * z[:, :, None] * z[:, None, :]
+                   + ((M1 + M2) / l ** 2)[:, None, None] * (rz + rz.transpose(0, 2, 1)))
+        V = (M1 + M2) / l
+        end_forces = np.stack([-N, V, M1, N, -V, M2], axis=1)
+        return f, K_t, {'deformation': stretch, 'force': N, 'end_forces': end_forces}
+
+    def mass_matrices(self, lumped=False):
+        """
+        Compute the mass matrices of all beams: the consistent Euler-Bernoulli mass matrix in
+        local coordinates, rotated to global coordinates, or its HRZ lumping (diagonal scaled so
+        each translation carries the whole mass, rho A L^3 / 78 of rotary inertia per node).
+        """
+        m = self.density() * self.property_values(lambda p: p.area) * self.length
+        L = self.length
+        M = np.zeros((len(self), 6, 6))  # (N, 6, 6) local mass
+        M[:, [0, 3], [0, 3]] = 2 * m[:, None] / 6
+        M[:, 0, 3] = M[:, 3, 0] = m / 6
+        c = m / 420
+        M[:, 1, 1] = M[:, 4, 4] = 156 * c
+        M[:, 1, 4] = M[:, 4, 1] = 54 * c
+        M[:, 1, 2] = M[:, 2, 1] = 22 * c * L
+        M[:, 4, 5] = M[:, 5, 4] = -22 * c * L
+        M[:, 1, 5] = M[:, 5, 1] = -13 * c * L
+        M[:, 2, 4] = M[:, 4, 2] = 13 * c * L
+        M[:, 2, 2] = M[:, 5, 5] = 4 * c * L ** 2
+        M[:, 2, 5] = M[:, 5, 2] = -3 * c * L ** 2
+        if lumped:
+            # Axial and transverse diagonals are scaled separately; each then sums to the element mass
+            diagonal = np.diagonal(M, axis1=1, axis2=2).copy()
+            diagonal[:, [0, 3]] *= (m / diagonal[:, [0, 3]].sum(axis=1))[:, None]
+            diagonal[:, [1, 2, 4, 5]] *= (m / diagonal[:, [1, 4]].sum(axis=1))[:, None]
+            M = diagonal[:, :, None] * np.eye(6)
+        return np.einsum('nji,njk,nkl->nil', self.T, M, self.T, optimize=True)
+
+
+class ElementMembraneSet(ElementSet):
+    dof_per_node = 2
+    result_fields = (('strain', 3), ('stress', 3), ('von_mises', 1))
+    outline = None  # Node order of the element boundary, for plotting (default is the connectivity order)
+    degree = 1  # Polynomial degree of the shape functions along an edge
+
+    def elasticity(self):
+        """
+        Compute the plane stress or plane strain elasticity matrices (D-matrices) of all elements.
+
+        :return: Array of shape (N, 3, 3).
+        """
+        E = self.property_values(lambda p: p.material.youngs_modulus)
+        nu = self.property_values(lambda p: p.material.poissons_ratio)
+        plane_strain = self.property_values(lambda p: not p.plane_stress).astype(bool)
+
+        # Modify for plane strain condition
+        E = np.where(plane_strain, E / (1 - nu ** 2), E)
+        nu = np.where(plane_strain, nu / (1 - nu ** 2), nu)
+
+        D = np.zeros((len(self), 3, 3))
+        D[:, 0, 0] = D[:, 1, 1] = 1
+        D[:, 0, 1] = D[:, 1, 0] = nu
+        D[:, 2, 2] = (1 - nu) / 2
+        return (E / (1 - nu ** 2))[:, None, None] * D
+
+    @staticmethod
+    def strain_displacement(dN_dx):
+        """
+        Assemble strain-displacement matrices (B-matrices) from shape function derivatives.
+
+        :param dN_dx: Derivatives (dN/dx, dN/dy) of each element's shape functions, shape (N, nodes, 2).
+        :return: Array of shape (N, 3, 2 * nodes).
+        """
+        B = np.zeros((len(dN_dx), 3, 2 * dN_dx.shape[1]))
+        B[:, 0, 0::2] = dN_dx[:, :, 0]
+        B[:, 1, 1::2] = dN_dx[:, :, 1]
+        B[:, 2, 0::2] = dN_dx[:, :, 1]
+        B[:, 2, 1::2] = dN_dx[:, :, 0]
+        return B
+
+    def mass_matrices(self, lumped=False):
+        """
+        Compute the mass matrices of all elements, rho t integral(N^T N) dA on each translation
+        (consistent), or its HRZ lumping: the diagonal scaled to the element mass.
+        """
+        m = self.scalar_mass()
+        if lumped:
+            diagonal = np.diagonal(m, axis1=1, axis2=2)
+            total = m.sum(axis=(1, 2))
+            m = (diagonal * (total / diagonal.sum(axis=1))[:, None])[:, :, None] * np.eye(m.shape[1])
+        return np.einsum('nab,ij->naibj', m, np.eye(2)).reshape(len(self), 2 * m.shape[1], 2 * m.shape[1])
+
+    def scalar_mass(self):
+        """
+        Compute rho t integral(N_a N_b) dA of all elements, the mass matrix of one translation.
+
+        :return: Array of shape (N, nodes, nodes).
+        """
+        raise NotImplementedError
+
+    def stress_results(self, strain, indices):
+        """
+        Recover the stress and von Mises stress from the strain of a batch of elements.
+        """
+        stress = np.einsum('nij,nj->ni', self.value('D', indices), strain)
+        sxx, syy, sxy = stress.T
+        von_mises = np.sqrt(sxx ** 2 - sxx * syy + syy ** 2 + 3 * sxy ** 2)
+        return {'strain': strain, 'stress': stress, 'von_mises': von_mises}
+
+
+class ElementCSTSet(ElementMembraneSet):
+    nodes_per_element = 3
+    arrays = ('area', 'B', 'D', 'K_global_coord')
+    shared = ('B', 'D', 'K_global_coord')
+
+    def update(self):
+        """
+        Compute the area, strain-displacement, elasticity and stiffness matrices of all CSTs at once.
+        """
+        x = self.coords[:, :, 0]
+        y = self.coords[:, :, 1]
+        signed_area = ((x[:, 1] - x[:, 0]) * (y[:, 2] - y[:, 0]) - (x[:, 2] - x[:, 0]) * (y[:, 1] - y[:, 0])) / 2
+        self.area = np.abs(signed_area)
+
+        # Strain-displacement matrices (B-matrices)
+        b = np.stack([y[:, 1] - y[:, 2], y[:, 2] - y[:, 0], y[:, 0] - y[:, 1]], axis=1)
+        c = np.stack([x[:, 2] - x[:, 1], x[:, 0] - x[:, 2], x[:, 1] - x[:, 0]], axis=1)
+        # Signed area, so clockwise node order gives the same strains
+        self.B = self.strain_displacement(np.stack([b, c], axis=2) / (2 * signed_area)[:, None, None])
+        self.D = self.elasticity()
+        t = self.property_values(lambda p: p.thickness)
+
+        # Element stiffness matrices in global coordinates
+        self.K_global_coord = (self.area * t)[:, None, None] * np.einsum('nji,njk,nkl->nil', self.B, self.D, self.B, optimize=True)
+
+    def local_results(self, u, indices=slice(None)):
+        """
+        Recover the strain (exx, eyy, gxy), stress (sxx, syy, sxy) and von Mises stress of a
+        batch of CSTs.
+        """
+        return self.stress_results(np.einsum('nij,nj->ni', self.value('B', indices), u), indices)
+
+    def scalar_mass(self):
+        """
+        Exact consistent mass of the linear triangle: rho t A / 12 [[2, 1, 1], [1, 2, 1], [1, 1, 2]].
+        """
+        m = self.density() * self.property_values(lambda p: p.thickness) * self.area
+        return m[:, None, None] * (np.ones((3, 3)) + np.eye(3)) / 12
+
+
+class ElementIsoparametricSet(ElementMembraneSet):
+    arrays = ('area', 'D', 'K_global_coord')
+    shared = ('D', 'K_global_coord')
+    center = None  # Natural coordinates of the element center, where results are recovered
+
+    def quadrature(self):
+        """
+        Integration points and weights in natural coordinates.
+
+        :return: Tuple (points, weights) with shapes (G, 2) and (G,).
+        """
+        raise NotImplementedError
+
+    def mass_quadrature(self):
+        """
+        Integration points and weights of the mass matrix, exact for N^T N on undistorted elements.
+        """
+        return self.quadrature()
+
+    @staticmethod
+    def shape_functions(points):
+        """
+        Evaluate the shape functions and their natural derivatives.
+
+        :param points: Natural coordinates, shape (G, 2).
+        :return: Tuple (N, dN) with shapes (G, nodes) and (G, nodes, 2).
+        """
+        raise NotImplementedError
+
+    def derivatives(self, dN, indices=slice(None)):
+        """
+        Map natural shape function derivatives at one point to global coordinates.
+
+        :param dN: Natural derivatives at the point, shape (nodes, 2).
+        :param indices: Positions of the elements in the set.
+        :return: Tuple (dN_dx, det_J) with shapes (n, nodes, 2) and (n,).
+        """
+        J = np.einsum('ai,naj->nij', dN, self.coords[indices])  # J[i, j] = dx_j / dxi_i
+        det_J = J[:, 0, 0] * J[:, 1, 1] - J[:, 0, 1] * J[:, 1, 0]
+        inv_J = np.stack([np.stack([J[:, 1, 1], -J[:, 0, 1]], axis=1),
+                          np.stack([-J[:, 1, 0], J[:, 0, 0]], axis=1)], axis=1) / det_J[:, None, None]
+        return np.einsum('nij,aj->nai', inv_J, dN), det_J
+
+    def update(self):
+        """
+        Integrate the stiffness matrices of all elements numerically, one integration point at a
+        time over the whole batch: K = sum_g w_g t |det J_g| B_g^T D B_g.
+        """
+        points, weights = self.quadrature()
+        _, dN = self.shape_functions(points)
+        self.D = self.elasticity()
+        t = self.property_values(lambda p: p.thickness)
+
+        k = 2 * self.nodes_per_element
+        self.area = np.zeros(len(self))
+        self.K_global_coord = np.zeros((len(self), k, k))
+        for dN_g, w in zip(dN, weights):
+            dN_dx, det_J = self.derivatives(dN_g)
+            B = self.strain_displacement(dN_dx)
+            dA = w * np.abs(det_J)  # Clockwise node order gives a negative Jacobian
+            self.area += dA
+            self.K_global_coord += (dA * t)[:, None, None] * np.einsum('nji,njk,nkl->nil', B, self.D, B, optimize=True)
+
+    def scalar_mass(self):
+        """
+        Integrate rho t N^T N |det J| over all elements, one integration point at a time.
+        """
+        points, weights = self.mass_quadrature()
+        N, dN = self.shape_functions(points)
+        rho_t = self.density() * self.property_values(lambda p: p.thickness)
+        m = np.zeros((len(self), self.nodes_per_element, self.nodes_per_element))
+        for N_g, dN_g, w in zip(N, dN, weights):
+            det_J = self.derivatives(dN_g)[1]
+            m += (w * rho_t * np.abs(det_J))[:, None, None] * np.outer(N_g, N_g)
+        return m
+
+    def local_results(self, u, indices=slice(None)):
+        """
+        Recover the strain (exx, eyy, gxy), stress (sxx, syy, sxy) and von Mises stress at the
+        center of a batch of elements.
+        """
+        _, dN = self.shape_functions(np.array([self.center]))
+        B = self.strain_displacement(self.derivatives(dN[0], indices)[0])
+        return self.stress_results(np.einsum('nij,nj->ni', B, u), indices)
+
+
+class ElementQ4Set(ElementIsoparametricSet):
+    nodes_per_element = 4
+    center = (0.0, 0.0)
+    corners = np.array([[-1., -1.], [1., -1.], [1., 1.], [-1., 1.]])
+
+    def quadrature(self):
+        return gauss_quadrilateral(2)
+
+    @staticmethod
+    def shape_functions(points):
+        """
+        Bilinear shape functions of the 4-node quadrilateral, nodes counter-clockwise from (-1, -1).
+        """
+        xi, eta = points[:, None, 0], points[:, None, 1]
+        xi_a, eta_a = ElementQ4Set.corners.T
+        N = (1 + xi * xi_a) * (1 + eta * eta_a) / 4
+        dN = np.stack([xi_a * (1 + eta * eta_a) / 4, eta_a * (1 + xi * xi_a) / 4], axis=2)
+        return N, dN
+
+
+class ElementQ8Set(ElementIsoparametricSet):
+    nodes_per_element = 8
+    center = (0.0, 0.0)
+    outline = (0, 4, 1, 5, 2, 6, 3, 7)
+    degree = 2
+    corners = ElementQ4Set.corners
+    midsides = np.array([[0., -1.], [1., 0.], [0., 1.], [-1., 0.]])
+
+    def quadrature(self):
+        return gauss_quadrilateral(3)
+
+    @staticmethod
+    def shape_functions(points):
+        """
+        Quadratic serendipity shape functions of the 8-node quadrilateral: the four corners
+        counter-clockwise from (-1, -1), then the midsides of edges 0-1, 1-2, 2-3 and 3-0.
+        """
+        xi, eta = points[:, None, 0], points[:, None, 1]
+        xi_a, eta_a = ElementQ8Set.corners.T
+        N_corner = (1 + xi * xi_a) * (1 + eta * eta_a) * (xi * xi_a + eta * eta_a - 1) / 4
+        dN_corner = np.stack([xi_a * (1 + eta * eta_a) * (2 * xi * xi_a + eta * eta_a) / 4,
+                              eta_a * (1 + xi * xi_a) * (xi * xi_a + 2 * eta * eta_a) / 4], axis=2)
+
+        xi_m, eta_m = ElementQ8Set.midsides.T
+        on_xi = xi_m == 0  # Midsides of the edges along xi (eta = +-1)
+        N_mid = np.where(on_xi, (1 - xi ** 2) * (1 + eta * eta_m), (1 + xi * xi_m) * (1 - eta ** 2)) / 2
+        dN_mid = np.stack([np.where(on_xi, -2 * xi * (1 + eta * eta_m), xi_m * (1 - eta ** 2)) / 2,
+                           np.where(on_xi, eta_m * (1 - xi ** 2), -2 * eta * (1 + xi * xi_m)) / 2], axis=2)
+        return np.concatenate([N_corner, N_mid], axis=1), np.concatenate([dN_corner, dN_mid], axis=1)
+
+
+class ElementT6Set(ElementIsoparametricSet):
+    nodes_per_element = 6
+    center = (1 / 3, 1 / 3)
+    outline = (0, 3, 1, 4, 2, 5)
+    degree = 2
+
+    def quadrature(self):
+        return gauss_triangle(2)
+
+    def mass_quadrature(self):
+        return gauss_triangle(4)
+
+    @staticmethod
+    def shape_functions(points):
+        """
+        Quadratic shape functions of the 6-node triangle: the corners (0, 0), (1, 0), (0, 1),
+        then the midsides of edges 0-1, 1-2 and 2-0.
+        """
+        xi, eta = points[:, 0], points[:, 1]
+        L = np.stack([1 - xi - eta, xi, eta], axis=1)  # Area coordinates
+        dL = np.array([[-1., -1.], [1., 0.], [0., 1.]])  # dL/d(xi, eta)
+        i, j = np.array([0, 1, 2]), np.array([1, 2, 0])  # End nodes of each midside
+        N = np.concatenate([L * (2 * L - 1), 4 * L[:, i] * L[:, j]], axis=1)
+        dN = np.concatenate([(4 * L - 1)[:, :, None] * dL,
+                             4 * (L[:, j, None] * dL[i] + L[:, i, None] * dL[j])], axis=1)
+        return N, dN
+
+
+class ElementSuperSet(ElementSet):
+    arrays = ('Q', 'K_global_coord', 'F_global_coord')
+
+    def __init__(self, coords, properties, property_index=None, connectivity=None, node_coords=None):
+        """
+        Initialize an ElementSuperSet, the instances of one Substructure placed in a parent
+        mesh. Each instance connects the interface nodes of the substructure to parent nodes,
+        which must be a rigid (translated and rotated) copy of the interface.
+
+        :param coords: Coordinates of the parent nodes of each instance, shape (N, n_interface, 2).
+        :param properties: Substructure object (or a list holding one).
+        :param property_index: Unused; all instances share the substructure.
+        :param connectivity: Parent node index of each interface node, shape (N, n_interface).
+        :param node_coords: Coordinates of all parent nodes, if coords is None.
+        """
+        substructures = properties if isinstance(properties, (list, tuple)) else [properties]
+        if len(substructures) != 1:
+            raise ValueError("An ElementSuperSet holds the instances of a single substructure.")
+        self.nodes_per_element = len(substructures[0].interface)
+        self.dof_per_node = substructures[0].dof_per_node
+        super().__init__(coords, substructures, None, connectivity, node_coords)
+
+    @property
+    def substructure(self):
+        return self.properties[0]
+
+    def update(self):
+        """
+        Condense the substructure (or take it from the cache) and rotate the condensed
+        stiffness and loads to the placement of every instance.
+        """
+        condensation = self.substructure.condense()
+        reference = self.substructure.interface_coords
+        a = reference - reference.mean(axis=0)
+        b = self.coords - self.coords.mean(axis=1, keepdims=True)
+
+        # Rotation best mapping the interface onto each instance (2D Kabsch)
+        theta = np.arctan2((a[:, 0] * b[:, :, 1] - a[:, 1] * b[:, :, 0]).sum(axis=1), np.einsum('ij,nij->n', a, b))
+        R = np.zeros((len(self), 2, 2))
+        R[:, 0, 0] = R[:, 1, 1] = np.cos(theta)
+        R[:, 1, 0] = np.sin(theta)
+        R[:, 0, 1] = -R[:, 1, 0]
+        mismatch = np.abs(np.einsum('nij,kj->nki', R, a) - b).max(axis=(1, 2), initial=0)
+        scale = max(np.abs(a).max(initial=0), 1e-300)
+        if np.any(mismatch > 1e-8 * scale):
+            bad = int(np.argmax(mismatch > 1e-8 * scale))
+            raise ValueError(f"Superelement {bad} is not a rigid placement of the interface of '{self.substructure.name}'.")
+
+        d = self.dof_per_node
+        self.Q = np.zeros((len(self), d * self.nodes_per_element, d * self.nodes_per_element))  # Substructure to parent DOFs
+        for node in range(self.nodes_per_element):
+            self.Q[:, node * d:node * d + 2, node * d:node * d + 2] = R
+            if d == 3:
+                self.Q[:, node * d + 2, node * d + 2] = 1.0
+        self.K_global_coord = np.einsum('nij,jk,nlk->nil', self.Q, condensation.K, self.Q, optimize=True)
+        self.F_global_coord = np.einsum('nij,j->ni', self.Q, condensation.F)
+
+    def load_vectors(self):
+        return self.F_global_coord
+
+    def local_results(self, u, indices=slice(None)):
+        """
+        Superelements have no results of their own; see recover.
+        """
+        return {}
+
+    def recover(self, u, index):
+        """
+        Recover the full solution of one instance from its interface displacements.
+
+        :param u: Displacements of the instance DOFs in parent coordinates, shape (k,).
+        :param index: Position of the instance in the set.
+        :return: Output of the substructure's model, in substructure coordinates.
+        """
+        return self.substructure.recover(self.Q[index].T @ u)
@@ -0,0 +1,197 @@
+import numpy as np
+from fem.element import ELEMENT_CLASSES
+from fem.node import MAX_DOF, NodeStore
+
+
+class Mesh(NodeStore):
+    def __init__(self, coords, element_sets=None):
+        """
+        Initialize a Mesh, the array-backed store of a model's nodes, elements, DOF maps and
+        nodal results. Node and element IDs are positions in the mesh, so they are scoped to
+        the model that owns it.
+
+        :param coords: Node coordinates, shape (n_nodes, 2).
+        :param element_sets: List of ElementSet objects with connectivity into these nodes.
+        """
+        super().__init__(coords)
+        self.element_sets = []
+        self.node_sets = {}  # Named arrays of node indices, e.g. supports and loaded edges
+        self.element_results = None  # Element results of the last Output.compute_element_results
+        self.nodes = NodeList(self)
+        self.elements = ElementList(self)
+        for element_set in element_sets or []:
+            self.add_element_set(element_set)
+
+    @classmethod
+    def from_objects(cls, nodes, elements):
+        """
+        Gather Node and Element objects into a mesh. The node state is copied into the mesh
+        arrays and every node and element becomes a view over the mesh.
+
+        :param nodes: List of Node objects.
+        :param elements: List of Element objects whose nodes are all in nodes.
+        :return: Mesh.
+        """
+        mesh = cls([node.position for node in nodes])
+        for i, node in enumerate(nodes):
+            store, index = node.mesh, node.index
+            mesh.node_dof[i] = store.node_dof[index]
+            mesh.global_dof[i] = store.global_dof[index]
+            mesh.displacement[i] = store.displacement[index]
+            mesh.force[i] = store.force[index]
+            node.bind(mesh, i)
+
+        groups = {}
+        for i, element in enumerate(elements):
+            if any(node.mesh is not mesh for node in element.nodes):
+                raise ValueError(f"Element {i} has a node that is not in the model's node list.")
+            groups.setdefault(element.group, ([], []))
+            groups[element.group][0].append(element)
+            groups[element.group][1].append(i)
+
+        for group, ids in groups.values():
+            mesh.add_element_set(group[0].set_class.from_elements(group), ids)
+        return mesh
+
+    def add_element_set(self, element_set, ids=None):
+        """
+        Add an element set to the mesh. Its nodes get at least the DOFs the element type needs.
+
+        :param element_set: ElementSet with connectivity into the mesh nodes.
+        :param ids: Element IDs of the set (default is consecutive IDs after the existing elements).
+        """
+        if ids is None:
+            ids = self.n_elements + np.arange(len(element_set))
+        element_set.mesh = self
+        element_set.ids = np.asarray(ids, dtype=np.int64)
+        np.maximum.at(self.node_dof, element_set.connectivity.ravel(), element_set.dof_per_node)
+        self.element_sets.append(element_set)
+        self.elements.reset()
+
+    def add_elements(self, set_class, connectivity, properties, property_index=None):
+        """
+        Create the elements of one type straight from connectivity arrays.
+
+        :param set_class: ElementSet subclass, e.g. ElementRodSet.
+        :param connectivity: Node indices of each element, shape (N, nodes_per_element).
+        :param properties: Property object or list of Property objects.
+        :param property_index: Index into properties for each element, shape (N,).
+        :return: The new ElementSet.
+        """
+        element_set = set_class.from_mesh(self.coords, connectivity, properties, property_index)
+        self.add_element_set(element_set)
+        return element_set
+
+    @property
+    def n_elements(self):
+        return sum(len(element_set) for element_set in self.element_sets)
+
+    def assign_global_dof(self, order=None):
+        """
+        Number the DOFs of all nodes consecutively.
+
+        :param order: Node indices in numbering order (default is mesh order).
+        :return: Total number of global DOFs.
+        """
+        if order is None:
+            order = np.arange(self.n_nodes)
+        counts = self.node_dof[order]
+        first = np.empty(self.n_nodes, dtype=np.int64)
+        first[order] = np.cumsum(counts) - counts
+        self.global_dof[:] = first[:, None] + np.arange(MAX_DOF)
+        self.global_dof[np.arange(MAX_DOF) >= self.node_dof[:, None]] = -1
+        return int(counts.sum())
+
+    def element_dofs(self, element_set, indices=slice(None)):
+        """
+        Global DOF map of an element set.
+
+        :param element_set: ElementSet of this mesh.
+        :param indices: Positions of the elements in the set (default is all elements).
+        :return: Array of shape (n, nodes_per_element * dof_per_node).
+        """
+        dofs = self.global_dof[element_set.connectivity[indices], :element_set.dof_per_node]
+        return dofs.reshape(len(dofs), -1)
+
+    def locate_elements(self):
+        """
+        Map every element ID to its element set and position in the set.
+
+        :return: Tuple (set_number, position) of arrays with shape (n_elements,).
+        """
+        set_number = np.empty(self.n_elements, dtype=np.int64)
+        position = np.empty(self.n_elements, dtype=np.int64)
+        for number, element_set in enumerate(self.element_sets):
+            set_number[element_set.ids] = number
+            position[element_set.ids] = np.arange(len(element_set))
+        return set_number, position
+
+    def __repr__(self):
+        return (f"Mesh:\n Nodes = {self.n_nodes}\n Elements = {self.n_elements}\n"
+                f" Element sets = {[type(s).__name__ for s in self.element_sets]}\n")
+
+
+class NodeList:
+    __slots__ = ('mesh',)
+
+    def __init__(self, mesh):
+        """
+        Initialize a NodeList, a sequence of Node views over the nodes of a mesh.
+
+        :param mesh: Mesh object.
+        """
+        self.mesh = mesh
+
+    def __len__(self):
+        return self.mesh.n_nodes
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.mesh.node(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("node index out of range")
+        return self.mesh.node(int(index))
+
+    def __iter__(self):
+        return (self.mesh.node(i) for i in range(len(self)))
+
+
+class ElementList:
+    __slots__ = ('mesh', '_views', '_locations')
+
+    def __init__(self, mesh):
+        """
+        Initialize an ElementList, a sequence of element views over the element sets of a mesh,
+        ordered by element ID. Views are created on first access and kept.
+
+        :param mesh: Mesh object.
+        """
+        self.mesh = mesh
+        self.reset()
+
+    def reset(self):
+        self._views = {}
+        self._locations = None
+
+    def __len__(self):
+        return self.mesh.n_elements
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("element index out of range")
+        if index not in self._views:
+            if self._locations is None:
+                self._locations = self.mesh.locate_elements()
+            set_number, position = self._locations
+            element_set = self.mesh.element_sets[set_number[index]]
+            self._views[index] = ELEMENT_CLASSES[type(element_set)].view(element_set, int(position[index]))
+        return self._views[index]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
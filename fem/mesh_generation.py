@@ -0,0 +1,314 @@
+import numpy as np
+from fem.element_set import ElementRodSet, ElementBeamSet, ElementCSTSet, ElementQ4Set, ElementQ8Set, ElementT6Set
+from fem.mesh import Mesh
+
+
+def rectangle(width, height, nx, ny, property, origin=(0.0, 0.0), set_class=ElementCSTSet):
+    """
+    Generate a rectangular grid of membrane elements: two triangles or one quadrilateral per cell.
+
+    Node sets: 'left', 'right', 'bottom', 'top' and the corners 'bottom_left', 'bottom_right',
+    'top_left', 'top_right'.
+
+    :param width: Size of the rectangle along x.
+    :param height: Size of the rectangle along y.
+    :param nx: Number of cells along x.
+    :param ny: Number of cells along y.
+    :param property: Membrane property of the elements.
+    :param origin: Coordinates of the bottom-left corner.
+    :param set_class: Element type: ElementCSTSet, ElementT6Set, ElementQ4Set or ElementQ8Set.
+    :return: Mesh.
+    """
+    degree = set_class.degree
+    x = origin[0] + np.linspace(0, width, degree * nx + 1)
+    y = origin[1] + np.linspace(0, height, degree * ny + 1)
+    coords = np.stack(np.meshgrid(x, y), axis=-1).reshape(-1, 2)
+    grid = np.arange(len(coords)).reshape(len(y), len(x))
+
+    mesh, grid = _membrane_mesh(coords, grid, property, set_class)
+    mesh.node_sets.update({
+        'left': grid[:, 0], 'right': grid[:, -1], 'bottom': grid[0], 'top': grid[-1],
+        'bottom_left': grid[:1, 0], 'bottom_right': grid[:1, -1], 'top_left': grid[-1:, 0], 'top_right': grid[-1:, -1],
+    })
+    return mesh
+
+
+def annulus(inner_radius, outer_radius, n_radial, n_circumferential, property, angle=2 * np.pi, center=(0.0, 0.0),
+            set_class=ElementCSTSet):
+    """
+    Generate a ring (or ring sector) of membrane elements on a polar grid.
+
+    Node sets: 'inner' and 'outer', plus 'start' and 'end' (the radial edges) for sectors.
+
+    :param inner_radius: Inner radius.
+    :param outer_radius: Outer radius.
+    :param n_radial: Number of cells across the ring.
+    :param n_circumferential: Number of cells around the ring.
+    :param property: Membrane property of the elements.
+    :param angle: Angle spanned by the ring, starting at the x axis (default is a full ring).
+    :param center: Coordinates of the center.
+    :param set_class: Element type: ElementCSTSet, ElementT6Set, ElementQ4Set or ElementQ8Set.
+    :return: Mesh.
+    """
+    degree = set_class.degree
+    closed = np.isclose(angle, 2 * np.pi)
+    n_cells = degree * n_circumferential
+    n_theta = n_cells if closed else n_cells + 1
+    r = np.linspace(inner_radius, outer_radius, degree * n_radial + 1)
+    theta = np.arange(n_theta) * angle / n_cells
+    grid = np.arange(len(r) * n_theta).reshape(len(r), n_theta)
+    if closed:
+        grid = np.concatenate([grid, grid[:, :1]], axis=1)  # The last cells wrap to the first nodes
+    coords = np.stack([np.outer(r, np.cos(theta)), np.outer(r, np.sin(theta))], axis=-1).reshape(-1, 2)
+
+    mesh, grid = _membrane_mesh(coords + center, grid.T, property, set_class)
+    grid = grid.T
+    mesh.node_sets.update({'inner': grid[0, :n_theta], 'outer': grid[-1, :n_theta]})
+    if not closed:
+        mesh.node_sets.update({'start': grid[:, 0], 'end': grid[:, -1]})
+    return mesh
+
+
+def plate_with_hole(width, height, radius, n_radial, n_circumferential, property, grading=1.0,
+                    set_class=ElementCSTSet):
+    """
+    Generate a rectangular plate with a central circular hole, meshed with membrane elements on
+    rays that run from the hole to the plate edges.
+
+    Node sets: 'hole', 'left', 'right', 'bottom' and 'top'.
+
+    :param width: Size of the plate along x, centered on the hole.
+    :param height: Size of the plate along y, centered on the hole.
+    :param radius: Radius of the hole.
+    :param n_radial: Number of cells from the hole to the edges.
+    :param n_circumferential: Number of cells around the hole, a multiple of 4 so that every
+                              plate corner is a node.
+    :param property: Membrane property of the elements.
+    :param grading: Ratio between the outermost and innermost radial cell sizes (> 1 refines
+                    the mesh around the hole).
+    :param set_class: Element type: ElementCSTSet, ElementT6Set, ElementQ4Set or ElementQ8Set.
+                      Midside nodes of quadratic elements on the hole lie on the circle.
+    :return: Mesh.
+    """
+    if n_circumferential % 4:
+        raise ValueError("n_circumferential must be a multiple of 4.")
+    degree = set_class.degree
+    # Points evenly spaced along each edge, counter-clockwise from the bottom-right corner
+    n = degree * n_circumferential // 4
+    n_points = 4 * n
+    s = np.arange(n) / n
+    a, b = width / 2, height / 2
+    edge = np.concatenate([
+        np.column_stack([np.full(n, a), -b + 2 * b * s]),
+        np.column_stack([a - 2 * a * s, np.full(n, b)]),
+        np.column_stack([np.full(n, -a), b - 2 * b * s]),
+        np.column_stack([-a + 2 * a * s, np.full(n, -b)]),
+    ])
+    theta = np.arctan2(edge[:, 1], edge[:, 0])
+    hole = radius * np.column_stack([np.cos(theta), np.sin(theta)])
+
+    # Geometric spacing of the radial layers, with midside layers halfway for quadratic elements
+    ratio = grading ** (1 / max(n_radial - 1, 1))
+    steps = np.repeat(ratio ** np.arange(n_radial), degree) / degree
+    t = np.concatenate([[0], np.cumsum(steps)]) / steps.sum()
+    coords = (hole + t[:, None, None] * (edge - hole)).reshape(-1, 2)
+
+    grid = np.arange(len(t) * n_points).reshape(len(t), n_points)
+    grid = np.concatenate([grid, grid[:, :1]], axis=1)
+    mesh, grid = _membrane_mesh(coords, grid.T, property, set_class)
+    grid = grid.T
+
+    outer = grid[-1, :-1]
+    side = np.arange(n_points) // n
+    corner = np.arange(n_points) % n == 0
+    # Each edge includes its two corners
+    on_edge = lambda k: outer[(side == k) | (corner & (side == (k + 1) % 4))]
+    mesh.node_sets.update({'hole': grid[0, :-1], 'right': on_edge(0), 'top': on_edge(1),
+                           'left': on_edge(2), 'bottom': on_edge(3)})
+    return mesh
+
+
+def warren_truss(span, height, n_panels, property, set_class=ElementRodSet):
+    """
+    Generate a Warren truss: parallel chords connected by alternating diagonals.
+
+    Node sets: 'bottom_chord', 'top_chord', 'left_support' and 'right_support'.
+
+    :param span: Length of the bottom chord.
+    :param height: Distance between the chords.
+    :param n_panels: Number of panels (bottom chord members).
+    :param property: Property of the members.
+    :param set_class: ElementRodSet (pin-jointed) or ElementBeamSet (rigid joints).
+    :return: Mesh.
+    """
+    panel = span / n_panels
+    bottom = np.arange(n_panels + 1)
+    top = n_panels + 1 + np.arange(n_panels)
+    coords = np.concatenate([
+        np.column_stack([bottom * panel, np.zeros(n_panels + 1)]),
+        np.column_stack([(np.arange(n_panels) + 0.5) * panel, np.full(n_panels, height)]),
+    ])
+    connectivity = np.concatenate([
+        np.column_stack([bottom[:-1], bottom[1:]]),
+        np.column_stack([top[:-1], top[1:]]),
+        np.column_stack([bottom[:-1], top]),
+        np.column_stack([top, bottom[1:]]),
+    ])
+    return _truss(coords, connectivity, property, set_class, bottom, top)
+
+
+def pratt_truss(span, height, n_panels, property, set_class=ElementRodSet):
+    """
+    Generate a Pratt truss: parallel chords with verticals, and diagonals sloping down towards
+    midspan (in tension under gravity loads).
+
+    Node sets: 'bottom_chord', 'top_chord', 'left_support' and 'right_support'.
+
+    :param span: Length of the chords.
+    :param height: Distance between the chords.
+    :param n_panels: Number of panels.
+    :param property: Property of the members.
+    :param set_class: ElementRodSet (pin-jointed) or ElementBeamSet (rigid joints).
+    :return: Mesh.
+    """
+    x = np.arange(n_panels + 1) * span / n_panels
+    bottom = np.arange(n_panels + 1)
+    top = n_panels + 1 + bottom
+    coords = np.concatenate([np.column_stack([x, np.zeros_like(x)]), np.column_stack([x, np.full_like(x, height)])])
+
+    i = np.arange(n_panels)
+    left = i < n_panels / 2
+    diagonals = np.where(left[:, None], np.column_stack([top[i], bottom[i + 1]]),
+                         np.column_stack([top[i + 1], bottom[i]]))
+    connectivity = np.concatenate([
+        np.column_stack([bottom[:-1], bottom[1:]]),
+        np.column_stack([top[:-1], top[1:]]),
+        np.column_stack([bottom, top]),
+        diagonals,
+    ])
+    return _truss(coords, connectivity, property, set_class, bottom, top)
+
+
+def _truss(coords, connectivity, property, set_class, bottom, top):
+    mesh = Mesh(coords)
+    mesh.add_elements(set_class, connectivity, property)
+    mesh.node_sets.update({'bottom_chord': bottom, 'top_chord': top,
+                           'left_support': bottom[:1], 'right_support': bottom[-1:]})
+    return mesh
+
+
+def portal_frame(bay_widths, story_heights, column_property, beam_property=None, segments=1):
+    """
+    Generate a multi-bay, multi-story portal frame of beam elements.
+
+    Node sets: 'base' (the column feet), 'floor_1' ... 'floor_n' (the nodes of each floor) and
+    'roof' (the top floor).
+
+    :param bay_widths: Width of each bay, or a (width, n_bays) tuple for equal bays.
+    :param story_heights: Height of each story, or a (height, n_stories) tuple for equal stories.
+    :param column_property: Beam2D property of the columns.
+    :param beam_property: Beam2D property of the floor beams (default is column_property).
+    :param segments: Number of beam elements along each member.
+    :return: Mesh.
+    """
+    if beam_property is None:
+        beam_property = column_property
+    bay_widths, story_heights = _spacing(bay_widths), _spacing(story_heights)
+    x = np.concatenate([[0], np.cumsum(bay_widths)])
+    y = np.concatenate([[0], np.cumsum(story_heights)])
+    joints = np.stack(np.meshgrid(x, y), axis=-1).reshape(-1, 2)
+    grid = np.arange(len(joints)).reshape(len(y), len(x))
+
+    columns = np.column_stack([grid[:-1].ravel(), grid[1:].ravel()])
+    beams = np.column_stack([grid[1:, :-1].ravel(), grid[1:, 1:].ravel()])
+    members = np.concatenate([columns, beams])
+    coords, connectivity = _subdivide(joints, members, segments)
+    property_index = np.repeat(np.r_[np.zeros(len(columns), dtype=np.int64), np.ones(len(beams), dtype=np.int64)],
+                               segments)
+
+    mesh = Mesh(coords)
+    mesh.add_elements(ElementBeamSet, connectivity, [column_property, beam_property], property_index)
+    mesh.node_sets['base'] = grid[0]
+    for floor in range(1, len(y)):
+        mesh.node_sets[f'floor_{floor}'] = grid[floor]
+    mesh.node_sets['roof'] = grid[-1]
+    return mesh
+
+
+def _spacing(values):
+    """
+    Expand a (size, count) tuple into a list of equal sizes.
+    """
+    if isinstance(values, tuple) and len(values) == 2 and isinstance(values[1], (int, np.integer)):
+        return np.full(values[1], float(values[0]))
+    return np.asarray(values, dtype=float)
+
+
+def _subdivide(coords, members, segments):
+    """
+    Split every member into equal segments, adding the interior nodes after the joints.
+
+    :return: Tuple (coords, connectivity) with the segments of each member in order.
+    """
+    if segments == 1:
+        return coords, members
+    t = np.arange(1, segments) / segments
+    start, end = coords[members[:, 0]], coords[members[:, 1]]
+    interior = start[:, None] + t[None, :, None] * (end - start)[:, None]
+    interior_index = len(coords) + np.arange(len(members) * (segments - 1)).reshape(len(members), segments - 1)
+    chain = np.column_stack([members[:, 0], interior_index, members[:, 1]])
+    connectivity = np.stack([chain[:, :-1], chain[:, 1:]], axis=-1).reshape(-1, 2)
+    return np.concatenate([coords, interior.reshape(-1, 2)]), connectivity
+
+
+def _membrane_mesh(coords, grid, property, set_class):
+    """
+    Mesh the cells of a structured grid of nodes with membrane elements.
+
+    :param coords: Node coordinates, shape (n_nodes, 2).
+    :param grid: Node indices, shape (rows, columns), with rows along y (or theta) and columns
+                 along x (or r). Quadratic elements span 2 x 2 grid cells.
+    :param property: Membrane property of the elements.
+    :param set_class: ElementMembraneSet subclass.
+    :return: Tuple (mesh, grid) with the grid renumbered to the mesh nodes; nodes left out of
+             the mesh (the cell centers of Q8 elements) are -1.
+    """
+    if set_class is ElementCSTSet:
+        connectivity = _split_quads(grid)
+    else:
+        step = set_class.degree
+        corner = lambda i, j: grid[i:grid.shape[0] - step + i:step, j:grid.shape[1] - step + j:step].ravel()
+        a, b, c, d = corner(0, 0), corner(0, step), corner(step, step), corner(step, 0)
+        if set_class is ElementQ4Set:
+            connectivity = np.column_stack([a, b, c, d])
+        else:
+            ab, bc, cd, da, center = corner(0, 1), corner(1, 2), corner(2, 1), corner(1, 0), corner(1, 1)
+            if set_class is ElementQ8Set:
+                connectivity = np.column_stack([a, b, c, d, ab, bc, cd, da])
+            elif set_class is ElementT6Set:
+                connectivity = np.concatenate([np.column_stack([a, b, c, ab, bc, center]),
+                                               np.column_stack([a, c, d, center, cd, da])])
+            else:
+                raise ValueError(f"Unsupported element type {set_class.__name__}.")
+
+    # Drop the nodes no element uses
+    used = np.zeros(len(coords), dtype=bool)
+    used[connectivity.ravel()] = True
+    renumber = np.full(len(coords), -1, dtype=np.int64)
+    renumber[used] = np.arange(np.count_nonzero(used))
+
+    mesh = Mesh(coords[used])
+    mesh.add_elements(set_class, renumber[connectivity], property)
+    return mesh, renumber[grid]
+
+
+def _split_quads(grid):
+    """
+    Split the cells of a structured grid of node indices into two counter-clockwise triangles each.
+
+    :param grid: Node indices, shape (rows, columns), with rows along y (or theta) and columns along x (or r).
+    :return: Connectivity of shape (2 * n_cells, 3).
+    """
+    a, b = grid[:-1, :-1].ravel(), grid[:-1, 1:].ravel()
+    c, d = grid[1:, 1:].ravel(), grid[1:, :-1].ravel()
+    return np.concatenate([np.column_stack([a, b, c]), np.column_stack([a, c, d])])
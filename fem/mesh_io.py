@@ -0,0 +1,339 @@
+import os
+import numpy as np
+from fem.element import ELEMENT_CLASSES
+from fem.element_set import ElementRodSet, ElementCSTSet, ElementQ4Set, ElementQ8Set, ElementT6Set
+from fem.mesh import Mesh
+
+# Number of nodes of the Gmsh element types, needed to step over blocks that are not loaded
+GMSH_NODES_PER_ELEMENT = {1: 2, 2: 3, 3: 4, 4: 4, 5: 8, 6: 6, 7: 5, 8: 3, 9: 6, 10: 9, 11: 10, 15: 1, 16: 8}
+GMSH_LINE = 1
+GMSH_TRIANGLE = 2
+GMSH_QUADRANGLE = 3
+GMSH_TRIANGLE6 = 9
+GMSH_QUADRANGLE8 = 16
+# Gmsh orders the corners counter-clockwise, then the midside nodes, like the element sets
+GMSH_MEMBRANE_TYPES = {GMSH_TRIANGLE: ElementCSTSet, GMSH_TRIANGLE6: ElementT6Set,
+                       GMSH_QUADRANGLE: ElementQ4Set, GMSH_QUADRANGLE8: ElementQ8Set}
+
+
+def read_gmsh(path, line_property=None, triangle_property=None, line_class=ElementRodSet, quad_property=None):
+    """
+    Read a Gmsh .msh file (format 4.1 ASCII or binary, or 2.2 ASCII) into a Mesh.
+
+    The node and element sections are parsed in bulk into arrays, without creating an object
+    per entity. Nodes keep the order of the file; only 2-node lines, 3- and 6-node triangles
+    and 4- and 8-node quadrangles are loaded, each type only when a property is given for it.
+
+    :param path: Path of the .msh file.
+    :param line_property: Property object (or list) of the line elements. Lines are skipped if None.
+    :param triangle_property: Property object (or list) of the triangles (CST or T6). Triangles are skipped if None.
+    :param line_class: ElementSet subclass used for the lines, ElementRodSet or ElementBeamSet.
+    :param quad_property: Property object (or list) of the quadrangles (Q4 or Q8). Quadrangles are skipped if None.
+    :return: Mesh.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    header = _gmsh_section(data, b'MeshFormat')
+    version, file_type, data_size = header.split()[:3]
+    version, binary = float(version), int(file_type) == 1
+    if version >= 4:
+        if binary:
+            if int(data_size) != 8:
+                raise ValueError(f"Unsupported Gmsh data size {data_size.decode()}.")
+            tags, coords, blocks = _read_gmsh4_binary(data)
+        else:
+            tags, coords, blocks = _read_gmsh4_ascii(data)
+    elif version >= 2 and not binary:
+        tags, coords, blocks = _read_gmsh2_ascii(data)
+    else:
+        raise ValueError(f"Unsupported Gmsh format {version} ({'binary' if binary else 'ASCII'}).")
+
+    # Node tags are not necessarily contiguous; map them to positions in the file
+    index = np.full(int(tags.max(initial=0)) + 1, -1, dtype=np.int64)
+    index[tags] = np.arange(len(tags))
+
+    mesh = Mesh(coords)
+    loaded = [(GMSH_LINE, line_class, line_property)]
+    for element_type, set_class in GMSH_MEMBRANE_TYPES.items():
+        loaded.append((element_type, set_class, quad_property if set_class.nodes_per_element in (4, 8) else triangle_property))
+    for element_type, set_class, properties in loaded:
+        connectivity = [node_tags for block_type, node_tags in blocks if block_type == element_type and len(node_tags)]
+        if properties is None or not connectivity:
+            continue
+        connectivity = index[np.concatenate(connectivity)]
+        if np.any(connectivity < 0):
+            raise ValueError(f"{path} has elements referring to undefined nodes.")
+        mesh.add_elements(set_class, connectivity, properties)
+    return mesh
+
+
+def _gmsh_section(data, name):
+    """
+    Locate the body of a $<name> ... $End<name> section of a Gmsh file.
+
+    :return: The bytes of the section body.
+    """
+    begin = data.find(b'$' + name)
+    if begin < 0:
+        raise ValueError(f"Gmsh file has no ${name.decode()} section.")
+    begin = data.index(b'\n', begin) + 1
+    end = data.find(b'$End' + name, begin)
+    return data[begin:end]
+
+
+def _read_gmsh4_ascii(data):
+    """
+    Parse the nodes and elements of a Gmsh 4.1 ASCII file. Both sections contain only numbers,
+    so each is read in one pass and walked block by block.
+
+    :return: Tuple (node_tags, coords, blocks) with blocks a list of (element_type, node_tags).
+    """
+    values = np.fromstring(_gmsh_section(data, b'Nodes'), sep=' ')
+    n_blocks, n_nodes = int(values[0]), int(values[1])
+    tags = np.empty(n_nodes, dtype=np.int64)
+    coords = np.empty((n_nodes, 3))
+    cursor, filled = 4, 0
+    for _ in range(n_blocks):
+        dim, _, parametric, n = values[cursor:cursor + 4].astype(np.int64)
+        cursor += 4
+        tags[filled:filled + n] = values[cursor:cursor + n]
+        cursor += n
+        width = 3 + (dim if parametric else 0)
+        coords[filled:filled + n] = values[cursor:cursor + n * width].reshape(n, width)[:, :3]
+        cursor += n * width
+        filled += n
+
+    values = np.fromstring(_gmsh_section(data, b'Elements'), sep=' ')
+    blocks = []
+    cursor = 4
+    for _ in range(int(values[0])):
+        _, _, element_type, n = values[cursor:cursor + 4].astype(np.int64)
+        cursor += 4
+        width = 1 + _gmsh_nodes_per_element(element_type)
+        rows = values[cursor:cursor + n * width].reshape(n, width)
+        blocks.append((element_type, rows[:, 1:].astype(np.int64)))
+        cursor += n * width
+    return tags, coords[:, :2], blocks
+
+
+def _read_gmsh4_binary(data):
+    """
+    Parse the nodes and elements of a Gmsh 4.1 binary file (8-byte size_t, native byte order).
+
+    :return: Tuple (node_tags, coords, blocks) with blocks a list of (element_type, node_tags).
+    """
+    block_header = np.dtype([('dim', 'i4'), ('tag', 'i4'), ('kind', 'i4'), ('n', 'u8')])
+
+    cursor = data.index(b'\n', data.index(b'$Nodes')) + 1
+    n_blocks, n_nodes = np.frombuffer(data, np.uint64, 4, cursor)[:2].astype(np.int64)
+    cursor += 32
+    tags = np.empty(n_nodes, dtype=np.int64)
+    coords = np.empty((n_nodes, 3))
+    filled = 0
+    for _ in range(n_blocks):
+        dim, _, parametric, n = np.frombuffer(data, block_header, 1, cursor)[0]
+        n = int(n)
+        cursor += block_header.itemsize
+        tags[filled:filled + n] = np.frombuffer(data, np.uint64, n, cursor)
+        cursor += 8 * n
+        width = 3 + (dim if parametric else 0)
+        coords[filled:filled + n] = np.frombuffer(data, np.float64, n * width, cursor).reshape(n, width)[:, :3]
+        cursor += 8 * n * width
+        filled += n
+
+    cursor = data.index(b'\n', data.index(b'$Elements', cursor)) + 1
+    n_blocks = int(np.frombuffer(data, np.uint64, 1, cursor)[0])
+    cursor += 32
+    blocks = []
+    for _ in range(n_blocks):
+        _, _, element_type, n = np.frombuffer(data, block_header, 1, cursor)[0]
+        n = int(n)
+        cursor += block_header.itemsize
+        width = 1 + _gmsh_nodes_per_element(element_type)
+        rows = np.frombuffer(data, np.uint64, n * width, cursor).reshape(n, width)
+        blocks.append((int(element_type), rows[:, 1:].astype(np.int64)))
+        cursor += 8 * n * width
+    return tags, coords[:, :2], blocks
+
+
+def _read_gmsh2_ascii(data):
+    """
+    Parse the nodes and elements of a Gmsh 2.2 ASCII file. Element lines have a variable
+    number of tags, so the number of values on each line is counted from the raw bytes and the
+    node columns are gathered with fancy indexing.
+
+    :return: Tuple (node_tags, coords, blocks) with blocks a list of (element_type, node_tags).
+    """
+    values = np.fromstring(_gmsh_section(data, b'Nodes'), sep=' ')
+    rows = values[1:].reshape(int(values[0]), 4)
+    tags, coords = rows[:, 0].astype(np.int64), rows[:, 1:3]
+
+    section = _gmsh_section(data, b'Elements')
+    section = section[section.index(b'\n') + 1:]  # Skip the element count
+    values = np.fromstring(section, sep=' ')
+    counts = _values_per_line(section)
+    offsets = np.cumsum(counts) - counts
+    element_type = values[offsets + 1].astype(np.int64)
+    first_node = offsets + 3 + values[offsets + 2].astype(np.int64)
+
+    blocks = []
+    for kind in (GMSH_LINE, *GMSH_MEMBRANE_TYPES):
+        selected = element_type == kind
+        columns = first_node[selected, None] + np.arange(GMSH_NODES_PER_ELEMENT[kind])
+        blocks.append((kind, values[columns].astype(np.int64)))
+    return tags, coords, blocks
+
+
+def _values_per_line(text):
+    """
+    Count the whitespace-separated values on each non-empty line of a block of text.
+
+    :param text: Bytes of the text.
+    :return: Array with the number of values of each non-empty line.
+    """
+    buffer = np.frombuffer(text, dtype=np.uint8)
+    space = np.isin(buffer, np.frombuffer(b' \t\r\n', dtype=np.uint8))
+    starts = ~space
+    starts[1:] &= space[:-1]
+    line = np.cumsum(buffer == ord('\n')) - (buffer == ord('\n'))
+    counts = np.bincount(line[starts], minlength=line[-1] + 1 if len(line) else 0)
+    return counts[counts > 0]
+
+
+def _gmsh_nodes_per_element(element_type):
+    if element_type not in GMSH_NODES_PER_ELEMENT:
+        raise ValueError(f"Unsupported Gmsh element type {element_type}.")
+    return GMSH_NODES_PER_ELEMENT[element_type]
+
+
+def read_csv(nodes_path, elements_path, properties, set_class=None, delimiter=','):
+    """
+    Read a mesh from CSV node and element tables. A header line is skipped if present.
+
+    The node table has x, y columns (further columns are ignored), and a node is referred to
+    by its 0-based row. The element table has one column per element node, optionally
+    followed by the index of the element's property in properties.
+
+    :param nodes_path: Path of the node table.
+    :param elements_path: Path of the element table.
+    :param properties: Property object or list of Property objects.
+    :param set_class: ElementSet subclass of the elements. If None, it follows from the number
+                      of columns: 2 for ElementRodSet, 3 for ElementCSTSet (no property column).
+    :param delimiter: Column delimiter.
+    :return: Mesh.
+    """
+    coords = _read_table(nodes_path, delimiter, float)[:, :2]
+    table = _read_table(elements_path, delimiter, np.int64)
+    if set_class is None:
+        set_class = {2: ElementRodSet, 3: ElementCSTSet}.get(table.shape[1])
+        if set_class is None:
+            raise ValueError(f"Cannot infer the element type of a table with {table.shape[1]} columns.")
+
+    n = set_class.nodes_per_element
+    property_index = table[:, n] if table.shape[1] > n else None
+    mesh = Mesh(coords)
+    mesh.add_elements(set_class, table[:, :n], properties, property_index)
+    return mesh
+
+
+def _read_table(path, delimiter, dtype):
+    with open(path) as file:
+        first_line = file.readline()
+    try:
+        [float(value) for value in first_line.split(delimiter)]
+        skiprows = 0
+    except ValueError:
+        skiprows = 1
+    return np.loadtxt(path, delimiter=delimiter, dtype=dtype, skiprows=skiprows, ndmin=2)
+
+
+def save_mesh(mesh, path, properties=None):
+    """
+    Save a mesh in the native format: a directory of .npy files, which can be memory-mapped
+    when loaded, or a single .npz archive if path ends with .npz.
+
+    Node sets are saved with the mesh. Properties are Python objects and are not saved; each element stores the index of its
+    property in properties, and the property names are saved to check the list on loading.
+
+    :param mesh: Mesh object.
+    :param path: Directory or .npz file name.
+    :param properties: List of Property objects (default is the properties of all element
+                       sets, in order of first use).
+    """
+    if properties is None:
+        properties = []
+        for element_set in mesh.element_sets:
+            properties += [p for p in element_set.properties if all(p is not q for q in properties)]
+
+    arrays = {
+        'coords': mesh.coords,
+        'element_sets': np.array([type(s).__name__ for s in mesh.element_sets], dtype=str),
+        'property_names': np.array([p.name for p in properties], dtype=str),
+    }
+    for name, nodes in mesh.node_sets.items():
+        arrays[f'node_set_{name}'] = nodes
+    for i, element_set in enumerate(mesh.element_sets):
+        lookup = np.array([next(j for j, q in enumerate(properties) if q is p) for p in element_set.properties],
+                          dtype=np.int64)
+        arrays[f'connectivity_{i}'] = element_set.connectivity
+        arrays[f'property_index_{i}'] = lookup[element_set.property_index]
+        arrays[f'ids_{i}'] = element_set.ids
+
+    if str(path).endswith('.npz'):
+        np.savez(path, **arrays)
+        return
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f'{name}.npy'), array)
+
+
+def load_mesh(path, properties, mmap_mode='r'):
+    """
+    Load a mesh saved by save_mesh. The arrays of a .npy directory are memory-mapped, so
+    reopening a large mesh only reads what is used. The node coordinates are mapped
+    copy-on-write, so moving nodes does not change the file. The coordinates of each element
+    and the element matrices are computed on first use.
+
+    :param path: Directory or .npz file written by save_mesh.
+    :param properties: List of Property objects, in the order used when saving.
+    :param mmap_mode: Memory-map mode for .npy files (None reads them into memory).
+                      .npz archives are always read into memory.
+    :return: Mesh.
+    """
+    if str(path).endswith('.npz'):
+        archive = np.load(path)
+        load = lambda name: archive[name]
+        stored = archive.files
+    else:
+        load = lambda name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+        stored = [file[:-4] for file in os.listdir(path) if file.endswith('.npy')]
+
+    if not isinstance(properties, (list, tuple)):
+        properties = [properties]
+    names = load('property_names')
+    if len(names) != len(properties):
+        raise ValueError(f"{path} uses {len(names)} properties {names.tolist()}, but {len(properties)} were given.")
+
+    set_classes = {set_class.__name__: set_class for set_class in ELEMENT_CLASSES}
+    if str(path).endswith('.npz') or mmap_mode != 'r':
+        mesh = Mesh(load('coords'))
+    else:
+        mesh = Mesh(np.load(os.path.join(path, 'coords.npy'), mmap_mode='c'))
+    for i, name in enumerate(load('element_sets')):
+        connectivity = load(f'connectivity_{i}')
+        property_index = load(f'property_index_{i}')
+        if len(properties) > 1:
+            # Give each set only the properties it uses, so their values can be gathered per set
+            used = np.flatnonzero(np.bincount(property_index, minlength=len(properties)))
+            lookup = np.zeros(len(properties), dtype=np.int64)
+            lookup[used] = np.arange(len(used))
+            set_properties, property_index = [properties[j] for j in used], lookup[property_index]
+        else:
+            set_properties = list(properties)
+        element_set = set_classes[str(name)].from_mesh(mesh.coords, connectivity, set_properties, property_index)
+        mesh.add_element_set(element_set, load(f'ids_{i}'))
+    for name in stored:
+        if name.startswith('node_set_'):
+            mesh.node_sets[name[len('node_set_'):]] = load(name)
+    return mesh
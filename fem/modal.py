@@ -0,0 +1,113 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.linalg import eigh
+from scipy.sparse.linalg import LinearOperator, eigsh
+
+
+class ModalOutput:
+    def __init__(self, model, eigenvalues, shapes, method):
+        """
+        Initialize a ModalOutput, the lowest natural modes of a model.
+
+        :param model: Model object the modes belong to.
+        :param eigenvalues: Squared circular frequencies omega^2 in ascending order, shape (k,).
+        :param shapes: Mass-normalized mode shapes as global displacement vectors (zero at the
+                       constrained DOFs), shape (n_dof, k).
+        :param method: Eigen-solver used, 'lanczos' or 'subspace'.
+        """
+        self.mesh = model.mesh
+        self.eigenvalues = eigenvalues
+        self.shapes = shapes
+        self.method = method
+        self.angular_frequencies = np.sqrt(np.maximum(eigenvalues, 0))  # rad/s
+        self.frequencies = self.angular_frequencies / (2 * np.pi)  # Hz
+        self.periods = np.divide(1, self.frequencies, out=np.full_like(self.frequencies, np.inf),
+                                 where=self.frequencies > 0)
+
+    def nodal_shape(self, mode):
+        """
+        Arrange one mode shape by node, like Output.displacements.
+
+        :param mode: Index of the mode (0 is the lowest).
+        :return: Array of shape (n_nodes, MAX_DOF), zero at DOFs the nodes do not have.
+        """
+        global_dof = self.mesh.global_dof
+        exists = global_dof >= 0
+        shape = np.zeros(global_dof.shape)
+        shape[exists] = self.shapes[global_dof[exists], mode]
+        return shape
+
+    def __len__(self):
+        return len(self.eigenvalues)
+
+    def __repr__(self):
+        return (f"ModalOutput:\n Method = {self.method}\n Modes = {len(self)}\n"
+                f" Frequencies (Hz) = {np.round(self.frequencies, 6).tolist()}\n")
+
+
+def lanczos_modes(K, M, n_modes, sigma, solve=None, tol=0.0):
+    """
+    Compute the eigenpairs of K x = omega^2 M x closest to a shift with shift-invert Lanczos
+    (ARPACK), without any dense decomposition.
+
+    :param K: Reduced stiffness matrix (sparse, dense or linear operator).
+    :param M: Reduced mass matrix.
+    :param n_modes: Number of modes.
+    :param sigma: Shift; the modes with omega^2 closest to it are found.
+    :param solve: Function applying (K - sigma M)^-1, e.g. an existing factorization of K for a
+                  zero shift. If None, ARPACK factorizes K - sigma M itself.
+    :param tol: Relative accuracy of the eigenvalues (0 is machine precision).
+    :return: Tuple (eigenvalues, shapes) in ascending order, shapes M-orthonormal.
+    """
+    n = K.shape[0]
+    OPinv = None if solve is None else LinearOperator((n, n), matvec=solve, matmat=solve, dtype=float)
+    eigenvalues, shapes = eigsh(K, n_modes, M, sigma=sigma, which='LM', OPinv=OPinv, tol=tol)
+    order = np.argsort(eigenvalues)
+    return eigenvalues[order], shapes[:, order]
+
+
+def subspace_modes(K, M, n_modes, solve, sigma=0.0, tol=1e-10, maxiter=200, seed=0):
+    """
+    Compute the eigenpairs of K x = omega^2 M x closest to a shift by subspace iteration: a
+    block of vectors is repeatedly multiplied by (K - sigma M)^-1 M and Rayleigh-Ritz projected.
+
+    :param K: Reduced stiffness matrix (sparse, dense or linear operator).
+    :param M: Reduced mass matrix.
+    :param n_modes: Number of modes.
+    :param solve: Function applying (K - sigma M)^-1 to a block of vectors.
+    :param sigma: Shift used by solve.
+    :param tol: Relative change of the eigenvalues at convergence.
+    :param maxiter: Maximum number of iterations.
+    :param seed: Seed of the random starting block.
+    :return: Tuple (eigenvalues, shapes) in ascending order, shapes M-orthonormal.
+    """
+    n = K.shape[0]
+    q = min(n, max(2 * n_modes, n_modes + 8))  # Extra vectors speed up convergence of the last modes
+    X = np.random.default_rng(seed).standard_normal((n, q))
+    previous = np.full(n_modes, np.inf)
+    for _ in range(maxiter):
+        Y = np.linalg.qr(np.asarray(solve(M @ X)).reshape(n, q))[0]  # Orthonormal basis keeps M_r well conditioned
+        K_r = Y.T @ (K @ Y)
+        M_r = Y.T @ (M @ Y)
+        mu, phi = eigh((K_r + K_r.T) / 2, (M_r + M_r.T) / 2)
+        order = np.argsort(np.abs(mu - sigma), kind='stable')  # Iteration converges to the modes closest to the shift
+        mu, phi = mu[order], phi[:, order]
+        X = Y @ phi
+        eigenvalues = mu[:n_modes]
+        if np.all(np.abs(eigenvalues - previous) <= tol * np.abs(eigenvalues)):
+            break
+        previous = eigenvalues
+    order = np.argsort(eigenvalues)
+    return eigenvalues[order], X[:, :n_modes][:, order]
+
+
+def reduced_mass(M, free):
+    """
+    Extract the free-free block of the global mass matrix.
+
+    :param M: Global mass matrix (sparse or dense).
+    :param free: Global indices of the free DOFs.
+    """
+    if sp.issparse(M):
+        return sp.csr_matrix(M)[free][:, free]
+    return M[np.ix_(free, free)]
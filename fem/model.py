@@ -1,41 +1,147 @@
+import os
 import numpy as np
+import scipy.sparse as sp
+from fem.assembly import AssemblyPlan
+from fem.boundary_condition import LoadCase
+from fem.element_set import ElementSuperSet
+from fem.mesh import Mesh
+from fem.modal import ModalOutput, lanczos_modes, reduced_mass, subspace_modes
+from fem.nonlinear import (CorotationalSystem, NonlinearOutput, NonlinearStatistics, TangentOperator,
+                           equilibrium_path)
+from fem.operator import ElementOperator
 from fem.output import Output
+from fem.partition import PartitionedSystem
+from fem.renumbering import RenumberingReport, envelope, reverse_cuthill_mckee_order
+from fem.solver import DirectSolver, PCGSolver
+from fem.superelement import condense_substructures
+from fem.telemetry import NO_PHASE, Phase, TelemetryRecorder
+from fem.transient import (HistoryWriter, LoadHistory, TransientOutput, effective_coefficients, history_paths,
+                           newmark_parameters, newmark_steps)
 
 class Model:
-    def __init__(self, nodes=None, materials=None, properties=None, elements=None, loads=None, constraints=None, name='MyModel'):
+    def __init__(self, nodes=None, materials=None, properties=None, elements=None, loads=None, constraints=None, name='MyModel', sparse=True, solver=None, renumber=False, matrix_free=False, mesh=None, observers=None, telemetry=False, workers=None):
         """
         Initialize the finite element model.
 
-        :param nodes: List of Node objects.
+        :param nodes: List of Node objects (ignored when a mesh is given).
         :param materials: List of Material objects.
         :param properties: List of Property objects.
-        :param elements: List of Element objects.
+        :param elements: List of Element objects (ignored when a mesh is given).
         :param loads: List of NodalLoad objects.
         :param constraints: List of NodalConstraint objects.
         :param name: Name of the model.
+        :param sparse: If True, assemble the global stiffness matrix in CSR format and solve it with a
+                       sparse direct factorization. Dense storage is only worthwhile for tiny models.
+        :param solver: Solver object used for the reduced system (default is DirectSolver, or
+                       PCGSolver with Jacobi preconditioning for matrix-free models).
+        :param renumber: If True, renumber the nodes with Reverse Cuthill-McKee before assigning
+                         global DOFs, to reduce the bandwidth and profile of the stiffness matrix.
+        :param matrix_free: If True, never assemble the global stiffness matrix; K is an
+                            ElementOperator applying K @ v element by element, and the reduced
+                            system must be solved iteratively.
+        :param mesh: Optional Mesh holding the nodes and elements as arrays. model.nodes and
+                     model.elements are then lightweight views over it.
+        :param observers: Optional list of SolveObserver objects notified around each solve phase.
+        :param telemetry: If True (or a TelemetryRecorder to configure it), record the wall time,
+                          matrix sizes, condition estimate and residual of each solve phase in
+                          output.telemetry. Without observers the phases cost nothing extra.
+        :param workers: Number of threads of the stiffness assembly and of processes condensing
+                        substructures (default is the number of CPUs). Results do not depend on it.
         """
-        self.nodes = nodes or []
+        if mesh is None:
+            self.nodes = nodes or []
+            self.elements = elements or []
+            self.mesh = Mesh.from_objects(self.nodes, self.elements)
+        else:
+            self.nodes = mesh.nodes
+            self.elements = mesh.elements
+            self.mesh = mesh
         self.materials = materials or []
         self.properties = properties or []
-        self.elements = elements or []
         self.loads = loads or []
         self.constraints = constraints or []
         self.name = name
+        self.sparse = sparse
+        self.matrix_free = matrix_free
+        self.solver = solver or (PCGSolver() if matrix_free else DirectSolver())
+        self.renumber = renumber
+        self.renumbering_report = None
+        self.partition = None  # PartitionedSystem of the last solve
+        self.load_cases = None  # Load cases of the last solve
+        self._partitions = {}  # PartitionedSystem per constraint set of the current K
+        self.workers = workers or os.cpu_count() or 1
+        self.assembly_plan = None  # AssemblyPlan of the current mesh and DOF numbering
+
+        self.observers = list(observers or [])
+        self.recorder = None
+        if telemetry:
+            self.recorder = telemetry if isinstance(telemetry, TelemetryRecorder) else TelemetryRecorder()
+            self.observers.append(self.recorder)
 
         self.K = None  # Global stiffness matrix
+        self.M = None  # Global mass matrix, assembled for dynamic analyses
         self.F = None  # Global force vector
         self.q = None  # Global displacement vector
 
+        # IDs of the boundary conditions are scoped to the model
+        for i, constraint in enumerate(self.constraints):
+            constraint.id = i
+        for i, load in enumerate(self.loads):
+            load.id = i
+
+    def __getstate__(self):
+        # Factorizations hold solver closures; they are rebuilt after unpickling (e.g. in a process pool)
+        state = dict(self.__dict__)
+        state['_partitions'] = {}
+        state['partition'] = None
+        return state
+
+    def _notify(self, event):
+        """
+        Call the solve_started or solve_finished hook of every observer.
+        """
+        for observer in self.observers:
+            getattr(observer, event)(self)
+
+    def _phase(self, name):
+        """
+        Context notifying the observers around a solve phase.
+
+        :param name: Name of the phase.
+        """
+        return Phase(self, name) if self.observers else NO_PHASE
+
+    def update_mesh(self):
+        """
+        Rebuild the mesh from the node and element lists if they were changed since it was built.
+        Models created from a Mesh are always up to date.
+        """
+        mesh = self.mesh
+        if self.nodes is mesh.nodes:
+            return
+        up_to_date = (len(self.nodes) == mesh.n_nodes and len(self.elements) == mesh.n_elements
+                      and all(node.mesh is mesh and node.index == i for i, node in enumerate(self.nodes))
+                      and all(e.element_set is not None and e.element_set.mesh is mesh and e.id == i
+                              and e.property is e.element_set.properties[e.element_set.property_index[e.set_index]]
+                              for i, e in enumerate(self.elements)))
+        if not up_to_date:
+            self.mesh = Mesh.from_objects(self.nodes, self.elements)
+
     def assign_global_dof(self):
         """
         Assign global degrees of freedom (DOF) to each node and initialize global matrices.
+        With renumbering enabled, nodes are numbered in Reverse Cuthill-McKee order; results are
+        still read back through node.global_dof, so the numbering is transparent to Output.
         """
-        global_dof = 0
-        for node in self.nodes:
-            node.global_dof = [global_dof + i for i in range(node.dof)]
-            global_dof += node.dof
-        
-        self._initialize_global_matrices(global_dof)
+        with self._phase('assign_global_dof'):
+            self.update_mesh()
+            order = None
+            if self.renumber:
+                order = reverse_cuthill_mckee_order(self.mesh)
+                self.renumbering_report = RenumberingReport(*envelope(self.mesh), *envelope(self.mesh, order))
+
+            global_dof = self.mesh.assign_global_dof(order)
+            self._initialize_global_matrices(global_dof)
 
     def _initialize_global_matrices(self, size):
         """
@@ -43,83 +149,548 @@ class Model:
 
         :param size: Total number of global degrees of freedom.
         """
-        self.K = np.zeros((size, size))  # Global stiffness matrix
+        if self.matrix_free:
+            self.K = ElementOperator([], size)  # Global stiffness operator
+        elif self.sparse:
+            self.K = sp.csr_matrix((size, size))  # Global stiffness matrix
+        else:
+            self.K = np.zeros((size, size))  # Global stiffness matrix
         self.F = np.full((size, 1), np.nan)  # Global force vector
         self.q = np.full((size, 1), np.nan)  # Global displacement vector
 
     def assemble_stiffness_matrix(self):
         """
         Assemble the global stiffness matrix by summing element stiffness matrices.
+
+        Elements are processed in batched element sets: the stiffness matrices of a set are
+        computed in one vectorized pass and scattered into the global matrix by an AssemblyPlan,
+        built once per mesh and DOF numbering. The plan colors the elements so that batches of
+        one color share no node and are scattered in parallel on self.workers threads, with a
+        result bitwise identical to a serial assembly. Matrix-free models keep the blocks in an
+        ElementOperator instead.
+        """
+        superelements = [s for s in self.mesh.element_sets if isinstance(s, ElementSuperSet)]
+        if superelements:
+            self.condense_substructures(superelements)
+        with self._phase('assemble_stiffness_matrix'):
+            self._partitions = {}
+            if self.matrix_free:
+                self.K = ElementOperator(self._element_blocks(), self.K.shape[0])
+                return
+
+            matrices = [element_set.compact('K_global_coord') for element_set in self.mesh.element_sets]
+            self.K = self._assembly_plan().assemble(matrices, self.workers)
+
+    def _assembly_plan(self):
+        """
+        Get the AssemblyPlan of the current mesh and DOF numbering, building it if needed.
+        """
+        plan = self.assembly_plan
+        if plan is None or plan.dense == self.sparse or not plan.matches(self.mesh):
+            plan = self.assembly_plan = AssemblyPlan(self.mesh, self.K.shape[0], dense=not self.sparse)
+        return plan
+
+    def assemble_mass_matrix(self, lumped=False):
+        """
+        Assemble the global mass matrix from the element mass matrices, in the storage of the
+        stiffness matrix (sparse CSR unless the model is dense; matrix-free models use CSR too).
+        Requires assigned global DOFs and a density on every material.
+
+        :param lumped: If True, use diagonal lumped element mass matrices.
+        """
+        with self._phase('assemble_mass_matrix'):
+            size = self.K.shape[0]
+            triplets = _triplets(self._mass_blocks(lumped))
+            rows, cols, values = triplets if triplets is not None else ([], [], [])
+            if self.sparse or self.matrix_free:
+                self.M = sp.coo_matrix((values, (rows, cols)), shape=(size, size)).tocsr()
+            else:
+                self.M = np.zeros((size, size))
+                np.add.at(self.M, (rows, cols), values)
+
+    def condense_substructures(self, superelements):
+        """
+        Condense the substructures of superelement sets whose matrices are not computed yet.
+        Distinct substructures missing from their cache are condensed in parallel on up to
+        self.workers processes.
+
+        :param superelements: List of ElementSuperSet objects.
+        """
+        pending = [s for s in superelements if 'K_global_coord' not in vars(s)]
+        if pending:
+            with self._phase('condense'):
+                condense_substructures([s.substructure for s in pending], self.workers)
+
+    def _mass_blocks(self, lumped=False):
         """
-        for element in self.elements:
-            element_dofs = self._get_element_dofs(element)
-            self._add_element_stiffness_to_global(element, element_dofs)
+        Collect the batched element mass matrices and their global DOF maps.
 
-    def _get_element_dofs(self, element):
+        :return: List of (M_e, dofs) pairs with shapes (N, k, k) and (N, k).
         """
-        Get the global DOFs for the nodes of an element.
+        return [(element_set.mass_matrices(lumped), self.mesh.element_dofs(element_set)) for element_set in self.mesh.element_sets]
 
-        :param element: Element object.
-        :return: List of global DOFs.
+    def _element_blocks(self):
         """
-        return [dof for node in element.nodes for dof in node.global_dof]
+        Collect the batched element stiffness matrices and their global DOF maps.
 
-    def _add_element_stiffness_to_global(self, element, dofs):
+        :return: List of (K_e, dofs) pairs with shapes (N, k, k) and (N, k).
         """
-        Add the element stiffness matrix to the global stiffness matrix.
+        return [(element_set.K_global_coord, self.mesh.element_dofs(element_set)) for element_set in self.mesh.element_sets]
 
-        :param element: Element object.
-        :param dofs: Global DOFs associated with the element.
+    def _add_element_stiffness_to_global(self, rows, cols, values):
         """
-        for i, dof1 in enumerate(dofs):
-            for j, dof2 in enumerate(dofs):
-                self.K[dof1, dof2] += element.K_global_coord[i, j]
+        Add element stiffness triplets to the global stiffness matrix.
+        Duplicate (row, column) pairs are summed.
+
+        :param rows: Global row DOF of each entry.
+        :param cols: Global column DOF of each entry.
+        :param values: Stiffness value of each entry.
+        """
+        if self.sparse:
+            self.K = self.K + sp.coo_matrix((values, (rows, cols)), shape=self.K.shape).tocsr()
+        else:
+            np.add.at(self.K, (rows, cols), values)
 
     def assemble_displacements_vector(self):
         """
         Assemble the global displacement vector based on nodal constraints.
         """
-        for constraint in self.constraints:
-            node = self.nodes[constraint.node]
-            self.q[node.global_dof[constraint.dof]] = constraint.value
+        with self._phase('assemble_displacements_vector'):
+            if self.constraints:
+                dofs, values = self._boundary_condition_dofs(self.constraints)
+                self.q[dofs, 0] = values
+
+    def _boundary_condition_dofs(self, conditions):
+        """
+        Look up the global DOFs of nodal constraints or loads.
 
-    def assemble_force_vector(self):
+        :param conditions: List of NodalConstraint or NodalLoad objects.
+        :return: Tuple (dofs, values) of arrays.
+        """
+        nodes = np.array([condition.node for condition in conditions], dtype=np.int64)
+        dofs = np.array([condition.dof for condition in conditions], dtype=np.int64)
+        values = np.array([condition.value for condition in conditions], dtype=float)
+        return self.mesh.global_dof[nodes, dofs], values
+
+    def assemble_force_vector(self, load_cases=None):
         """
         Assemble the global force vector based on applied loads.
+        Each load case fills one column of the force vector, and the displacement vector is
+        widened to the same number of columns.
+
+        :param load_cases: List of LoadCase objects (default is one case built from self.loads).
         """
-        # Set force to zero where displacements are prescribed
-        self.F[np.isnan(self.q)] = 0  
-        
-        for load in self.loads:
-            node = self.nodes[load.node]
-            self.F[node.global_dof[load.dof]] = load.value
+        with self._phase('assemble_force_vector'):
+            if load_cases is None:
+                load_cases = [LoadCase(self.name, self.loads)]
+            self.q = np.repeat(self.q[:, :1], len(load_cases), axis=1)
+            self.F = np.repeat(self.F[:, :1], len(load_cases), axis=1)
+
+            # Set force to zero where displacements are prescribed
+            self.F[np.isnan(self.q)] = 0  
+            
+            for column, load_case in enumerate(load_cases):
+                if load_case.loads:
+                    dofs, values = self._boundary_condition_dofs(load_case.loads)
+                    self.F[dofs, column] = values
+
+            # Loads inside elements (e.g. condensed substructure loads) act in every load case
+            for element_set in self.mesh.element_sets:
+                vectors = element_set.load_vectors()
+                if vectors is not None:
+                    total = np.bincount(self.mesh.element_dofs(element_set).ravel(), vectors.ravel(), minlength=len(self.F))
+                    self.F += total[:, None]
 
-    def solve_eqs(self):
+    def partition_system(self, dof_free):
         """
-        Solve for the unknown displacements using the reduced system of equations.
+        Get the PartitionedSystem of the current stiffness matrix for a set of free DOFs.
+        It is built once per constraint set and reused until the stiffness matrix is reassembled.
+
+        :param dof_free: Boolean mask of the free global DOFs.
+        :return: PartitionedSystem object.
         """
-        dof_free = np.isnan(self.q).flatten()  # Indices of free DOFs
-        K_reduced = self.K[dof_free][:, dof_free]  # Reduced stiffness matrix
-        F_reduced = self.F[dof_free]  # Reduced force vector
-        
-        q_reduced = np.linalg.solve(K_reduced, F_reduced)  # Solve for unknown displacements
-        
-        self.q[dof_free] = q_reduced.reshape(-1, 1)  # Update displacement vector
-        self.F = np.dot(self.K, self.q)  # Update the force vector for all DOFs
+        with self._phase('partition'):
+            key = dof_free.tobytes()
+            if key not in self._partitions:
+                self._partitions[key] = PartitionedSystem(self.K, dof_free)
+            self.partition = self._partitions[key]
+        return self.partition
+
+    def solve_eqs(self, q0=None):
+        """
+        Solve for the unknown displacements using the partitioned system of equations.
+        The free-free stiffness block is factorized once and all columns of the force vector
+        are back-substituted as one block. Non-zero prescribed displacements load the free DOFs
+        through K_fc, and reactions are recovered from K_cf and K_cc only.
+
+        :param q0: Optional global displacement vector (e.g. a previous model.q) used as the
+                   initial guess of iterative solvers.
+        """
+        partition = self.partition_system(np.isnan(self.q[:, 0]))
+        x0 = None
+        if q0 is not None:
+            x0 = np.broadcast_to(np.asarray(q0, dtype=float).reshape(len(self.q), -1)[partition.free],
+                                 (len(partition.free), self.q.shape[1]))
+        self._solve_partitioned(partition, x0)
 
-    def solve(self):
+    def _solve_partitioned(self, partition, x0=None):
+        """
+        Solve the free displacements and the reactions of a partitioned system in place.
+
+        :param partition: PartitionedSystem object.
+        :param x0: Optional initial guess of the free displacements.
+        """
+        free, constrained = partition.free, partition.constrained
+        q_c = self.q[constrained]  # Prescribed displacements
+        with self._phase('factorize'):
+            partition.factorize(self.solver)  # Cached, so the solve below only back-substitutes
+        with self._phase('solve'):
+            self.q[free] = partition.solve(self.solver, self.F[free], q_c, x0)  # Solve for unknown displacements
+        with self._phase('reactions'):
+            self.F[constrained] = partition.reactions(self.q[free], q_c)  # Reactions at the constrained DOFs
+
+    def solve(self, load_cases=None, q0=None):
         """
         Main function to solve the finite element model.
         It assembles the global matrices and solves for displacements.
+
+        With load cases, the stiffness matrix is assembled and factorized once; model.q and
+        model.F then hold one column per case.
         
-        :return: Output object containing results of the solved model.
+        :param load_cases: Optional list of LoadCase objects or dict mapping case names to lists
+                           of NodalLoad objects.
+        :param q0: Optional initial displacement guess for iterative solvers (e.g. a previous model.q).
+        :return: Output object containing results of the solved model, or a dict mapping each
+                 load case name to its Output when load cases are given.
         """
+        if isinstance(load_cases, dict):
+            load_cases = [LoadCase(name, loads) for name, loads in load_cases.items()]
+
+        self._notify('solve_started')
         self.assign_global_dof()
         self.assemble_stiffness_matrix()
         self.assemble_displacements_vector()
+        self.assemble_force_vector(load_cases)
+        self.solve_eqs(q0)
+        self._notify('solve_finished')
+
+        self.load_cases = load_cases
+        return self._outputs()
+
+    def modal_analysis(self, n_modes=6, lumped=False, sigma=0.0, method='lanczos', tol=None):
+        """
+        Compute the natural frequencies and mode shapes closest to a shift (the lowest ones by
+        default) of K x = omega^2 M x on the free DOFs. The constraints are partitioned exactly
+        as in solve_eqs (prescribed values are ignored: constrained DOFs do not move), and with a
+        zero shift the cached factorization of K_ff is reused, so only k modes are ever computed
+        and nothing is decomposed densely.
+
+        :param n_modes: Number of modes.
+        :param lumped: If True, use lumped instead of consistent mass matrices.
+        :param sigma: Shift in (rad/s)^2; the modes with omega^2 closest to it are found.
+        :param method: 'lanczos' (shift-invert Lanczos with ARPACK) or 'subspace' (subspace iteration).
+        :param tol: Relative eigenvalue tolerance (default is machine precision for Lanczos and
+                    1e-10 for subspace iteration).
+        :return: ModalOutput object.
+        """
+        self._notify('solve_started')
+        self.assign_global_dof()
+        self.assemble_stiffness_matrix()
+        self.assemble_mass_matrix(lumped)
+        self.assemble_displacements_vector()
+        partition = self.partition_system(np.isnan(self.q[:, 0]))
+        if n_modes >= len(partition.free):
+            raise ValueError(f"Cannot compute {n_modes} modes of a system with {len(partition.free)} free DOFs.")
+        M_ff = reduced_mass(self.M, partition.free)
+
+        solve = None
+        if sigma == 0:
+            with self._phase('factorize'):
+                solve = partition.factorize(self.solver)
+        elif method == 'subspace' or self.matrix_free:
+            if self.matrix_free:
+                raise ValueError("Matrix-free models only support modal analysis with a zero shift.")
+            with self._phase('factorize_shifted'):
+                solve = self.solver.factorize(partition.K_ff - sigma * M_ff)
+
+        with self._phase('eigensolve'):
+            if method == 'lanczos':
+                eigenvalues, shapes_free = lanczos_modes(partition.K_ff, M_ff, n_modes, sigma, solve, tol or 0.0)
+            elif method == 'subspace':
+                eigenvalues, shapes_free = subspace_modes(partition.K_ff, M_ff, n_modes, solve, sigma, tol or 1e-10)
+            else:
+                raise ValueError(f"Unknown eigen-solver '{method}'.")
+        self._notify('solve_finished')
+
+        shapes = np.zeros((len(partition.dof_free), n_modes))
+        shapes[partition.free] = shapes_free
+        return ModalOutput(self, eigenvalues, shapes, method)
+
+    def transient_analysis(self, dt, n_steps, alpha=0.0, beta=None, gamma=None, lumped=False, mass_damping=0.0,
+                           stiffness_damping=0.0, q0=None, v0=None, every=1, fields=('displacement',), path=None,
+                           buffer_size=2 ** 23, in_memory=False):
+        """
+        Integrate the linear equations of motion M a + C v + K u = F(t) in time with the
+        HHT-alpha method (Newmark average acceleration for alpha = 0), under the model loads
+        scaled by their time functions and Rayleigh damping C = mass_damping M + stiffness_damping K.
+
+        The constraints are partitioned as in solve_eqs (prescribed displacements are held
+        constant), and the effective stiffness m M + k K is factorized once and reused by every
+        step. The history is written every few steps and streamed to one .npy file per field
+        in a directory, in chunks of at most buffer_size bytes, so long runs use a fixed amount
+        of memory; the output reads it back as memory maps. Small runs can keep it in
+        preallocated arrays instead. model.q holds the final displacements.
+
+        :param dt: Time step.
+        :param n_steps: Number of steps.
+        :param alpha: HHT-alpha parameter, -1/3 <= alpha <= 0; negative values damp the high modes.
+        :param beta: Newmark beta (default is (1 - alpha)^2 / 4).
+        :param gamma: Newmark gamma (default is 1/2 - alpha).
+        :param lumped: If True, use lumped instead of consistent mass matrices.
+        :param mass_damping: Mass-proportional Rayleigh damping coefficient.
+        :param stiffness_damping: Stiffness-proportional Rayleigh damping coefficient.
+        :param q0: Optional initial global displacement vector.
+        :param v0: Optional initial global velocity vector.
+        :param every: Record one output step every this many time steps (the first and, if it
+                      falls on the grid, the last step are always recorded).
+        :param fields: Recorded fields among 'displacement', 'velocity' and 'acceleration'.
+        :param path: Directory of the streamed .npy histories. By default they go to a temporary
+                     directory, removed once the histories are released.
+        :param buffer_size: Bytes of history buffered between two writes to disk.
+        :param in_memory: If True, keep the histories in memory arrays instead of files.
+        :return: TransientOutput object.
+        """
+        alpha, beta, gamma = newmark_parameters(alpha, beta, gamma)
+        unknown = set(fields) - {'displacement', 'velocity', 'acceleration'}
+        if unknown:
+            raise ValueError(f"Unknown history fields {sorted(unknown)}.")
+
+        self._notify('solve_started')
+        self.assign_global_dof()
+        self.assemble_stiffness_matrix()
+        self.assemble_mass_matrix(lumped)
+        self.assemble_displacements_vector()
+        partition = self.partition_system(np.isnan(self.q[:, 0]))
+        free, constrained = partition.free, partition.constrained
+        q_c = self.q[constrained, 0]
+        K_ff = partition.K_ff
+        M_ff = reduced_mass(self.M, free)
+
+        with self._phase('initial_acceleration'):
+            loads = self._load_history(partition, q_c)
+            u = np.zeros(len(free)) if q0 is None else np.asarray(q0, dtype=float).ravel()[free]
+            v = np.zeros(len(free)) if v0 is None else np.asarray(v0, dtype=float).ravel()[free]
+            residual = loads.force(loads.factors([0.0])[0]) - K_ff @ u - mass_damping * (M_ff @ v)
+            if stiffness_damping:
+                residual = residual - stiffness_damping * (K_ff @ v)
+            a = self.solver.factorize(M_ff)(residual)
+
+        with self._phase('factorize_effective'):
+            m, k = effective_coefficients(dt, alpha, beta, gamma, mass_damping, stiffness_damping)
+            if self.matrix_free:
+                blocks = [(k * K_e + m * M_e, dofs) for (K_e, dofs), (M_e, _) in zip(self._element_blocks(), self._mass_blocks(lumped))]
+                K_eff = ElementOperator(blocks, self.K.shape[0]).reduce(partition.dof_free)
+            else:
+                K_eff = m * M_ff + k * K_ff
+            solve = self.solver.factorize(K_eff)
+
+        with self._phase('time_integration'):
+            n_out = n_steps // every + 1
+            displacement = self.q[:, 0].copy()
+            templates = {'displacement': displacement, 'velocity': np.zeros_like(displacement),
+                         'acceleration': np.zeros_like(displacement)}
+            rows_per_chunk = max(1, buffer_size // (8 * len(displacement) * max(len(fields), 1)))
+            writers = {field: HistoryWriter(n_out, templates[field], file, rows_per_chunk, path is None)
+                       for field, file in history_paths(path, fields, in_memory).items()}
+            state = {'displacement': u, 'velocity': v, 'acceleration': a}
+            for field, writer in writers.items():
+                writer.append(state[field], free)
+            for step, u, v, a in newmark_steps(solve, M_ff, K_ff, loads, u, v, a, dt, n_steps, alpha, beta, gamma,
+                                               mass_damping, stiffness_damping, self.solver.iterative):
+                if step % every == 0:
+                    state = {'displacement': u, 'velocity': v, 'acceleration': a}
+                    for field, writer in writers.items():
+                        writer.append(state[field], free)
+            histories = {field: writer.close() for field, writer in writers.items()}
+        self._notify('solve_finished')
+
+        self.q = displacement[:, None]
+        self.q[free, 0] = u
+        return TransientOutput(self, dt * every * np.arange(n_out), histories, alpha, beta, gamma)
+
+    def nonlinear_analysis(self, n_steps=10, method='newton', line_search=False, arc_length=False, tol=1e-8,
+                           max_iterations=30, refactor_ratio=0.5, max_updates=20, max_cutbacks=6, max_steps=None):
+        """
+        Follow the equilibrium path of the model under geometrically nonlinear behavior, from
+        the unloaded state to the full loads. Rods and beams use a corotational formulation
+        (large displacements and rotations, small strains); other elements stay linear. The
+        loads and prescribed displacements are scaled together by a load factor from 0 to 1.
+
+        Each iteration solves with the tangent stiffness, assembled with the AssemblyPlan of
+        the linear solve: full Newton refactorizes it every iteration, modified Newton reuses
+        one factorization across iterations and steps until convergence slows below
+        refactor_ratio, and BFGS also improves the reused factorization with secant updates.
+        The output statistics count the iterations, factorizations and residual evaluations.
+
+        model.q and model.F hold the final displacements and internal forces (the reactions at
+        the constrained DOFs), so Output(model) gives the final nodal results; the final
+        element forces in the deformed configuration are in output.element_results.
+
+        :param n_steps: Number of load steps; with arc_length, the first arc gives a load
+                        increment of about 1 / n_steps.
+        :param method: 'newton', 'modified' or 'bfgs'.
+        :param line_search: If True, scale each correction with a line search (load control).
+        :param arc_length: If True, use cylindrical arc-length control, which passes limit
+                           points; prescribed displacements must then be zero.
+        :param tol: Residual norm tolerance, relative to the applied and internal forces.
+        :param max_iterations: Maximum number of iterations per step.
+        :param refactor_ratio: Largest residual reduction of an iteration that keeps the tangent
+                               of modified Newton and BFGS.
+        :param max_updates: Number of BFGS updates kept.
+        :param max_cutbacks: Maximum number of successive step halvings after a failed step.
+        :param max_steps: Maximum number of arc-length steps (default is 10 n_steps).
+        :return: NonlinearOutput object.
+        """
+        if self.matrix_free:
+            raise ValueError("Nonlinear analysis needs an assembled tangent stiffness matrix.")
+        statistics = NonlinearStatistics()
+        tangent = TangentOperator(self.solver, statistics, method, refactor_ratio, max_updates)
+
+        self._notify('solve_started')
+        self.assign_global_dof()
+        self.assemble_displacements_vector()
         self.assemble_force_vector()
-        self.solve_eqs()
+        with self._phase('load_stepping'):
+            dof_free = np.isnan(self.q[:, 0])
+            free, constrained = np.flatnonzero(dof_free), np.flatnonzero(~dof_free)
+            system = CorotationalSystem(self.mesh, self._assembly_plan(), free, constrained, self.F[free, 0],
+                                        self.q[constrained, 0], statistics, self.workers)
+            u_f = np.zeros(len(free))
+            factors = [0.0]
+            displacements = [system.displacements(u_f, 0.0)]
+            forces = [np.zeros(len(dof_free))]
+            for factor, u_f, f in equilibrium_path(system, tangent, n_steps, arc_length, line_search, tol,
+                                                   max_iterations, max_cutbacks, max_steps):
+                factors.append(factor)
+                displacements.append(system.displacements(u_f, factor))
+                forces.append(f)
+            element_results = system.element_results(u_f, factors[-1])
+        self._notify('solve_finished')
+
+        self.q = displacements[-1][:, None].copy()
+        self.F = forces[-1][:, None].copy()
+        self.load_cases = None
+        return NonlinearOutput(self, np.array(factors), np.array(displacements), np.array(forces), element_results,
+                               statistics, method, factors[-1] >= 1.0 - 1e-12)
+
+    def _load_history(self, partition, q_c):
+        """
+        Split the model loads on the free DOFs into a constant part and one column per time
+        function. Forces caused by prescribed displacements are part of the constant force.
+
+        :param partition: PartitionedSystem of the constraints.
+        :param q_c: Prescribed displacements.
+        :return: LoadHistory object.
+        """
+        n = len(partition.free)
+        constant = -partition.coupling(q_c) if np.any(q_c) else np.zeros(n)
+        groups = {}
+        for load in self.loads:
+            groups.setdefault(id(load.time_function), (load.time_function, []))[1].append(load)
+
+        functions, rows, cols, values = [], [], [], []
+        for function, group in groups.values():
+            dofs, magnitudes = self._boundary_condition_dofs(group)
+            local = partition.free_index[dofs]
+            keep = local >= 0  # Loads on constrained DOFs are carried by the supports
+            if function is None:
+                np.add.at(constant, local[keep], magnitudes[keep])
+                continue
+            rows.append(local[keep])
+            cols.append(np.full(np.count_nonzero(keep), len(functions)))
+            values.append(magnitudes[keep])
+            functions.append(function)
+        matrix = sp.coo_matrix((np.concatenate(values or [[]]), (np.concatenate(rows or [[]]).astype(np.int64),
+                                np.concatenate(cols or [[]]).astype(np.int64))), shape=(n, len(functions)))
+        return LoadHistory(constant, matrix, functions)
+
+    def reanalyze(self, elements, threshold=0.05):
+        """
+        Update the solution after the properties of a few elements changed (e.g. the area of a
+        Rod or Beam2D property), without reassembling or refactorizing the whole model.
+
+        The stiffness deltas of the modified elements are added to the assembled system and the
+        solution is corrected with Sherman-Morrison-Woodbury updates of the existing factorization.
+        Once the accumulated changes touch more than a fraction threshold of the free DOFs, the
+        reduced stiffness is refactorized instead. Loads and constraints are those of the last solve.
+
+        :param elements: Modified Element objects.
+        :param threshold: Fraction of changed free DOFs beyond which a full refactorization is used.
+        :return: Output object (or dict of Output objects per load case), as returned by solve.
+        """
+        if self.partition is None:
+            raise ValueError("reanalyze needs a previous solve.")
+        elements = list(elements)
+        if not elements:
+            return self._outputs()
+        self._notify('solve_started')
+        with self._phase('update_stiffness'):
+            groups = {}
+            for element in elements:
+                groups.setdefault(id(element.element_set), (element.element_set, []))[1].append(element)
+
+            dofs, deltas = [], []
+            for element_set, group in groups.values():
+                indices = np.array([e.set_index for e in group], dtype=np.int64)
+                K_old = element_set.value('K_global_coord', indices)
+                element_set.update_elements(indices)
+                deltas.append(element_set.value('K_global_coord', indices) - K_old)
+                dofs.append(self.mesh.element_dofs(element_set)[indices])
+
+            # Assemble the stiffness change on the union of touched DOFs
+            changed = np.unique(np.concatenate([d.ravel() for d in dofs]))
+            delta = np.zeros((len(changed), len(changed)))
+            for element_dofs, delta_e in zip(dofs, deltas):
+                local = np.searchsorted(changed, element_dofs)
+                np.add.at(delta, (local[:, :, None], local[:, None, :]), delta_e)
+
+            if self.matrix_free:
+                self.K = ElementOperator(self._element_blocks(), self.K.shape[0])
+            else:
+                rows, cols = np.nonzero(delta)
+                self._add_element_stiffness_to_global(changed[rows], changed[cols], delta[rows, cols])
+
+            partition = self.partition
+            self._partitions = {partition.dof_free.tobytes(): partition}
+            partition.update(self.K, changed, delta, threshold)
+        self._solve_partitioned(partition, self.q[partition.free].copy())
+        self._notify('solve_finished')
+        return self._outputs()
+
+    def _outputs(self):
+        """
+        Wrap the current solution in Output objects.
+
+        :return: Output object, or a dict mapping each load case name to its Output.
+        """
+        if self.load_cases is None:
+            return Output(self)
+        return {load_case.name: Output(self, column, load_case.loads) for column, load_case in enumerate(self.load_cases)}
 
-        return Output(self)
 
+def _triplets(blocks):
+    """
+    Flatten batched element matrices into COO triplets.
 
+    :param blocks: List of (matrices, dofs) pairs with shapes (N, k, k) and (N, k).
+    :return: Tuple (rows, cols, values) of arrays, or None without blocks.
+    """
+    rows, cols, values = [], [], []
+    for matrices, dofs in blocks:
+        n = dofs.shape[1]
+        rows.append(np.repeat(dofs, n, axis=1).ravel())
+        cols.append(np.tile(dofs, (1, n)).ravel())
+        values.append(matrices.ravel())
+    if not rows:
+        return None
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
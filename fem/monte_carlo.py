@@ -0,0 +1,207 @@
+import numpy as np
+import scipy.sparse as sp
+from fem.element_set import ElementRodSet, ElementBeamSet, ElementMembraneSet
+
+
+class MonteCarloSolver:
+    def __init__(self, model, memory_budget=256 * 2**20):
+        """
+        Initialize a MonteCarloSolver, which solves thousands of variants of one template model
+        whose Young's modulus, area and load values are sampled.
+
+        The template is analysed once: every element stiffness matrix is split into unit
+        stiffness terms (e.g. K_e = E A G_e for a rod), scattered into a sparse map onto the
+        reduced system. Each sample then only costs one sparse-dense product to build its
+        reduced stiffness, and all samples of a chunk are solved in one batched LAPACK call.
+
+        :param model: Template Model. Its topology, geometry, constraints and loads are used.
+        :param memory_budget: Approximate memory in bytes for the stacked (S, n, n) systems of a chunk.
+        """
+        self.model = model
+        self.memory_budget = memory_budget
+
+        model.assign_global_dof()
+        model.assemble_displacements_vector()
+        model.assemble_force_vector()
+        dof_free = np.isnan(model.q[:, 0])
+        self.size = len(dof_free)
+        self.free = np.flatnonzero(dof_free)
+        self.constrained = np.flatnonzero(~dof_free)
+        self.q_c = model.q[self.constrained, 0]  # Prescribed displacements
+        self.F_f = model.F[self.free, 0]  # Applied loads of the template
+
+        free_index = np.full(self.size, -1)
+        free_index[self.free] = np.arange(len(self.free))
+
+        # Load influence matrix mapping load values to the free DOFs
+        n_free = len(self.free)
+        self.load_map = np.zeros((n_free, len(model.loads)))
+        for j, load in enumerate(model.loads):
+            dof = free_index[model.mesh.global_dof[load.node, load.dof]]
+            if dof >= 0:
+                self.load_map[dof, j] = 1
+
+        q = np.zeros(self.size)
+        q[self.constrained] = self.q_c
+        self.groups = []
+        rows, cols, values = [], [], []
+        coupling_rows, coupling_cols, coupling_values = [], [], []
+        n_terms = 0
+        for element_set in model.mesh.element_sets:
+            indices = np.arange(len(element_set))
+            dofs = model.mesh.element_dofs(element_set)
+            group = {
+                'set': element_set,
+                'indices': indices,
+                'elements': element_set.ids,
+                'dofs': dofs,
+                'E': element_set.property_values(lambda p: p.material.youngs_modulus)[indices],
+            }
+            self.groups.append(group)
+            for G in self._unit_terms(element_set, indices, group):
+                local = free_index[dofs]
+                n, k = dofs.shape
+                term = n_terms + np.arange(n)
+                n_terms += n
+
+                # Free-free entries of the reduced stiffness
+                i, j = np.meshgrid(np.arange(k), np.arange(k), indexing='ij')
+                li, lj = local[:, i], local[:, j]
+                keep = (li >= 0) & (lj >= 0)
+                rows.append((li * n_free + lj)[keep])
+                cols.append(np.broadcast_to(term[:, None, None], keep.shape)[keep])
+                values.append(G[keep])
+
+                # Free-constrained entries times the prescribed displacements
+                coupling = np.einsum('nij,nj->ni', G, np.where(local >= 0, 0.0, q[dofs]))
+                keep = local >= 0
+                coupling_rows.append(local[keep])
+                coupling_cols.append(np.broadcast_to(term[:, None], keep.shape)[keep])
+                coupling_values.append(coupling[keep])
+
+        self.n_terms = n_terms
+        self.stiffness_map = sp.csr_matrix(
+            (np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))), shape=(n_free * n_free, n_terms))
+        self.coupling_map = sp.csr_matrix(
+            (np.concatenate(coupling_values), (np.concatenate(coupling_rows), np.concatenate(coupling_cols))),
+            shape=(n_free, n_terms))
+
+    def _unit_terms(self, element_set, indices, group):
+        """
+        Split the global stiffness matrices of an element set into unit stiffness terms.
+        Rods have one term per element scaled by E A, beams an axial term scaled by E A and a
+        bending term scaled by E Izz, and membrane elements (CST, T6, Q4, Q8) one term scaled by E.
+
+        :return: List of (N, k, k) arrays of unit stiffness terms.
+        """
+        E = group['E']
+        if isinstance(element_set, ElementRodSet):
+            A = element_set.property_values(lambda p: p.area)[indices]
+            group['kind'], group['A'] = 'rod', A
+            return [element_set.value('K_global_coord', indices) / (E * A)[:, None, None]]
+        if isinstance(element_set, ElementBeamSet):
+            A = element_set.property_values(lambda p: p.area)[indices]
+            Izz = element_set.property_values(lambda p: p.Izz)[indices]
+            group['kind'], group['A'], group['Izz'] = 'beam', A, Izz
+            T, K = element_set.value('T', indices), element_set.value('K', indices)
+            axial = np.zeros_like(K)
+            axial[:, [0, 0, 3, 3], [0, 3, 0, 3]] = K[:, [0, 0, 3, 3], [0, 3, 0, 3]]
+            bending = K - axial
+            rotate = lambda K_local: np.einsum('nji,njk,nkl->nil', T, K_local, T, optimize=True)
+            return [rotate(axial) / (E * A)[:, None, None], rotate(bending) / (E * Izz)[:, None, None]]
+        if isinstance(element_set, ElementMembraneSet):
+            group['kind'] = 'membrane'
+            return [element_set.value('K_global_coord', indices) / E[:, None, None]]
+        raise TypeError(f"{type(element_set).__name__} is not supported by MonteCarloSolver.")
+
+    def _factors(self, E, A):
+        """
+        Scale factors of every unit stiffness term for a chunk of samples.
+
+        :param E: Young's modulus per sample and model element, shape (S, n_elements).
+        :param A: Area per sample and model element, shape (S, n_elements).
+        :return: Array of shape (S, n_terms).
+        """
+        factors = []
+        for group in self.groups:
+            E_s, elements = E[:, group['elements']], group['elements']
+            if group['kind'] == 'rod':
+                factors.append(E_s * A[:, elements])
+            elif group['kind'] == 'beam':
+                factors += [E_s * A[:, elements], E_s * group['Izz']]
+            else:
+                factors.append(E_s)
+        return np.concatenate(factors, axis=1)
+
+    def _samples(self, values, default, n_samples):
+        """
+        Broadcast sampled parameter values to shape (S, n_elements).
+        """
+        if values is None:
+            return np.broadcast_to(default, (n_samples, len(default)))
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 1:
+            values = values[:, None]
+        return np.broadcast_to(values, (n_samples, len(default)))
+
+    def solve(self, youngs_modulus=None, area=None, loads=None):
+        """
+        Solve all samples, chunked to fit the memory budget.
+
+        :param youngs_modulus: Sampled Young's modulus, shape (S,) (same for all elements) or
+                               (S, n_elements). Defaults to the template values.
+        :param area: Sampled cross-sectional area of rods and beams (beams keep their Izz),
+                     shape (S,) or (S, n_elements). Defaults to the template values.
+        :param loads: Sampled values of the model loads, shape (S, n_loads), in the order of
+                      model.loads. Defaults to the template load values.
+        :return: Tuple (displacements, element_forces): global displacement vectors of shape
+                 (S, n_dof) in node.global_dof numbering and axial forces of shape
+                 (S, n_elements) (NaN for membrane elements).
+        """
+        n_samples = next((len(v) for v in (youngs_modulus, area, loads) if v is not None), 1)
+        n_elements = len(self.model.elements)
+        E0 = np.full(n_elements, np.nan)
+        A0 = np.full(n_elements, np.nan)
+        for group in self.groups:
+            E0[group['elements']] = group['E']
+            if 'A' in group:
+                A0[group['elements']] = group['A']
+        E = self._samples(youngs_modulus, E0, n_samples)
+        A = self._samples(area, A0, n_samples)
+        if loads is None:
+            F_f = np.broadcast_to(self.F_f, (n_samples, len(self.free)))
+        else:
+            F_f = np.asarray(loads, dtype=float).reshape(n_samples, -1) @ self.load_map.T
+
+        n_free = len(self.free)
+        chunk = max(1, int(self.memory_budget // (3 * 8 * max(n_free, 1) ** 2)))
+        displacements = np.empty((n_samples, self.size))
+        displacements[:, self.constrained] = self.q_c
+        forces = np.full((n_samples, n_elements), np.nan)
+
+        for start in range(0, n_samples, chunk):
+            s = slice(start, min(start + chunk, n_samples))
+            factors = self._factors(E[s], A[s])
+            K = (self.stiffness_map @ factors.T).T.reshape(-1, n_free, n_free)
+            rhs = F_f[s] - factors @ self.coupling_map.T
+            displacements[s, self.free] = np.linalg.solve(K, rhs[:, :, None])[:, :, 0]
+            self._element_forces(displacements[s], E[s], A[s], forces[s])
+
+        return displacements, forces
+
+    def _element_forces(self, q, E, A, out):
+        """
+        Recover the axial force of every rod and beam for a chunk of samples.
+        """
+        for group in self.groups:
+            if group['kind'] == 'membrane':
+                continue
+            element_set, indices, elements = group['set'], group['indices'], group['elements']
+            q_local = np.einsum('nij,snj->sni', element_set.value('T', indices), q[:, group['dofs']])
+            last = 1 if group['kind'] == 'rod' else 3
+            k = E[:, elements] * A[:, elements] / element_set.length[indices]
+            out[:, elements] = k * (q_local[:, :, last] - q_local[:, :, 0])
+
+    def __repr__(self):
+        return (f"MonteCarloSolver:\n Model = {self.model.name}\n Free DOFs = {len(self.free)}\n"
+                f" Stiffness terms = {self.n_terms}\n")
@@ -1,31 +1,126 @@
+import numpy as np
+
+MAX_DOF = 3  # Largest number of degrees of freedom per node (2D beams)
+
+
+class NodeStore:
+    def __init__(self, coords):
+        """
+        Initialize a NodeStore, the contiguous arrays holding the state of a group of nodes.
+
+        :param coords: Node coordinates, shape (n_nodes, 2).
+        """
+        self.coords = np.asarray(coords, dtype=float).reshape(-1, 2)  # Float arrays (and memory maps) are not copied
+        n_nodes = len(self.coords)
+        self.node_dof = np.zeros(n_nodes, dtype=np.int64)  # Number of DOFs of each node (0 = unassigned)
+        self.global_dof = np.full((n_nodes, MAX_DOF), -1, dtype=np.int64)  # -1 where a DOF does not exist
+        self.displacement = np.zeros((n_nodes, MAX_DOF))
+        self.force = np.full((n_nodes, MAX_DOF), np.nan)
+
+    @property
+    def n_nodes(self):
+        return len(self.coords)
+
+    def node(self, index):
+        """
+        Get a lightweight Node view of one node.
+
+        :param index: Position of the node in the store.
+        """
+        return Node.view(self, index)
+
+
 class Node:
-    node_count = 0
+    __slots__ = ('mesh', 'index')
 
     def __init__(self, position):
         """
         Initialize a Node.
-        
-        :param position: Position of the node in the coordinate system (e.g., [x, y, z]).
+        The node keeps its state in a store of its own until a Model gathers it into its mesh.
+
+        :param position: Position of the node in the coordinate system (e.g., [x, y]).
         """
-        self.id = Node.node_count
-        Node.node_count += 1
+        self.mesh = NodeStore([position])
+        self.index = 0
 
-        self.position = position
-        self.dof = None
-        self.displacement = None
-        self.force = None
-        self.global_dof = None
+    @classmethod
+    def view(cls, mesh, index):
+        """
+        Create a Node view over one entry of a node store, without copying its state.
+
+        :param mesh: NodeStore (or Mesh) holding the node arrays.
+        :param index: Position of the node in the store.
+        """
+        node = cls.__new__(cls)
+        node.bind(mesh, index)
+        return node
+
+    def bind(self, mesh, index):
+        """
+        Point the node at another store. The state is not copied.
+
+        :param mesh: NodeStore (or Mesh) holding the node arrays.
+        :param index: Position of the node in the store.
+        """
+        self.mesh = mesh
+        self.index = index
+
+    @property
+    def id(self):
+        return self.index
+
+    @property
+    def position(self):
+        return self.mesh.coords[self.index]
+
+    @position.setter
+    def position(self, position):
+        self.mesh.coords[self.index] = position
+
+    @property
+    def dof(self):
+        return int(self.mesh.node_dof[self.index]) or None
+
+    @property
+    def displacement(self):
+        return self.mesh.displacement[self.index, :self.mesh.node_dof[self.index]]
+
+    @displacement.setter
+    def displacement(self, displacement):
+        self.mesh.displacement[self.index, :self.mesh.node_dof[self.index]] = displacement
+
+    @property
+    def force(self):
+        return self.mesh.force[self.index, :self.mesh.node_dof[self.index]]
+
+    @force.setter
+    def force(self, force):
+        self.mesh.force[self.index, :self.mesh.node_dof[self.index]] = force
+
+    @property
+    def global_dof(self):
+        return self.mesh.global_dof[self.index, :self.mesh.node_dof[self.index]]
+
+    @global_dof.setter
+    def global_dof(self, global_dof):
+        self.mesh.global_dof[self.index, :self.mesh.node_dof[self.index]] = global_dof
 
     def assign_dof(self, dof):
-        self.dof = dof
-        self.displacement = [0.0] * dof
-        self.force = [None] * dof
-        self.global_dof = [None] * dof
+        self.mesh.node_dof[self.index] = dof
+        self.mesh.displacement[self.index] = 0.0
+        self.mesh.force[self.index] = np.nan
+        self.mesh.global_dof[self.index] = -1
+
+    def __eq__(self, other):
+        return isinstance(other, Node) and self.mesh is other.mesh and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.mesh), self.index))
 
     def __repr__(self):
-        description = f"Node:\n ID = {self.id}\n Position = {self.position}\n"
-        
+        description = f"Node:\n ID = {self.id}\n Position = {self.position.tolist()}\n"
+
         if self.dof is not None:
             description += f" DOF = {self.dof}\n"
-        
+
         return description
@@ -0,0 +1,465 @@
+import warnings
+import numpy as np
+import scipy.sparse as sp
+
+METHODS = ('newton', 'modified', 'bfgs')
+
+
+class NonlinearStatistics:
+    def __init__(self):
+        """
+        Initialize NonlinearStatistics, the work counters of a nonlinear analysis.
+        """
+        self.steps = 0  # Converged load steps
+        self.iterations = 0  # Equilibrium iterations (one solve with the tangent each)
+        self.factorizations = 0  # Factorizations of the tangent stiffness
+        self.tangent_assemblies = 0  # Assemblies of the tangent stiffness
+        self.residual_evaluations = 0  # Evaluations of the internal forces
+        self.line_search_evaluations = 0  # Residual evaluations spent in line searches
+        self.bfgs_updates = 0  # Rank-two updates of the inverse tangent
+        self.cutbacks = 0  # Steps retried with a smaller increment
+        self.step_iterations = []  # Iterations of each converged step
+
+    def to_dict(self):
+        """
+        :return: Dict of the counters.
+        """
+        return dict(vars(self))
+
+    def __repr__(self):
+        fields = ''.join(f" {key.replace('_', ' ').capitalize()} = {value}\n"
+                         for key, value in vars(self).items() if key != 'step_iterations')
+        return f"NonlinearStatistics:\n{fields}"
+
+
+class CorotationalSystem:
+    def __init__(self, mesh, plan, free, constrained, loads, prescribed, statistics, workers=1):
+        """
+        Initialize a CorotationalSystem, the equilibrium equations of a mesh for large
+        displacements: at load factor lam, the internal forces f(u) of the elements balance
+        lam times the reference loads on the free DOFs, with the constrained DOFs displaced by
+        lam times their prescribed values.
+
+        :param mesh: Mesh with assigned global DOFs.
+        :param plan: AssemblyPlan of the mesh, used for the tangent stiffness.
+        :param free: Global indices of the free DOFs.
+        :param constrained: Global indices of the constrained DOFs.
+        :param loads: Reference loads on the free DOFs, shape (n_f,).
+        :param prescribed: Reference prescribed displacements, shape (n_c,).
+        :param statistics: NonlinearStatistics updated by every evaluation.
+        :param workers: Number of threads of the tangent assembly.
+        """
+        self.mesh = mesh
+        self.plan = plan
+        self.free = free
+        self.constrained = constrained
+        self.loads = loads
+        self.prescribed = prescribed
+        self.statistics = statistics
+        self.workers = workers
+        self.size = plan.size
+        self.dofs = [mesh.element_dofs(element_set) for element_set in mesh.element_sets]
+
+    def displacements(self, u_f, factor):
+        """
+        :return: Global displacement vector, shape (n,).
+        """
+        u = np.empty(self.size)
+        u[self.free] = u_f
+        u[self.constrained] = factor * self.prescribed
+        return u
+
+    def evaluate(self, u_f, factor, tangent=False):
+        """
+        Compute the internal forces, and optionally the tangent stiffness, at a state.
+
+        :param u_f: Displacements of the free DOFs.
+        :param factor: Load factor.
+        :param tangent: If True, also assemble the tangent stiffness of the free DOFs.
+        :return: Tuple (f, K_ff): global internal force vector, shape (n,), and tangent
+                 stiffness (None unless requested).
+        """
+        u = self.displacements(u_f, factor)
+        f = np.zeros(self.size)
+        tangents = []
+        for element_set, dofs in zip(self.mesh.element_sets, self.dofs):
+            f_e, K_e, _ = element_set.corotational(u[dofs], tangent)
+            f += np.bincount(dofs.ravel(), f_e.ravel(), minlength=self.size)
+            tangents.append(K_e)
+        self.statistics.residual_evaluations += 1
+        if not tangent:
+            return f, None
+        self.statistics.tangent_assemblies += 1
+        K = self.plan.assemble(tangents, self.workers)
+        if sp.issparse(K):
+            return f, K[self.free][:, self.free]
+        return f, K[np.ix_(self.free, self.free)]
+
+    def element_results(self, u_f, factor):
+        """
+        Recover the corotational element results (e.g. axial force in the current chord).
+
+        :return: Dict mapping each result name to an array indexed by element ID, NaN for
+                 elements without that result.
+        """
+        u = self.displacements(u_f, factor)
+        results = {}
+        for element_set, dofs in zip(self.mesh.element_sets, self.dofs):
+            for name, value in element_set.corotational(u[dofs], tangent=False)[2].items():
+                if name not in results:
+                    results[name] = np.full((self.mesh.n_elements,) + value.shape[1:], np.nan)
+                results[name][element_set.ids] = value
+        return results
+
+    def __repr__(self):
+        return f"CorotationalSystem:\n Free DOFs = {len(self.free)}\n Constrained DOFs = {len(self.constrained)}\n"
+
+
+class TangentOperator:
+    def __init__(self, solver, statistics, method='newton', refactor_ratio=0.5, max_updates=20):
+        """
+        Initialize a TangentOperator, which solves with the tangent stiffness of the iterations.
+
+        Full Newton factorizes a new tangent at every iteration. Modified Newton keeps the last
+        factorization across iterations and load steps, and only refactorizes when an iteration
+        reduces the residual norm by less than refactor_ratio. BFGS keeps the factorization as
+        well, but corrects its inverse with the rank-two updates of the last max_updates
+        iterations (Matthies and Strang), reset at each refactorization.
+
+        :param solver: Solver object factorizing the tangent of the free DOFs.
+        :param statistics: NonlinearStatistics counting the factorizations and updates.
+        :param method: 'newton', 'modified' or 'bfgs'.
+        :param refactor_ratio: Largest residual reduction of an iteration that keeps the tangent.
+        :param max_updates: Number of BFGS updates kept.
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown nonlinear method '{method}'; use one of {METHODS}.")
+        self.solver = solver
+        self.statistics = statistics
+        self.method = method
+        self.refactor_ratio = refactor_ratio
+        self.max_updates = max_updates
+        self._solve = None
+        self._pairs = []  # BFGS pairs (s, y, 1 / y.s), oldest first
+
+    def stale(self, norm, previous_norm):
+        """
+        Check if the tangent must be refactorized before the next iteration.
+
+        :param norm: Residual norm of the current iterate.
+        :param previous_norm: Residual norm of the previous iterate of the step, or None.
+        """
+        if self._solve is None or self.method == 'newton':
+            return True
+        return previous_norm is not None and norm > self.refactor_ratio * previous_norm
+
+    def factorize(self, K_ff):
+        """
+        Factorize a new tangent and forget the BFGS updates.
+        """
+        self._solve = self.solver.factorize(K_ff)
+        self._pairs = []
+        self.statistics.factorizations += 1
+
+    def solve(self, r):
+        """
+        Apply the inverse tangent to a vector, with the BFGS two-loop recursion if enabled.
+        """
+        if not self._pairs:
+            return self._solve(r)
+        q = r.copy()
+        alphas = []
+        for s, y, rho in reversed(self._pairs):
+            alpha = rho * (s @ q)
+            q -= alpha * y
+            alphas.append(alpha)
+        z = self._solve(q)
+        for (s, y, rho), alpha in zip(self._pairs, reversed(alphas)):
+            z += s * (alpha - rho * (y @ z))
+        return z
+
+    def update(self, s, y):
+        """
+        Record the secant pair of an iteration: displacement change s and internal force change y.
+        Pairs without positive curvature are skipped, so the inverse stays positive definite.
+        """
+        if self.method != 'bfgs':
+            return
+        curvature = y @ s
+        if curvature <= 1e-12 * np.linalg.norm(y) * np.linalg.norm(s):
+            return
+        self._pairs.append((s, y, 1 / curvature))
+        if len(self._pairs) > self.max_updates:
+            self._pairs.pop(0)
+        self.statistics.bfgs_updates += 1
+
+    def __repr__(self):
+        return f"TangentOperator:\n Method = {self.method}\n Updates = {len(self._pairs)}\n"
+
+
+def line_search(system, u_f, factor, d, r, tolerance=0.5, max_evaluations=5):
+    """
+    Scale a search direction so that the residual is nearly orthogonal to it, which is the
+    stationary point of the potential energy along d: find eta with
+    |d . r(u + eta d)| <= tolerance |d . r(u)| by secant steps, eta in [0.1, 4].
+
+    :param system: CorotationalSystem.
+    :param u_f: Current free displacements.
+    :param factor: Load factor.
+    :param d: Search direction.
+    :param r: Residual at u_f.
+    :param tolerance: Accepted fraction of the initial slope.
+    :param max_evaluations: Maximum number of residual evaluations.
+    :return: Tuple (eta, f) with f the internal forces at u_f + eta d.
+    """
+    s0 = d @ r
+    eta_previous, s_previous = 0.0, s0
+    eta = 1.0
+    for _ in range(max_evaluations):
+        f, _ = system.evaluate(u_f + eta * d, factor)
+        system.statistics.line_search_evaluations += 1
+        s = d @ (factor * system.loads - f[system.free])
+        if abs(s) <= tolerance * abs(s0) or s == s_previous:
+            break
+        eta_next = np.clip(eta - s * (eta - eta_previous) / (s - s_previous), 0.1, 4.0)
+        eta_previous, s_previous, eta = eta, s, eta_next
+    else:
+        return eta_previous, f  # Last evaluated step length
+    return eta, f
+
+
+def _converged(r, f, factor, system, tol):
+    return np.linalg.norm(r) <= tol * max(np.linalg.norm(factor * system.loads), np.linalg.norm(f), 1e-300)
+
+
+def equilibrate(system, tangent, u_f, factor, tol=1e-8, max_iterations=30, use_line_search=False):
+    """
+    Iterate to equilibrium at a fixed load factor.
+
+    :param system: CorotationalSystem.
+    :param tangent: TangentOperator.
+    :param u_f: Initial free displacements.
+    :param factor: Load factor.
+    :param tol: Residual norm tolerance, relative to the applied and internal forces.
+    :param max_iterations: Maximum number of iterations.
+    :param use_line_search: If True, scale each correction with line_search.
+    :return: Tuple (u_f, f, iterations), or None if the iterations did not converge.
+    """
+    free = system.free
+    f, _ = system.evaluate(u_f, factor)
+    previous_norm = first_norm = None
+    for iteration in range(max_iterations + 1):
+        r = factor * system.loads - f[free]
+        norm = np.linalg.norm(r)
+        if _converged(r, f, factor, system, tol):
+            return u_f, f, iteration
+        if iteration == max_iterations or not np.isfinite(norm) or (first_norm and norm > 1e6 * first_norm):
+            return None
+        first_norm = first_norm or norm
+        if tangent.stale(norm, previous_norm):
+            tangent.factorize(system.evaluate(u_f, factor, tangent=True)[1])
+        d = tangent.solve(r)
+        system.statistics.iterations += 1
+        if use_line_search:
+            eta, f_new = line_search(system, u_f, factor, d, r)
+        else:
+            eta, f_new = 1.0, system.evaluate(u_f + d, factor)[0]
+        u_f = u_f + eta * d
+        tangent.update(eta * d, f_new[free] - f[free])
+        f, previous_norm = f_new, norm
+    return None
+
+
+def arc_length_step(system, tangent, u_f, factor, f, arc, direction=None, tol=1e-8, max_iterations=30):
+    """
+    One step of Crisfield's cylindrical arc-length method: the displacement increment of the
+    step has the norm arc, and the load factor is an unknown, so the path can be followed
+    through limit points (snap-through and snap-back).
+
+    :param system: CorotationalSystem (with zero prescribed displacements).
+    :param tangent: TangentOperator.
+    :param u_f: Converged free displacements at the start of the step.
+    :param factor: Converged load factor at the start of the step.
+    :param f: Internal forces at the start of the step.
+    :param arc: Arc length of the step.
+    :param direction: Displacement increment of the previous step, which orients the predictor.
+    :param tol: Residual norm tolerance.
+    :param max_iterations: Maximum number of corrections.
+    :return: Tuple (u_f, factor, f, increment, iterations), or None if the step failed.
+    """
+    free = system.free
+    if tangent.stale(0.0, None):
+        tangent.factorize(system.evaluate(u_f, factor, tangent=True)[1])
+    du_t = tangent.solve(system.loads)
+    sign = -1.0 if direction is not None and direction @ du_t < 0 else 1.0
+    d_factor = sign * arc / np.linalg.norm(du_t)
+    du = d_factor * du_t
+
+    previous_norm, f_previous, change = None, f, None
+    for iteration in range(max_iterations + 1):
+        f, _ = system.evaluate(u_f + du, factor + d_factor)
+        if change is not None:
+            tangent.update(change, f[free] - f_previous[free])
+        r = (factor + d_factor) * system.loads - f[free]
+        norm = np.linalg.norm(r)
+        if _converged(r, f, factor + d_factor, system, tol):
+            return u_f + du, factor + d_factor, f, du, iteration
+        if iteration == max_iterations or not np.isfinite(norm):
+            return None
+        if tangent.stale(norm, previous_norm):
+            tangent.factorize(system.evaluate(u_f + du, factor + d_factor, tangent=True)[1])
+        du_r = tangent.solve(r)
+        du_t = tangent.solve(system.loads)
+        system.statistics.iterations += 1
+
+        # Keep the increment on the cylinder ||du + du_r + dlam du_t|| = arc
+        base = du + du_r
+        a, b, c = du_t @ du_t, 2 * du_t @ base, base @ base - arc ** 2
+        discriminant = b ** 2 - 4 * a * c
+        if discriminant < 0:
+            return None
+        roots = (-b + np.array([1.0, -1.0]) * np.sqrt(discriminant)) / (2 * a)
+        # The root that keeps the increment closest to its previous direction
+        d_lambda = roots[np.argmax([(base + root * du_t) @ du for root in roots])]
+        change = du_r + d_lambda * du_t
+        du, d_factor = du + change, d_factor + d_lambda
+        previous_norm, f_previous = norm, f
+    return None
+
+
+def equilibrium_path(system, tangent, n_steps=10, arc_length=False, use_line_search=False, tol=1e-8,
+                     max_iterations=30, max_cutbacks=6, max_steps=None, target_iterations=5):
+    """
+    Trace the equilibrium path from the unloaded state to the full loads (load factor 1).
+
+    Under load control the factor grows in n_steps equal increments; a step that fails to
+    converge is retried with half the increment, up to max_cutbacks times in a row. Under
+    arc-length control the first arc gives a load increment of about 1 / n_steps, later arcs
+    are scaled by sqrt(target_iterations / iterations), and a step that passes factor 1 is
+    corrected back to it at constant load.
+
+    :param system: CorotationalSystem.
+    :param tangent: TangentOperator.
+    :param n_steps: Number of load steps (or initial arc length, see above).
+    :param arc_length: If True, use arc-length instead of load control.
+    :param use_line_search: If True, use line searches (load control only).
+    :param tol: Residual norm tolerance.
+    :param max_iterations: Maximum number of iterations per step.
+    :param max_cutbacks: Maximum number of successive step halvings.
+    :param max_steps: Maximum number of arc-length steps (default is 10 n_steps).
+    :param target_iterations: Iterations per step the arc length is adapted to.
+    :return: Generator of (factor, u_f, f) after each converged step.
+    """
+    statistics = system.statistics
+    u_f = np.zeros(len(system.free))
+    factor = 0.0
+    f, _ = system.evaluate(u_f, factor)
+    cutbacks = 0
+
+    if not arc_length:
+        increment = 1.0 / n_steps
+        while factor < 1.0 - 1e-12:
+            target = min(1.0, factor + increment)
+            result = equilibrate(system, tangent, u_f, target, tol, max_iterations, use_line_search)
+            if result is None:
+                cutbacks += 1
+                statistics.cutbacks += 1
+                if cutbacks > max_cutbacks:
+                    warnings.warn(f"Nonlinear analysis stopped at load factor {factor:.4g}: no convergence "
+                                  f"after {max_cutbacks} cutbacks.", RuntimeWarning)
+                    return
+                increment /= 2
+                continue
+            u_f, f, iterations = result
+            factor = target
+            cutbacks = 0
+            increment = min(2 * increment, 1.0 / n_steps)
+            statistics.steps += 1
+            statistics.step_iterations.append(iterations)
+            yield factor, u_f, f
+        return
+
+    if np.any(system.prescribed):
+        raise ValueError("Arc-length control needs zero prescribed displacements; use load control.")
+    if tangent.stale(0.0, None):
+        tangent.factorize(system.evaluate(u_f, factor, tangent=True)[1])
+    arc = np.linalg.norm(tangent.solve(system.loads)) / n_steps
+    direction = None
+    for _ in range(max_steps or 10 * n_steps):
+        result = arc_length_step(system, tangent, u_f, factor, f, arc, direction, tol, max_iterations)
+        if result is None:
+            cutbacks += 1
+            statistics.cutbacks += 1
+            if cutbacks > max_cutbacks:
+                warnings.warn(f"Nonlinear analysis stopped at load factor {factor:.4g}: no convergence "
+                              f"after {max_cutbacks} cutbacks.", RuntimeWarning)
+                return
+            arc /= 2
+            continue
+        u_new, factor_new, f_new, direction, iterations = result
+        if factor_new > 1.0 and factor < 1.0:
+            # Interpolate to factor 1 within the step and correct at constant load
+            start = u_f + (1.0 - factor) / (factor_new - factor) * (u_new - u_f)
+            corrected = equilibrate(system, tangent, start, 1.0, tol, max_iterations)
+            if corrected is not None:
+                u_new, f_new, extra = corrected
+                factor_new, iterations = 1.0, iterations + extra
+        u_f, factor, f = u_new, factor_new, f_new
+        cutbacks = 0
+        statistics.steps += 1
+        statistics.step_iterations.append(iterations)
+        yield factor, u_f, f
+        if factor >= 1.0:
+            return
+        arc *= np.clip(np.sqrt(target_iterations / max(iterations, 1)), 0.5, 2.0)
+    warnings.warn(f"Nonlinear analysis stopped at load factor {factor:.4g} after {max_steps or 10 * n_steps} "
+                  f"arc-length steps.", RuntimeWarning)
+
+
+class NonlinearOutput:
+    def __init__(self, model, load_factors, displacements, forces, element_results, statistics, method, converged):
+        """
+        Initialize a NonlinearOutput, the equilibrium path of a geometrically nonlinear analysis.
+
+        :param model: Model object the path belongs to.
+        :param load_factors: Load factor of each recorded state, the unloaded state first, shape (n_out,).
+        :param displacements: Global displacement vector of each state, shape (n_out, n_dof).
+        :param forces: Global internal force vector of each state (applied loads on the free
+                       DOFs, reactions on the constrained ones), shape (n_out, n_dof).
+        :param element_results: Corotational element results of the last state, as in
+                                Output.element_results (e.g. 'force' in the current chord).
+        :param statistics: NonlinearStatistics of the analysis.
+        :param method: 'newton', 'modified' or 'bfgs'.
+        :param converged: True if the path reached the full loads.
+        """
+        self.mesh = model.mesh
+        self.load_factors = load_factors
+        self.displacements = displacements
+        self.forces = forces
+        self.element_results = element_results
+        self.statistics = statistics
+        self.method = method
+        self.converged = converged
+
+    def nodal_history(self, node, dof, field='displacement'):
+        """
+        Read the path of one nodal DOF.
+
+        :param node: Node index.
+        :param dof: Local DOF of the node.
+        :param field: 'displacement' or 'force'.
+        :return: Array with one value per recorded state.
+        """
+        history = {'displacement': self.displacements, 'force': self.forces}[field]
+        global_dof = self.mesh.global_dof[node, dof]
+        if global_dof < 0:
+            raise ValueError(f"Node {node} has no DOF {dof}.")
+        return history[:, global_dof].copy()
+
+    def __len__(self):
+        return len(self.load_factors)
+
+    def __repr__(self):
+        return (f"NonlinearOutput:\n Method = {self.method}\n Steps = {len(self) - 1}\n"
+                f" Final load factor = {self.load_factors[-1]}\n Converged = {self.converged}\n"
+                f" Iterations = {self.statistics.iterations}\n Factorizations = {self.statistics.factorizations}\n")
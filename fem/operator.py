@@ -0,0 +1,71 @@
+import numpy as np
+from scipy.sparse.linalg import LinearOperator
+
+
+class ElementOperator(LinearOperator):
+    def __init__(self, blocks, size, dof_free=None):
+        """
+        Initialize a matrix-free stiffness operator that applies K @ v element by element,
+        without ever assembling the global matrix.
+
+        :param blocks: List of (K_e, dofs) pairs: batched element stiffness matrices of shape
+                       (N, k, k) in global coordinates and their global DOF maps of shape (N, k).
+        :param size: Total number of global degrees of freedom.
+        :param dof_free: Optional boolean mask of the free DOFs. When given, the operator acts on
+                         the free DOFs only (the reduced stiffness K_ff).
+        """
+        self.blocks = blocks
+        self.global_size = size
+        self.dof_free = dof_free
+
+        # Map global DOFs to operator rows; constrained DOFs point to a trailing dummy row
+        if dof_free is None:
+            n = size
+            local = np.arange(size)
+        else:
+            n = int(np.count_nonzero(dof_free))
+            local = np.full(size, n)
+            local[dof_free] = np.arange(n)
+        self._maps = [local[dofs] for _, dofs in blocks]
+        super().__init__(dtype=float, shape=(n, n))
+
+    def reduce(self, dof_free):
+        """
+        Restrict the operator to the free DOFs.
+
+        :param dof_free: Boolean mask of the free global DOFs.
+        :return: ElementOperator acting on the free DOFs.
+        """
+        return ElementOperator(self.blocks, self.global_size, dof_free)
+
+    def _matvec(self, v):
+        """
+        Gather element DOF values, apply the batched element matrices and scatter-add the result.
+        """
+        n = self.shape[0]
+        x = np.append(np.ravel(v), 0.0)  # Trailing zero for constrained DOFs
+        y = np.zeros(n + 1)
+        for (K_e, _), dofs in zip(self.blocks, self._maps):
+            y_e = np.einsum('nij,nj->ni', K_e, x[dofs])
+            y += np.bincount(dofs.ravel(), y_e.ravel(), minlength=n + 1)
+        return y[:n]
+
+    def _matmat(self, V):
+        return np.column_stack([self._matvec(v) for v in np.asarray(V).T])
+
+    def _adjoint(self):
+        return self  # Element stiffness matrices are symmetric
+
+    def diagonal(self):
+        """
+        Diagonal of the operator, for Jacobi preconditioning.
+        """
+        n = self.shape[0]
+        diag = np.zeros(n + 1)
+        for (K_e, _), dofs in zip(self.blocks, self._maps):
+            diag += np.bincount(dofs.ravel(), np.einsum('nii->ni', K_e).ravel(), minlength=n + 1)
+        return diag[:n]
+
+    def __repr__(self):
+        return (f"ElementOperator:\n Shape = {self.shape}\n"
+                f" Elements = {sum(len(dofs) for _, dofs in self.blocks)}\n")
@@ -1,129 +1,175 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from fem.element import ElementRod, ElementBeam, ElementCST
-
-cmap = plt.get_cmap('jet')
 
 class Output:
-    def __init__(self, model):
+    def __init__(self, model, column=0, loads=None):
+        """
+        Initialize an Output.
+
+        :param model: Solved Model object.
+        :param column: Load case column of model.q and model.F holding these results.
+        :param loads: Loads of the load case (default is model.loads).
+        """
+        self.mesh = model.mesh
         self.nodes = model.nodes
         self.elements = model.elements
         self.constraints = model.constraints
-        self.loads = model.loads
-        self.q = model.q
-        self.F = model.F
+        self.loads = model.loads if loads is None else loads
+        self.q = model.q[:, [column]]
+        self.F = model.F[:, [column]]
+        self.displacements = None  # Nodal displacements, shape (n_nodes, MAX_DOF)
+        self.forces = None  # Nodal forces (applied loads and reactions), shape (n_nodes, MAX_DOF)
+        self.reactions = None  # Nodal reactions, zero at unconstrained DOFs, shape (n_nodes, MAX_DOF)
+        self.element_results = None  # Dict mapping result names to arrays indexed by element ID
+        self.telemetry = model.recorder.telemetry if model.recorder is not None else None  # SolveTelemetry of the solve
 
     def compute_nodal_results(self):
-        for node in self.nodes:
-            for i in range(node.dof):
-                node.displacement[i] = float(self.q[node.global_dof[i]])
-        for node in self.nodes:
-            for i in range(node.dof):
-                node.force[i] = float(self.F[node.global_dof[i]])
-    
+        """
+        Gather the nodal displacements, forces and reactions from the global vectors in one
+        pass, and store them in the mesh so node.displacement and node.force see them.
+        """
+        global_dof = self.mesh.global_dof
+        exists = global_dof >= 0
+        self.displacements = np.zeros(global_dof.shape)
+        self.displacements[exists] = self.q[global_dof[exists], 0]
+        self.forces = np.full(global_dof.shape, np.nan)
+        self.forces[exists] = self.F[global_dof[exists], 0]
+
+        constrained = np.zeros(len(self.q), dtype=bool)
+        for constraint in self.constraints:
+            constrained[global_dof[constraint.node, constraint.dof]] = True
+        self.reactions = np.zeros(global_dof.shape)
+        is_reaction = exists.copy()
+        is_reaction[exists] = constrained[global_dof[exists]]
+        self.reactions[is_reaction] = self.forces[is_reaction]
+
+        self.mesh.displacement[:] = self.displacements
+        self.mesh.force[:] = self.forces
+
     def compute_element_results(self):
-        for elem in self.elements:
-            elem.calculate_local_results()
-
-
-    def plot2DBars(self, factor=0, contour=None, text=None, show_constraints=False, show_force=False):
-        """
-        Plot the undeformed and deformed shapes of the model.
-        
-        :param factor: Scale factor for the deformed shape.
-        """
-        plt.figure(figsize=(10, 8))
-
-        if contour == 'Force':
-            values = [elem.force for elem in self.elements]
-            max_value = max(values)
-            min_value = min(values)
-        elif contour == 'Deformation':
-            values = [elem.deformation for elem in self.elements]
-            max_value = max(values)
-            min_value = min(values)
-
-        for element in self.elements:
-            if type(element) == ElementRod or type(element) == ElementBeam:
-                xundef = np.array([element.nodes[0].position[0], element.nodes[1].position[0]])
-                yundef = np.array([element.nodes[0].position[1], element.nodes[1].position[1]])
-                xdef = xundef+factor*np.array([element.nodes[0].displacement[0], element.nodes[1].displacement[0]])
-                ydef = yundef+factor*np.array([element.nodes[0].displacement[1], element.nodes[1].displacement[1]])
-                plt.plot(xundef, yundef, 'o--', color='gray', label='Undeformed Shape')
-
-                if text == 'Deformation':
-                    plt.text(np.mean(xdef),np.mean(ydef),"{:.2f}".format(element.deformation))
-                elif text == 'Force':
-                    plt.text(np.mean(xdef),np.mean(ydef),"{:.0f}".format(element.force))
-
-                if contour == 'Deformation':
-                    color = cmap(0.1+0.8*(element.deformation-min_value)/(max_value-min_value))
-                    
-                elif contour == 'Force':
-                    if text:
-                        plt.text(np.mean(xdef),np.mean(ydef),"{:.0f}".format(element.force))
-                    color = cmap(0.1+0.8*(element.force-min_value)/(max_value-min_value))
-                    
-                else:
-                    color = 'k'
-                plt.plot(xdef, ydef, 'o-', markerfacecolor='k', markeredgecolor='k', color=color, label='Deformed Shape')
-
-        scalex = max([abs(n.position[0]+factor*n.displacement[0]) for n in self.nodes])
-        scaley = max([abs(n.position[1]+factor*n.displacement[1]) for n in self.nodes])
-        scale = max([scalex,scaley])
-
-        scalef = max([abs(l.value) for l in self.loads])
-
-        if show_constraints:
-            for constraint in self.constraints:
-                x, y = [p+factor*d for p, d in zip(self.nodes[constraint.node].position, self.nodes[constraint.node].displacement)]
-                plt.arrow(x-0.1*(1-constraint.dof), y-0.1*constraint.dof, 0.1*(1-constraint.dof), 0.1*constraint.dof, head_length=0.04*scale, head_width=0.02*scale, length_includes_head=True, color='cyan')
-
-        if show_force:
-            for load in self.loads:
-                x, y = [p+factor*d for p, d in zip(self.nodes[load.node].position, self.nodes[load.node].displacement)]
-                plt.arrow(x, y, load.value*(1-load.dof)*0.5*scale/scalef, load.value*load.dof*0.5*scale/scalef, head_length=0.04*scale, head_width=0.02*scale, length_includes_head=True, color='green')
-
-        plt.xlabel('X Coordinate')
-        plt.ylabel('Y Coordinate')
-        plt.title(f'Undeformed and Deformed Shapes (Scale factor = {factor:.1f}, Contour = {contour}, Text = {text})')
-        plt.axis('equal')  # Ensure aspect ratio is equal to show accurate deformations
-        plt.legend(['Undeformed Shape', 'Deformed Shape'])
-        plt.show()
-
-    def plot2DArea(self, factor=0, show_constraints=False, show_force=False):
-        plt.figure(figsize=(10, 8))
-
-        for element in self.elements:
-            if type(element) == ElementCST:
-                xundef = np.array([element.nodes[0].position[0], element.nodes[1].position[0], element.nodes[2].position[0], element.nodes[0].position[0]])
-                yundef = np.array([element.nodes[0].position[1], element.nodes[1].position[1], element.nodes[2].position[1], element.nodes[0].position[1]])
-                xdef = xundef+factor*np.array([element.nodes[0].displacement[0], element.nodes[1].displacement[0], element.nodes[2].displacement[0], element.nodes[0].displacement[0]])
-                ydef = yundef+factor*np.array([element.nodes[0].displacement[1], element.nodes[1].displacement[1], element.nodes[2].displacement[1], element.nodes[0].displacement[1]])
-                plt.plot(xundef, yundef, 'o--', color='gray', label='Undeformed Shape')
-                plt.fill(xundef, yundef, color='gray', alpha=0.2, label='_nolegend_')
-                plt.plot(xdef, ydef, 'o-', markerfacecolor='k', markeredgecolor='k', color='k', label='Deformed Shape')
-                plt.fill(xdef, ydef, color='k', alpha=0.2,label='_nolegend_')
-
-        scalex = max([abs(n.position[0]+factor*n.displacement[0]) for n in self.nodes])
-        scaley = max([abs(n.position[1]+factor*n.displacement[1]) for n in self.nodes])
-        scale = max(scalex,scaley)
-
-        scalef = max([abs(l.value) for l in self.loads])
-
-        if show_constraints:
-            for constraint in self.constraints:
-                x, y = [p+factor*d for p, d in zip(self.nodes[constraint.node].position, self.nodes[constraint.node].displacement)]
-                plt.arrow(x-0.1*(1-constraint.dof), y-0.1*constraint.dof, 0.1*(1-constraint.dof), 0.1*constraint.dof, head_length=0.04*scale, head_width=0.02*scale, length_includes_head=True, color='cyan')
-
-        if show_force:
-            for load in self.loads:
-                x, y = [p+factor*d for p, d in zip(self.nodes[load.node].position, self.nodes[load.node].displacement)]
-                plt.arrow(x, y, load.value*(1-load.dof)*0.5*scale/scalef, load.value*load.dof*0.5*scale/scalef, head_length=0.04*scale, head_width=0.02*scale, length_includes_head=True, color='green')
-
-        plt.xlabel('X Coordinate')
-        plt.ylabel('Y Coordinate')
-        plt.title(f'Undeformed and Deformed Shapes (Scale factor = {factor:.1f})')
-        plt.axis('equal')  # Ensure aspect ratio is equal to show accurate deformations
-        plt.legend(['Undeformed Shape', 'Deformed Shape'])
-        plt.show()
\ No newline at end of file
+        """
+        Recover the element results of every element set with one batched gather and einsum.
+        element_results maps each result name (e.g. 'force', 'stress') to an array indexed by
+        element ID, NaN for elements without that result. They are also kept by the mesh, so
+        that each element reads its own as attributes (e.g. model.elements[i].force).
+        """
+        n_elements = self.mesh.n_elements
+        self.element_results = {}
+        for element_set in self.mesh.element_sets:
+            u = self.q[self.mesh.element_dofs(element_set), 0]
+            for name, value in element_set.local_results(u).items():
+                if name not in self.element_results:
+                    self.element_results[name] = np.full((n_elements,) + value.shape[1:], np.nan)
+                self.element_results[name][element_set.ids] = value
+        self.mesh.element_results = self.element_results
+
+    def substructure_output(self, element_id):
+        """
+        Recover the interior solution of a superelement from the displacements of its
+        interface nodes, without solving the parent model again.
+
+        :param element_id: ID of a Superelement in the parent model.
+        :return: Output of the substructure's model, in substructure coordinates.
+        """
+        set_number, position = self.mesh.locate_elements()
+        element_set = self.mesh.element_sets[set_number[element_id]]
+        if not hasattr(element_set, 'recover'):
+            raise ValueError(f"Element {element_id} is not a superelement.")
+        index = int(position[element_id])
+        u = self.q[self.mesh.element_dofs(element_set, [index]), 0][0]
+        return element_set.recover(u, index)
+
+    def write_nodal_results(self, path, chunk_size=100000):
+        """
+        Write the nodal results in chunks, without building per-node objects. The columns are
+        node, x, y, ux, uy, rz, fx, fy, mz (NaN for DOFs a node does not have).
+
+        :param path: .csv file name, or .npy file name for a binary (n_nodes, 9) table.
+        :param chunk_size: Number of nodes computed and written at a time.
+        """
+        header = ['node', 'x', 'y', 'ux', 'uy', 'rz', 'fx', 'fy', 'mz']
+
+        def chunks():
+            for start in range(0, self.mesh.n_nodes, chunk_size):
+                rows = np.arange(start, min(start + chunk_size, self.mesh.n_nodes))
+                global_dof = self.mesh.global_dof[rows]
+                exists = global_dof >= 0
+                u = np.where(exists, self.q[global_dof.clip(0), 0], np.nan)
+                f = np.where(exists, self.F[global_dof.clip(0), 0], np.nan)
+                yield np.column_stack([rows, self.mesh.coords[rows], u, f])
+
+        _write_table(path, header, self.mesh.n_nodes, chunks())
+
+    def write_element_results(self, path, chunk_size=100000):
+        """
+        Write the element results in chunks, recovering them set by set without building
+        per-element objects. The columns are the element ID followed by every result
+        component of the element types in the model (e.g. force, stress_0, stress_1, stress_2),
+        NaN where an element type has no such result. Rows are ordered by element set.
+
+        :param path: .csv file name, or .npy file name for a binary (n_elements, n_columns) table.
+        :param chunk_size: Number of elements computed and written at a time.
+        """
+        fields = []
+        for element_set in self.mesh.element_sets:
+            fields += [field for field in element_set.result_fields if field not in fields]
+        header, column = ['element'], {}
+        for name, size in fields:
+            column[name] = len(header)
+            header += [name] if size == 1 else [f'{name}_{i}' for i in range(size)]
+
+        def chunks():
+            for element_set in self.mesh.element_sets:
+                for start in range(0, len(element_set), chunk_size):
+                    indices = np.arange(start, min(start + chunk_size, len(element_set)))
+                    u = self.q[self.mesh.element_dofs(element_set, indices), 0]
+                    table = np.full((len(indices), len(header)), np.nan)
+                    table[:, 0] = element_set.ids[indices]
+                    for name, value in element_set.local_results(u, indices).items():
+                        value = value.reshape(len(indices), -1)
+                        table[:, column[name]:column[name] + value.shape[1]] = value
+                    yield table
+
+        _write_table(path, header, self.mesh.n_elements, chunks())
+
+    def plot2DBars(self, factor=0, contour=None, text=None, show_constraints=False, show_force=False,
+                   path=None, max_elements=None, dpi=150):
+        """
+        Plot the undeformed and deformed shapes of the rod and beam elements.
+        See fem.plotting.plot_bars; matplotlib is only imported on the first plot.
+        """
+        from fem.plotting import plot_bars
+        return plot_bars(self, factor, contour, text, show_constraints, show_force, path, max_elements, dpi)
+
+    def plot2DArea(self, factor=0, show_constraints=False, show_force=False, *, contour=None,
+                   path=None, max_elements=None, dpi=150):
+        """
+        Plot the undeformed and deformed shapes of the membrane elements.
+        See fem.plotting.plot_area; matplotlib is only imported on the first plot. The
+        positional parameters are those of the original method; the others are keyword-only.
+        """
+        from fem.plotting import plot_area
+        return plot_area(self, factor, contour, show_constraints, show_force, path, max_elements, dpi)
+
+
+def _write_table(path, header, n_rows, chunks):
+    """
+    Stream the chunks of a table to a CSV file, or to a memory-mapped .npy file.
+
+    :param path: .csv or .npy file name.
+    :param header: Column names (written as the first line of CSV files).
+    :param n_rows: Total number of rows.
+    :param chunks: Iterable of 2D arrays with the rows of the table, in order.
+    """
+    if str(path).endswith('.csv'):
+        with open(path, 'w') as file:
+            file.write(','.join(header) + '\n')
+            for chunk in chunks:
+                np.savetxt(file, chunk, delimiter=',', fmt='%.10g')
+        return
+
+    table = np.lib.format.open_memmap(path, mode='w+', dtype=float, shape=(n_rows, len(header)))
+    start = 0
+    for chunk in chunks:
+        table[start:start + len(chunk)] = chunk
+        start += len(chunk)
+    table.flush()
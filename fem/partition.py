@@ -0,0 +1,175 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.linalg import lu_factor, lu_solve
+from fem.operator import ElementOperator
+
+
+class PartitionedSystem:
+    def __init__(self, K, dof_free):
+        """
+        Initialize a PartitionedSystem, the stiffness matrix split into free (f) and
+        constrained (c) blocks:
+
+            | K_ff  K_fc | | q_f |   | F_f |
+            | K_cf  K_cc | | q_c | = | F_c |
+
+        The blocks are extracted once per constraint set and the factorization of K_ff is
+        cached, so repeated solves only pay for back-substitution.
+
+        :param K: Global stiffness matrix (dense array, scipy sparse matrix or ElementOperator).
+        :param dof_free: Boolean mask of the free global DOFs.
+        """
+        self.dof_free = np.asarray(dof_free, dtype=bool)
+        self.free = np.flatnonzero(self.dof_free)  # Global index of each free DOF
+        self.constrained = np.flatnonzero(~self.dof_free)  # Global index of each constrained DOF
+
+        self.free_index = np.full(len(self.dof_free), -1)  # Position of each global DOF among the free DOFs
+        self.free_index[self.free] = np.arange(len(self.free))
+        self._extract_blocks(K)
+
+        self.solver = None
+        self._solve = None
+        self._reset_updates()
+
+    def _extract_blocks(self, K):
+        """
+        Split the global stiffness matrix into its free and constrained blocks.
+        """
+        if isinstance(K, ElementOperator):
+            # Off-diagonal blocks are applied through the full operator instead of being stored
+            self.K = K
+            self.K_ff = K.reduce(self.dof_free)
+            self.K_fc = self.K_cf = self.K_cc = None
+        else:
+            self.K = None
+            K = sp.csr_matrix(K) if sp.issparse(K) else np.asarray(K)
+            K_f = K[self.free]
+            K_c = K[self.constrained]
+            self.K_ff = K_f[:, self.free]
+            self.K_fc = K_f[:, self.constrained]
+            self.K_cf = K_c[:, self.free]
+            self.K_cc = K_c[:, self.constrained]
+
+    def _reset_updates(self):
+        """
+        Forget the low-rank corrections accumulated since the last factorization.
+        """
+        self.update_index = np.empty(0, dtype=np.int64)  # Free DOFs whose stiffness changed
+        self.update_delta = np.zeros((0, 0))  # Accumulated change of K_ff on those DOFs
+        self._update_basis = np.zeros((len(self.free), 0))  # K_ff0^-1 restricted to those columns
+        self._capacitance = None
+
+    def factorize(self, solver):
+        """
+        Factorize K_ff with a solver, reusing the cached factorization for the same solver.
+
+        :param solver: Solver object.
+        :return: Function solving K_ff x = b.
+        """
+        if self._solve is None or solver is not self.solver:
+            self.solver = solver
+            self._solve = solver.factorize(self.K_ff)
+            self._reset_updates()
+        if self._capacitance is not None:
+            return self._woodbury_solve
+        return self._solve
+
+    def update(self, K, dofs, delta, threshold=0.05):
+        """
+        Apply a local stiffness change to the partitioned system.
+
+        The factorization of K_ff is kept and the accumulated change is handled as a low-rank
+        Sherman-Morrison-Woodbury correction. Once the changed free DOFs exceed a fraction
+        threshold of all free DOFs (or with an iterative solver) K_ff is refactorized on the next solve.
+
+        :param K: Updated global stiffness matrix.
+        :param dofs: Global DOFs touched by the change, shape (m,).
+        :param delta: Change of the global stiffness on those DOFs, shape (m, m).
+        :param threshold: Fraction of changed free DOFs beyond which K_ff is refactorized.
+        """
+        self._extract_blocks(K)
+        local = self.free_index[dofs]
+        keep = local >= 0
+        local, delta = local[keep], delta[np.ix_(keep, keep)]
+
+        index = np.union1d(self.update_index, local)
+        if self._solve is None or self.solver.iterative or len(index) > threshold * len(self.free):
+            self._solve = None
+            self._reset_updates()
+            return
+
+        # Accumulate the change of K_ff on the union of changed free DOFs
+        C = np.zeros((len(index), len(index)))
+        old = np.searchsorted(index, self.update_index)
+        C[np.ix_(old, old)] = self.update_delta
+        new = np.searchsorted(index, local)
+        np.add.at(C, (new[:, None], new[None, :]), delta)
+
+        # Extend K_ff0^-1 U with the columns of newly changed DOFs only
+        Y = np.zeros((len(self.free), len(index)))
+        Y[:, old] = self._update_basis
+        added = np.setdiff1d(index, self.update_index)
+        E = np.zeros((len(self.free), len(added)))
+        E[added, np.arange(len(added))] = 1
+        Y[:, np.searchsorted(index, added)] = self._solve(E).reshape(E.shape)
+
+        self.update_index, self.update_delta, self._update_basis = index, C, Y
+        self._capacitance = lu_factor(np.eye(len(index)) + C @ Y[index])
+
+    def _woodbury_solve(self, b):
+        """
+        Solve (K_ff0 + U C U^T) x = b with the factorization of K_ff0:
+        x = x0 - Y (I + C Y_u)^-1 C x0_u, with x0 = K_ff0^-1 b and Y = K_ff0^-1 U.
+        """
+        x = self._solve(b)
+        z = lu_solve(self._capacitance, self.update_delta @ x[self.update_index])
+        return x - self._update_basis @ z
+
+    def coupling(self, q_c):
+        """
+        Forces on the free DOFs caused by prescribed displacements, K_fc @ q_c.
+
+        :param q_c: Prescribed displacements, shape (n_c,) or (n_c, m).
+        """
+        if self.K is not None:
+            return self._apply_full(np.zeros((len(self.free),) + np.shape(q_c)[1:]), q_c)[self.free]
+        return self.K_fc @ q_c
+
+    def reactions(self, q_f, q_c):
+        """
+        Forces on the constrained DOFs, K_cf @ q_f + K_cc @ q_c.
+
+        :param q_f: Displacements of the free DOFs, shape (n_f,) or (n_f, m).
+        :param q_c: Prescribed displacements, shape (n_c,) or (n_c, m).
+        """
+        if self.K is not None:
+            return self._apply_full(q_f, q_c)[self.constrained]
+        return self.K_cf @ q_f + self.K_cc @ q_c
+
+    def solve(self, solver, F_f, q_c, x0=None):
+        """
+        Solve K_ff q_f = F_f - K_fc q_c for the free displacements.
+
+        :param solver: Solver object.
+        :param F_f: Applied forces on the free DOFs, shape (n_f,) or (n_f, m).
+        :param q_c: Prescribed displacements, shape (n_c,) or (n_c, m).
+        :param x0: Optional initial guess for iterative solvers.
+        :return: Free displacements with the shape of F_f.
+        """
+        rhs = F_f - self.coupling(q_c) if np.any(q_c) else F_f
+        solve = self.factorize(solver)
+        if x0 is not None and solver.iterative:
+            return solve(rhs, x0)
+        return solve(rhs)
+
+    def _apply_full(self, q_f, q_c):
+        """
+        Apply the full operator to a vector assembled from its free and constrained parts.
+        """
+        q = np.zeros((len(self.dof_free),) + np.shape(q_f)[1:])
+        q[self.free] = q_f
+        q[self.constrained] = q_c
+        return self.K @ q
+
+    def __repr__(self):
+        return f"PartitionedSystem:\n Free DOFs = {len(self.free)}\n Constrained DOFs = {len(self.constrained)}\n"
@@ -0,0 +1,177 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
+from fem.element_set import ElementLineSet, ElementMembraneSet
+
+PLOT_MAX_NODE_MARKERS = 2000  # Nodes are not marked on larger meshes, where markers would hide the elements
+
+# Contour names of the plots: (element result, component)
+PLOT_CONTOURS_BARS = {'Force': ('force', None), 'Deformation': ('deformation', None)}
+PLOT_CONTOURS_AREA = {'Stress': ('von_mises', None), 'Sxx': ('stress', 0), 'Syy': ('stress', 1), 'Sxy': ('stress', 2)}
+
+
+def plot_bars(output, factor=0, contour=None, text=None, show_constraints=False, show_force=False,
+              path=None, max_elements=None, dpi=150):
+    """
+    Plot the undeformed and deformed shapes of the rod and beam elements of an Output. Each
+    shape is drawn as one LineCollection, colored by an array of element values for contours.
+
+    :param output: Output object of a solved model.
+    :param factor: Scale factor for the deformed shape.
+    :param contour: Element result used to color the deformed shape: 'Force' or 'Deformation'.
+    :param text: Element result written next to each element: 'Force' or 'Deformation'.
+    :param show_constraints: If True, draw the constrained DOFs.
+    :param show_force: If True, draw the applied loads.
+    :param path: File to save the figure to (e.g. .png or .svg), rendered with the Agg
+                 backend without a display. If None, the figure is shown.
+    :param max_elements: Draw at most about this many elements, evenly decimated.
+    :param dpi: Resolution of saved raster images.
+    """
+    sets = [s for s in output.mesh.element_sets if isinstance(s, ElementLineSet)]
+    fig, ax = _figure(path)
+    _plot_elements(output, ax, sets, factor, contour, text, max_elements, PLOT_CONTOURS_BARS, filled=False)
+    _plot_boundary_conditions(output, ax, factor, show_constraints, show_force)
+    title = f'Undeformed and Deformed Shapes (Scale factor = {factor:.1f}, Contour = {contour}, Text = {text})'
+    return _finish(fig, ax, title, path, dpi)
+
+
+def plot_area(output, factor=0, contour=None, show_constraints=False, show_force=False,
+              path=None, max_elements=None, dpi=150):
+    """
+    Plot the undeformed and deformed shapes of the membrane elements (CST, T6, Q4 and Q8) of an
+    Output. Each shape is
+    drawn as one PolyCollection, colored by an array of element values for contours.
+
+    :param output: Output object of a solved model.
+    :param factor: Scale factor for the deformed shape.
+    :param contour: Element stress used to color the deformed shape: 'Stress' (von Mises),
+                    'Sxx', 'Syy' or 'Sxy'.
+    :param show_constraints: If True, draw the constrained DOFs.
+    :param show_force: If True, draw the applied loads.
+    :param path: File to save the figure to (e.g. .png or .svg), rendered with the Agg
+                 backend without a display. If None, the figure is shown.
+    :param max_elements: Draw at most about this many elements, evenly decimated.
+    :param dpi: Resolution of saved raster images.
+    """
+    sets = [s for s in output.mesh.element_sets if isinstance(s, ElementMembraneSet)]
+    fig, ax = _figure(path)
+    _plot_elements(output, ax, sets, factor, contour, None, max_elements, PLOT_CONTOURS_AREA, filled=True)
+    _plot_boundary_conditions(output, ax, factor, show_constraints, show_force)
+    title = f'Undeformed and Deformed Shapes (Scale factor = {factor:.1f}, Contour = {contour})'
+    return _finish(fig, ax, title, path, dpi)
+
+
+def _plot_elements(output, ax, sets, factor, contour, text, max_elements, contours, filled):
+    """
+    Draw the undeformed and deformed elements of some element sets as two collections:
+    LineCollections for line elements, or translucent PolyCollections if filled.
+    """
+    def collection(xy, color, **kwargs):
+        # Without a color, the collection is colored by its array of element values
+        if color is None:
+            return PolyCollection(xy, closed=True, **kwargs) if filled else LineCollection(xy, **kwargs)
+        if filled:
+            return PolyCollection(xy, closed=True, edgecolors=color, facecolors=to_rgba(color, 0.2), **kwargs)
+        return LineCollection(xy, colors=color, **kwargs)
+
+    if output.displacements is None:
+        output.compute_nodal_results()
+    if (contour or text) and output.element_results is None:
+        output.compute_element_results()
+
+    # Boundary node order of each element, padded by repeating the last node so that element
+    # types with different node counts share one array
+    outlines = [s.connectivity if getattr(s, 'outline', None) is None else s.connectivity[:, s.outline] for s in sets]
+    width = max((o.shape[1] for o in outlines), default=2)
+    connectivity = [np.pad(o, ((0, 0), (0, width - o.shape[1])), mode='edge') for o in outlines]
+    ids = [s.ids for s in sets]
+    connectivity = np.concatenate(connectivity) if connectivity else np.empty((0, 2), dtype=np.int64)
+    ids = np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+    if max_elements is not None and len(ids) > max_elements:
+        # A fixed random sample covers the mesh evenly whatever its numbering
+        keep = np.sort(np.random.default_rng(0).choice(len(ids), max_elements, replace=False))
+        connectivity, ids = connectivity[keep], ids[keep]
+
+    undeformed = output.mesh.coords[connectivity]
+    deformed = undeformed + factor * output.displacements[connectivity, :2]
+    nodes = np.unique(connectivity)
+    ax.add_collection(collection(undeformed, 'gray', linestyles='--', label='Undeformed Shape'))
+    if contour:
+        name, component = contours[contour]
+        values = output.element_results[name][ids]
+        if component is not None:
+            values = values[:, component]
+        deformed_collection = collection(deformed, None, array=values, cmap='jet', label='Deformed Shape')
+        ax.add_collection(deformed_collection)
+        ax.figure.colorbar(deformed_collection, ax=ax, label=contour)
+    else:
+        ax.add_collection(collection(deformed, 'k', label='Deformed Shape'))
+
+    if len(nodes) <= PLOT_MAX_NODE_MARKERS:
+        ax.plot(*output.mesh.coords[nodes].T, 'o', color='gray', linestyle='none')
+        ax.plot(*(output.mesh.coords[nodes] + factor * output.displacements[nodes, :2]).T, 'o', color='k',
+                linestyle='none')
+
+    if text:
+        centers = deformed.mean(axis=1)
+        values = output.element_results[contours[text][0]][ids]
+        fmt = "{:.2f}" if text == 'Deformation' else "{:.0f}"
+        for (x, y), value in zip(centers, values):
+            ax.text(x, y, fmt.format(value))
+
+
+def _plot_boundary_conditions(output, ax, factor, show_constraints, show_force):
+    """
+    Draw the constraints and loads on translational DOFs, each as one quiver plot.
+    Constraint arrows point at their node; load arrows start at it and scale with the load.
+    """
+    position = output.mesh.coords + factor * output.displacements[:, :2]
+    scale = np.abs(position).max(initial=0)
+
+    def arrows(conditions, length, color, to_node):
+        node = np.array([c.node for c in conditions if c.dof < 2], dtype=np.int64)
+        dof = np.array([c.dof for c in conditions if c.dof < 2], dtype=np.int64)
+        length = np.broadcast_to(length, node.shape)
+        vector = np.column_stack([length * (1 - dof), length * dof])
+        tail = position[node] - vector if to_node else position[node]
+        ax.quiver(*tail.T, *vector.T, angles='xy', scale_units='xy', scale=1, color=color)
+
+    if show_constraints and output.constraints:
+        arrows(output.constraints, 0.1 * scale, 'cyan', to_node=True)
+    if show_force and output.loads:
+        values = np.array([l.value for l in output.loads if l.dof < 2])
+        scalef = np.abs(values).max(initial=0) or 1
+        arrows(output.loads, values * 0.5 * scale / scalef, 'green', to_node=False)
+
+
+def _figure(path):
+    """
+    Create the figure of a plot: a pyplot figure to show, or a figure rendered by the Agg
+    canvas when it is saved to a file, which needs no display.
+    """
+    if path is None:
+        fig = plt.figure(figsize=(10, 8))
+    else:
+        fig = Figure(figsize=(10, 8))
+        FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+
+def _finish(fig, ax, title, path, dpi):
+    """
+    Label a plot and show it, or save it to path.
+    """
+    ax.autoscale_view()
+    ax.set_xlabel('X Coordinate')
+    ax.set_ylabel('Y Coordinate')
+    ax.set_title(title)
+    ax.set_aspect('equal', adjustable='datalim')  # Ensure aspect ratio is equal to show accurate deformations
+    ax.legend(loc='upper right')  # 'best' would test every element for overlap
+    if path is None:
+        plt.show()
+    else:
+        fig.savefig(path, dpi=dpi)
+    return fig
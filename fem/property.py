@@ -14,6 +14,15 @@ class Property:
         Property.property_count += 1
         self.name = name
 
+    def key(self):
+        """
+        Hashable description of the property values and its material, without names and IDs,
+        so that identical properties give equal keys.
+        """
+        values = sorted((key, value) for key, value in vars(self).items() if key not in ('id', 'name', 'material'))
+        material = self.material
+        return (type(self).__name__, tuple(values), material.youngs_modulus, material.poissons_ratio, material.density)
+
     def __repr__(self) -> str:
         return (f"Property:\n ID = {self.id}\n Name = {self.name}\n"
                 f"Material = {self.material.material_id}\n")
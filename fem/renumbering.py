@@ -0,0 +1,78 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+
+
+class RenumberingReport:
+    def __init__(self, bandwidth_before, profile_before, bandwidth_after, profile_after):
+        """
+        Initialize a RenumberingReport.
+
+        :param bandwidth_before: Half-bandwidth of the stiffness matrix in node-list order.
+        :param profile_before: Profile (envelope size) of the stiffness matrix in node-list order.
+        :param bandwidth_after: Half-bandwidth after renumbering.
+        :param profile_after: Profile after renumbering.
+        """
+        self.bandwidth_before = bandwidth_before
+        self.profile_before = profile_before
+        self.bandwidth_after = bandwidth_after
+        self.profile_after = profile_after
+
+    def __repr__(self):
+        return (f"RenumberingReport:\n Bandwidth = {self.bandwidth_before} -> {self.bandwidth_after}\n"
+                f" Profile = {self.profile_before} -> {self.profile_after}\n")
+
+
+def node_graph(mesh):
+    """
+    Build the node adjacency graph of a mesh: two nodes are adjacent when they share an element.
+
+    :param mesh: Mesh object.
+    :return: Sparse (n_nodes, n_nodes) CSR matrix.
+    """
+    rows, cols = [], []
+    for element_set in mesh.element_sets:
+        connectivity = element_set.connectivity
+        n = connectivity.shape[1]
+        rows.append(np.repeat(connectivity, n, axis=1).ravel())
+        cols.append(np.tile(connectivity, (1, n)).ravel())
+    rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+    cols = np.concatenate(cols) if cols else np.empty(0, dtype=np.int64)
+    size = mesh.n_nodes
+    return sp.coo_matrix((np.ones(len(rows)), (rows, cols)), shape=(size, size)).tocsr()
+
+
+def reverse_cuthill_mckee_order(mesh):
+    """
+    Compute a bandwidth-reducing node order with the Reverse Cuthill-McKee algorithm.
+
+    :param mesh: Mesh object.
+    :return: Array with the node indices in their new order.
+    """
+    return np.asarray(reverse_cuthill_mckee(node_graph(mesh), symmetric_mode=True), dtype=np.int64)
+
+
+def envelope(mesh, order=None):
+    """
+    Compute the half-bandwidth and profile of the stiffness matrix for a node numbering,
+    without assembling it.
+
+    :param mesh: Mesh object.
+    :param order: Node indices in numbering order. Defaults to mesh order.
+    :return: Tuple (bandwidth, profile).
+    """
+    if order is None:
+        order = np.arange(mesh.n_nodes)
+    counts = mesh.node_dof[order]
+    first_dof = np.empty(mesh.n_nodes, dtype=np.int64)
+    first_dof[order] = np.cumsum(counts) - counts
+
+    size = int(counts.sum())
+    row_first = np.arange(size)  # First non-zero column of each row (diagonal by default)
+    for element_set in mesh.element_sets:
+        dofs = first_dof[element_set.connectivity][:, :, None] + np.arange(element_set.dof_per_node)
+        dofs = dofs.reshape(len(element_set), -1)
+        np.minimum.at(row_first, dofs, dofs.min(axis=1, keepdims=True))
+
+    row_width = np.arange(size) - row_first
+    return int(row_width.max(initial=0)), int(row_width.sum())
@@ -0,0 +1,510 @@
+"""
+Local solve service: a long-running daemon that keeps assembled and factorized systems in
+memory, so that short-lived scripts solving the same model with new loads only pay for a
+back-substitution.
+
+The server listens on a Unix socket (or a localhost TCP port) and exchanges pickled frames
+with its clients. Pickle runs arbitrary code on loading, so the service is meant for trusted
+local clients only. The socket file is created readable and writable by its owner only. Over
+TCP, which any local user can reach, a client must first send the secret token stored in a file
+readable by its owner only (DEFAULT_TOKEN_PATH); nothing is unpickled before it matches.
+
+Usage:
+    python -m fem.service [--path /tmp/fem.sock | --port 8765 [--token-file ~/.fem-solver-token]]
+                          [--workers 2] [--cache-mb 1024]
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import multiprocessing
+import os
+import pickle
+import secrets
+import socket
+import struct
+import tempfile
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import scipy.sparse as sp
+from fem.boundary_condition import LoadCase
+
+HEADER = struct.Struct('!Q')  # Byte length of the pickled frame that follows
+DEFAULT_PATH = os.path.join(tempfile.gettempdir(), f"fem-solver-{os.getuid() if hasattr(os, 'getuid') else 0}.sock")
+DEFAULT_TOKEN_PATH = os.path.join(os.path.expanduser('~'), '.fem-solver-token')
+TOKEN_BYTES = 32  # Length of the secret a TCP client sends before its first frame
+
+
+class ServiceError(RuntimeError):
+    """
+    Raised by SolveClient when the server fails to run a job, and for unsafe token files.
+    """
+
+
+def read_token(path=None, create=False):
+    """
+    Read the secret token of TCP connections, checking that only its owner can read it.
+
+    :param path: Token file (default is DEFAULT_TOKEN_PATH).
+    :param create: If True, create the file with a new random token when it does not exist.
+    :return: Token bytes.
+    """
+    path = path or DEFAULT_TOKEN_PATH
+    if create and not os.path.exists(path):
+        descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(descriptor, 'w') as file:
+            file.write(secrets.token_hex(TOKEN_BYTES))
+    status = os.stat(path)
+    if hasattr(os, 'getuid') and (status.st_mode & 0o077 or status.st_uid != os.getuid()):
+        raise ServiceError(f"The token file {path} must be owned by the current user and readable by its owner only.")
+    with open(path) as file:
+        token = bytes.fromhex(file.read().strip())
+    if len(token) != TOKEN_BYTES:
+        raise ServiceError(f"The token file {path} does not hold a {TOKEN_BYTES}-byte token.")
+    return token
+
+
+def system_key(model):
+    """
+    Hash everything the assembled and factorized system of a model depends on: solver
+    settings, node coordinates and DOFs, element connectivity and properties, and the
+    constrained DOFs. Loads and the values of prescribed displacements are left out, since
+    they only change the right-hand side.
+
+    :param model: Model object.
+    :return: Hexadecimal SHA-256 digest.
+    """
+    mesh = model.mesh
+    h = hashlib.sha256()
+    h.update(repr((model.sparse, model.matrix_free, model.renumber, model.solver.settings())).encode())
+    for array in (mesh.coords, mesh.node_dof):
+        h.update(np.ascontiguousarray(array).tobytes())
+    for element_set in mesh.element_sets:
+        h.update(type(element_set).__name__.encode())
+        h.update(np.ascontiguousarray(element_set.connectivity).tobytes())
+        h.update(np.ascontiguousarray(element_set.property_index).tobytes())
+        for p in element_set.properties:
+            h.update((p.content_hash() if hasattr(p, 'content_hash') else repr(p.key())).encode())
+    h.update(np.array([(c.node, c.dof) for c in model.constraints], dtype=np.int64).tobytes())
+    return h.hexdigest()
+
+
+def system_bytes(model):
+    """
+    Estimate the memory held by a solved model: the global matrix and vectors, the blocks of
+    its partitioned systems and their factorizations.
+
+    :param model: Solved Model object.
+    :return: Number of bytes.
+    """
+    total = sum(_footprint(array) for array in (model.K, model.F, model.q))
+    for partition in model._partitions.values():
+        total += sum(_footprint(block) for block in (partition.K_ff, partition.K_fc, partition.K_cf, partition.K_cc))
+        total += _footprint(partition._solve)
+    return total
+
+
+def _footprint(obj):
+    """
+    Bytes of an array, a sparse matrix, a SuperLU factorization or the arrays captured by a
+    solve function.
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if sp.issparse(obj):
+        return sum(getattr(obj, name).nbytes for name in ('data', 'indices', 'indptr') if hasattr(obj, name))
+    if hasattr(obj, 'nnz') and hasattr(obj, 'perm_r'):  # SuperLU: value and row index per factor entry
+        return 12 * obj.nnz
+    if callable(obj):
+        cells = [cell.cell_contents for cell in getattr(obj, '__closure__', None) or ()]
+        return sum(_footprint(value) for value in cells + [getattr(obj, '__self__', None)])
+    if isinstance(obj, tuple):
+        return sum(_footprint(value) for value in obj)
+    return 0
+
+
+class SystemCache:
+    def __init__(self, max_bytes=2**30):
+        """
+        Initialize a SystemCache, which keeps solved models (with their assembled stiffness
+        matrix and cached factorizations) by system key. Beyond max_bytes (see system_bytes),
+        the least recently used models are evicted; the most recent one is always kept.
+
+        :param max_bytes: Memory budget of the cached systems.
+        """
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (model, bytes)
+
+    def get(self, key):
+        """
+        :return: Cached Model with this system key, or None.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, model):
+        """
+        Store a solved model, evicting the least recently used ones beyond the budget.
+        """
+        if key in self._entries:
+            self.bytes -= self._entries.pop(key)[1]
+        size = system_bytes(model)
+        self._entries[key] = (model, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            self.bytes -= self._entries.popitem(last=False)[1][1]
+            self.evictions += 1
+
+    def stats(self):
+        """
+        :return: Dict of the cache counters.
+        """
+        return {'entries': len(self), 'bytes': self.bytes, 'max_bytes': self.max_bytes, 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions}
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return (f"SystemCache:\n Entries = {len(self)}\n Bytes = {self.bytes}/{self.max_bytes}\n Hits = {self.hits}\n"
+                f" Misses = {self.misses}\n Evictions = {self.evictions}\n")
+
+
+_SYSTEMS = None  # SystemCache of a worker process
+
+
+def _start_worker(max_bytes):
+    global _SYSTEMS
+    _SYSTEMS = SystemCache(max_bytes)
+
+
+def run_job(request):
+    """
+    Run one solve job in a worker process. A cached system is reused with the new loads and
+    prescribed displacements (a back-substitution only); otherwise the model sent with the
+    request is solved and cached.
+
+    :param request: Dict with 'key', 'model' (or None), 'loads', 'constraints' and 'load_cases'.
+    :return: Dict with 'status' ('ok' or 'missing'), and for solved jobs the global vectors 'q'
+             and 'F', 'cached' and 'wall_time'.
+    """
+    start = time.perf_counter()
+    key = request['key']
+    model = _SYSTEMS.get(key)
+    cached = model is not None
+    if model is None:
+        model = request['model']
+        if model is None:
+            return {'status': 'missing'}
+    model.loads = request['loads']
+    model.constraints = request['constraints']
+    load_cases = request['load_cases']
+
+    if cached:
+        # Same stiffness and constrained DOFs: rebuild the right-hand side and back-substitute
+        model.q = np.full((len(model.q), 1), np.nan)
+        model.F = np.full((len(model.F), 1), np.nan)
+        model.assemble_displacements_vector()
+        model.assemble_force_vector(load_cases)
+        model.solve_eqs()
+        model.load_cases = load_cases
+    else:
+        model.solve(load_cases)
+    _SYSTEMS.put(key, model)
+    return {'status': 'ok', 'q': model.q, 'F': model.F, 'cached': cached, 'wall_time': time.perf_counter() - start}
+
+
+def _cache_stats(_=None):
+    return _SYSTEMS.stats()
+
+
+async def _read_frame(reader):
+    size = HEADER.unpack(await reader.readexactly(HEADER.size))[0]
+    return pickle.loads(await reader.readexactly(size))
+
+
+def _frame(obj):
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    return HEADER.pack(len(data)) + data
+
+
+class SolveServer:
+    def __init__(self, path=None, host='127.0.0.1', port=None, workers=None, cache_bytes=2**30, token_path=None):
+        """
+        Initialize a SolveServer, an asyncio daemon that queues solve jobs onto worker
+        processes. Each worker keeps its own SystemCache of cache_bytes / workers, and all jobs
+        of one system key go to the same worker, so repeated solves of a model with new loads
+        find its factorization in memory.
+
+        :param path: Unix socket path (default is DEFAULT_PATH unless a port is given).
+        :param host: Host of the TCP socket, used when a port is given.
+        :param port: TCP port (0 picks a free one), instead of a Unix socket.
+        :param workers: Number of worker processes (default is the number of CPUs).
+        :param cache_bytes: Total memory budget of the cached systems.
+        :param token_path: Token file TCP clients must prove they can read (default is
+                           DEFAULT_TOKEN_PATH, created with a new token if missing).
+        """
+        self.path = path if path is not None or port is not None else DEFAULT_PATH
+        self.token_path = token_path
+        self._token = None
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_bytes = cache_bytes
+        self.jobs = 0
+        self._assignment = {}  # System key -> worker index
+        self._pending = [0] * self.workers  # Jobs queued on each worker
+        self._executors = []
+        self._server = None
+        self._stopped = None
+
+    @property
+    def address(self):
+        """
+        Address clients connect to: the socket path, or a (host, port) tuple.
+        """
+        if self.port is None:
+            return self.path
+        return self._server.sockets[0].getsockname()[:2] if self._server else (self.host, self.port)
+
+    async def start(self):
+        """
+        Start the worker processes and listen for clients.
+        """
+        context = multiprocessing.get_context('spawn')  # Workers never inherit the event loop
+        self._executors = [ProcessPoolExecutor(1, context, _start_worker, (self.cache_bytes // self.workers,))
+                           for _ in range(self.workers)]
+        self._stopped = asyncio.Event()
+        if self.port is None:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            mask = os.umask(0o177)  # The socket file is created owner-only, before any client can connect
+            try:
+                self._server = await asyncio.start_unix_server(self._handle, self.path)
+            finally:
+                os.umask(mask)
+        else:
+            self._token = read_token(self.token_path, create=True)
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Spawn the workers now, so the first job does not wait for their imports
+        await asyncio.gather(*(self._submit(i, _cache_stats, None) for i in range(self.workers)))
+
+    async def serve_forever(self):
+        """
+        Serve until a client sends a shutdown request.
+        """
+        async with self._server:
+            await self._stopped.wait()
+        await self.close()
+
+    async def close(self):
+        """
+        Stop listening and shut the worker processes down.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            if self.port is None and os.path.exists(self.path):
+                os.unlink(self.path)
+        for executor in self._executors:
+            executor.shutdown()
+        self._executors = []
+
+    def run(self):
+        """
+        Start the server and block until it is shut down.
+        """
+        async def main():
+            await self.start()
+            await self.serve_forever()
+        asyncio.run(main())
+
+    def _worker(self, key):
+        """
+        Worker of a system key: the one that solved it before, or the least busy one.
+        """
+        if key not in self._assignment:
+            self._assignment[key] = min(range(self.workers), key=lambda i: self._pending[i])
+        return self._assignment[key]
+
+    async def _submit(self, worker, function, argument):
+        loop = asyncio.get_running_loop()
+        self._pending[worker] += 1
+        try:
+            return await loop.run_in_executor(self._executors[worker], function, argument)
+        finally:
+            self._pending[worker] -= 1
+
+    async def _handle(self, reader, writer):
+        """
+        Answer the requests of one connection in order.
+        """
+        try:
+            if self._token is not None:
+                secret = await reader.readexactly(TOKEN_BYTES)
+                if not hmac.compare_digest(secret, self._token):
+                    return  # Unauthenticated TCP client; nothing of it is unpickled
+            while True:
+                try:
+                    request = await _read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                try:
+                    response = await self._dispatch(request)
+                except Exception as error:
+                    response = {'status': 'error', 'error': repr(error), 'traceback': traceback.format_exc()}
+                writer.write(_frame(response))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass  # Client gone, or server shutting down
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request):
+        op = request.get('op')
+        if op == 'solve':
+            key = request['key']
+            if request['model'] is None and key not in self._assignment:
+                return {'status': 'missing'}
+            self.jobs += 1
+            return await self._submit(self._worker(key), run_job, request)
+        if op == 'stats':
+            caches = [await self._submit(i, _cache_stats, None) for i in range(self.workers)]
+            return {'status': 'ok', 'jobs': self.jobs, 'workers': self.workers, 'systems': len(self._assignment),
+                    'caches': caches}
+        if op == 'shutdown':
+            self._stopped.set()
+            return {'status': 'ok'}
+        raise ValueError(f"Unknown request {op!r}.")
+
+    def __repr__(self):
+        return f"SolveServer:\n Address = {self.address}\n Workers = {self.workers}\n Jobs = {self.jobs}\n"
+
+
+class SolveClient:
+    def __init__(self, path=None, host='127.0.0.1', port=None, timeout=None, token_path=None):
+        """
+        Initialize a SolveClient, a blocking connection to a SolveServer.
+
+        :param path: Unix socket path (default is DEFAULT_PATH unless a port is given).
+        :param host: Host of the TCP socket, used when a port is given.
+        :param port: TCP port of the server, instead of a Unix socket.
+        :param timeout: Socket timeout in seconds (default is none).
+        :param token_path: Token file of the TCP server (default is DEFAULT_TOKEN_PATH).
+        """
+        if port is None:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address = path if path is not None else DEFAULT_PATH
+        else:
+            token = read_token(token_path)
+            self._socket = socket.create_connection((host, port))
+            address = None
+        self._socket.settimeout(timeout)
+        if address is not None:
+            self._socket.connect(address)
+        else:
+            self._socket.sendall(token)
+        self.transfers = 0  # Models sent to the server
+        self.last_response = None  # Response of the last solve, with its 'cached' flag and 'wall_time'
+
+    def _request(self, request):
+        self._socket.sendall(_frame(request))
+        size = HEADER.unpack(self._receive(HEADER.size))[0]
+        response = pickle.loads(self._receive(size))
+        if response['status'] == 'error':
+            raise ServiceError(f"{response['error']}\n{response['traceback']}")
+        return response
+
+    def _receive(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self._socket.recv(min(size - len(data), 2**20))
+            if not chunk:
+                raise ConnectionError("The solve server closed the connection.")
+            data += chunk
+        return bytes(data)
+
+    def solve(self, model, load_cases=None):
+        """
+        Solve a model on the server, like model.solve. The model itself is only sent when the
+        server does not hold its system yet; otherwise only its loads and constraints are.
+
+        :param model: Model object.
+        :param load_cases: Optional list of LoadCase objects or dict mapping case names to lists
+                           of NodalLoad objects.
+        :return: Output object, or a dict mapping each load case name to its Output.
+        """
+        if isinstance(load_cases, dict):
+            load_cases = [LoadCase(name, loads) for name, loads in load_cases.items()]
+        request = {'op': 'solve', 'key': system_key(model), 'model': None, 'loads': model.loads,
+                   'constraints': model.constraints, 'load_cases': load_cases}
+        response = self._request(request)
+        if response['status'] == 'missing':
+            request['model'] = model
+            self.transfers += 1
+            response = self._request(request)
+
+        model.assign_global_dof()
+        model.q = response['q']
+        model.F = response['F']
+        model.load_cases = load_cases
+        self.last_response = response
+        return model._outputs()
+
+    def stats(self):
+        """
+        :return: Dict with the number of jobs, workers and systems of the server, and the
+                 counters of each worker's SystemCache.
+        """
+        return self._request({'op': 'stats'})
+
+    def shutdown(self):
+        """
+        Ask the server to stop.
+        """
+        self._request({'op': 'shutdown'})
+
+    def close(self):
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        return f"SolveClient:\n Transfers = {self.transfers}\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', help=f"Unix socket path (default {DEFAULT_PATH})")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help="Listen on a localhost TCP port instead of a Unix socket")
+    parser.add_argument('--token-file', help=f"Secret token of TCP clients (default {DEFAULT_TOKEN_PATH})")
+    parser.add_argument('--workers', type=int, help="Worker processes (default is the number of CPUs)")
+    parser.add_argument('--cache-mb', type=float, default=1024, help="Memory budget of the cached systems")
+    args = parser.parse_args()
+    server = SolveServer(args.path, args.host, args.port, args.workers, int(args.cache_mb * 2**20), args.token_file)
+    server.run()
+
+
+if __name__ == '__main__':
+    main()
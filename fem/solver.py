@@ -0,0 +1,225 @@
+import warnings
+import numpy as np
+import scipy.sparse as sp
+from scipy.linalg import lu_factor, lu_solve, cholesky_banded, cho_solve_banded
+from scipy.sparse.linalg import splu, spilu, spsolve_triangular
+
+
+class Solver:
+    name = None
+    iterative = False
+
+    def factorize(self, K):
+        """
+        Factorize a (reduced) stiffness matrix.
+
+        :param K: Square stiffness matrix, dense array or scipy sparse matrix.
+        :return: Function that solves K x = b for a right-hand side b of shape (n,) or (n, m).
+        """
+        raise NotImplementedError
+
+    def solve(self, K, F, x0=None):
+        """
+        Solve K q = F.
+
+        :param K: Square stiffness matrix.
+        :param F: Right-hand side, shape (n,) or (n, m).
+        :param x0: Initial guess with the shape of F. Only used by iterative solvers.
+        :return: Solution with the same shape as F.
+        """
+        return self.factorize(K)(F)
+
+    def settings(self):
+        """
+        Configuration of the solver: its type and every attribute that changes the solution,
+        but not its state (e.g. the residual history of an iterative solve).
+
+        :return: Tuple of the type name and the settings.
+        """
+        return (type(self).__name__,)
+
+    def __repr__(self):
+        return f"{type(self).__name__}:\n Name = {self.name}\n"
+
+
+class DirectSolver(Solver):
+    name = 'direct'
+
+    def factorize(self, K):
+        """
+        LU-factorize K: SuperLU for sparse matrices, LAPACK for dense arrays.
+        """
+        if sp.issparse(K):
+            lu = splu(sp.csc_matrix(K))
+            return lu.solve
+        lu = lu_factor(K)
+        return lambda b: lu_solve(lu, b)
+
+
+class BandedCholeskySolver(Solver):
+    name = 'banded'
+
+    def factorize(self, K):
+        """
+        Cholesky-factorize a symmetric positive definite K stored in lower banded form.
+        The cost scales with n * bandwidth**2, so it pays off after bandwidth-reducing renumbering.
+        """
+        ab = lower_banded(K)
+        c = cholesky_banded(ab, lower=True)
+        return lambda b: cho_solve_banded((c, True), b)
+
+
+class PCGSolver(Solver):
+    name = 'pcg'
+    iterative = True
+
+    def __init__(self, preconditioner='jacobi', tol=1e-8, maxiter=None, omega=1.0, drop_tol=1e-4, fill_factor=10):
+        """
+        Initialize a preconditioned conjugate gradient solver for symmetric positive definite systems.
+
+        :param preconditioner: 'jacobi', 'ssor', 'ic' (incomplete factorization) or None.
+        :param tol: Relative residual tolerance ||K q - F|| / ||F||.
+        :param maxiter: Maximum number of iterations per right-hand side (default is 10 * n).
+        :param omega: Relaxation factor of the SSOR preconditioner, 0 < omega < 2.
+        :param drop_tol: Drop tolerance of the incomplete factorization.
+        :param fill_factor: Maximum fill ratio of the incomplete factorization.
+        """
+        self.preconditioner = preconditioner
+        self.tol = tol
+        self.maxiter = maxiter
+        self.omega = omega
+        self.drop_tol = drop_tol
+        self.fill_factor = fill_factor
+        self.history = []  # Relative residual norms of each right-hand side of the last solve
+        self.converged = []
+
+    def factorize(self, K):
+        """
+        Build the preconditioner of K. No factorization of K itself takes place.
+        """
+        M = self.build_preconditioner(K)
+        return lambda b, x0=None: self.iterate(K, b, M, x0)
+
+    def solve(self, K, F, x0=None):
+        return self.factorize(K)(F, x0)
+
+    def settings(self):
+        return (type(self).__name__, self.preconditioner, self.tol, self.maxiter, self.omega, self.drop_tol,
+                self.fill_factor)
+
+    def build_preconditioner(self, K):
+        """
+        Build the preconditioner as a function returning an approximation of K^-1 r.
+
+        The 'ic' preconditioner is an incomplete Cholesky factorization L D L^T built from the
+        lower factor and pivots of SuperLU's threshold ILU, computed in natural order without
+        pivoting or equilibration so that it stays symmetric. Both 'ssor' and 'ic' need the
+        entries of K, so a matrix-free operator only takes 'jacobi' or None.
+
+        :param K: Square stiffness matrix, or linear operator with a diagonal() method.
+        """
+        if self.preconditioner in ('ssor', 'ic') and not (sp.issparse(K) or isinstance(K, np.ndarray)):
+            raise ValueError(f"The '{self.preconditioner}' preconditioner needs an assembled stiffness matrix; "
+                             f"use 'jacobi' or None with matrix-free models.")
+        if self.preconditioner is None:
+            return lambda r: r
+        if self.preconditioner == 'jacobi':
+            inv_diag = 1 / K.diagonal()
+            return lambda r: inv_diag * r
+        if self.preconditioner == 'ssor':
+            K = sp.csr_matrix(K)
+            diag = K.diagonal() / self.omega
+            lower = (sp.tril(K, -1) + sp.diags(diag)).tocsr()
+            upper = (sp.triu(K, 1) + sp.diags(diag)).tocsr()
+            scale = (2 - self.omega) / self.omega
+            return lambda r: scale * spsolve_triangular(upper, diag * spsolve_triangular(lower, r, lower=True), lower=False)
+        if self.preconditioner == 'ic':
+            ilu = spilu(sp.csc_matrix(K), drop_tol=self.drop_tol, fill_factor=self.fill_factor,
+                        permc_spec='NATURAL', diag_pivot_thresh=0.0,
+                        options=dict(Equil=False, SymmetricMode=True))
+            lower = ilu.L.tocsr()
+            upper = ilu.L.T.tocsr()
+            pivots = ilu.U.diagonal()
+            return lambda r: spsolve_triangular(upper, spsolve_triangular(lower, r, lower=True, unit_diagonal=True) / pivots,
+                                                lower=False, unit_diagonal=True)
+        raise ValueError(f"Unknown preconditioner '{self.preconditioner}'.")
+
+    def iterate(self, K, F, M, x0=None):
+        """
+        Run preconditioned conjugate gradient iterations on each column of F.
+
+        :param K: Square stiffness matrix or linear operator.
+        :param F: Right-hand side, shape (n,) or (n, m).
+        :param M: Preconditioner function.
+        :param x0: Initial guess with the shape of F (default is zero).
+        :return: Solution with the same shape as F.
+        """
+        F = np.asarray(F, dtype=float)
+        B = F.reshape(len(F), -1)
+        X = np.zeros_like(B) if x0 is None else np.array(x0, dtype=float).reshape(B.shape)
+        maxiter = self.maxiter or 10 * len(B)
+
+        self.history, self.converged = [], []
+        for j in range(B.shape[1]):
+            X[:, j], history = conjugate_gradient(K, B[:, j], M, X[:, j], self.tol, maxiter)
+            self.history.append(history)
+            self.converged.append(history[-1] <= self.tol)
+            if not self.converged[-1]:
+                warnings.warn(f"PCG did not converge in {maxiter} iterations "
+                              f"(relative residual {history[-1]:.2e}).", RuntimeWarning)
+        return X.reshape(F.shape)
+
+    def __repr__(self):
+        return (f"PCGSolver:\n Preconditioner = {self.preconditioner}\n Tolerance = {self.tol}\n"
+                f" Iterations = {[len(h) - 1 for h in self.history]}\n")
+
+
+def conjugate_gradient(K, b, M, x, tol, maxiter):
+    """
+    Preconditioned conjugate gradient method for one right-hand side.
+
+    :param K: Symmetric positive definite matrix or linear operator.
+    :param b: Right-hand side vector.
+    :param M: Preconditioner function.
+    :param x: Initial guess.
+    :param tol: Relative residual tolerance.
+    :param maxiter: Maximum number of iterations.
+    :return: Tuple (solution, history of relative residual norms).
+    """
+    b_norm = np.linalg.norm(b) or 1.0
+    r = b - K @ x
+    history = [np.linalg.norm(r) / b_norm]
+    if history[-1] <= tol:
+        return x, history
+
+    z = M(r)
+    p = z.copy()
+    rz = r @ z
+    for _ in range(maxiter):
+        Kp = K @ p
+        alpha = rz / (p @ Kp)
+        x = x + alpha * p
+        r = r - alpha * Kp
+        history.append(np.linalg.norm(r) / b_norm)
+        if history[-1] <= tol:
+            break
+        z = M(r)
+        rz_new = r @ z
+        p = z + (rz_new / rz) * p
+        rz = rz_new
+    return x, history
+
+
+def lower_banded(K):
+    """
+    Convert a symmetric matrix to the lower banded storage used by LAPACK.
+
+    :param K: Square matrix, dense array or scipy sparse matrix.
+    :return: Array ab of shape (bandwidth + 1, n) with ab[i - j, j] = K[i, j] for i >= j.
+    """
+    lower = sp.tril(sp.coo_matrix(K))
+    offset = lower.row - lower.col
+    bandwidth = int(offset.max()) if lower.nnz else 0
+    ab = np.zeros((bandwidth + 1, K.shape[0]))
+    np.add.at(ab, (offset, lower.col), lower.data)
+    return ab
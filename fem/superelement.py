@@ -0,0 +1,291 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import scipy.sparse as sp
+from fem.output import Output
+
+
+class Condensation:
+    def __init__(self, key, K, F, T, q0, boundary, interior, constrained, q_c):
+        """
+        Initialize a Condensation, a substructure statically condensed onto its interface
+        (boundary) DOFs. With the interior displacements q_i = q0 + T q_b, the substructure
+        acts on the interface as
+
+            K q_b = F,  K = K_bb + K_bi T,  F = F_b - K_bc q_c - K_bi q0,
+
+        where T = -K_ii^-1 K_ib and q0 = K_ii^-1 (F_i - K_ic q_c) (Schur complement of K_ii).
+
+        :param key: Content hash of the substructure.
+        :param K: Condensed stiffness matrix, shape (n_b, n_b).
+        :param F: Condensed load vector, shape (n_b,).
+        :param T: Interior displacements per unit interface displacement, shape (n_i, n_b).
+        :param q0: Interior displacements with a fixed interface, shape (n_i,).
+        :param boundary: Substructure DOFs of the interface, in interface node order.
+        :param interior: Free substructure DOFs that are not on the interface.
+        :param constrained: Constrained substructure DOFs.
+        :param q_c: Prescribed displacements of the constrained DOFs.
+        """
+        self.key = key
+        self.K = K
+        self.F = F
+        self.T = T
+        self.q0 = q0
+        self.boundary = boundary
+        self.interior = interior
+        self.constrained = constrained
+        self.q_c = q_c
+
+    def __repr__(self):
+        return (f"Condensation:\n Key = {self.key[:12]}\n Interface DOFs = {len(self.boundary)}\n"
+                f" Interior DOFs = {len(self.interior)}\n")
+
+
+class CondensationCache:
+    def __init__(self, directory=None):
+        """
+        Initialize a CondensationCache, which keeps condensed substructures by content hash so
+        that identical substructures are condensed once.
+
+        :param directory: Optional directory where condensations are also stored as .npz files,
+                          to be reused by later runs.
+        """
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, key):
+        """
+        :return: Condensation with this content hash, or None.
+        """
+        condensation = self._entries.get(key)
+        if condensation is None and self.directory is not None and os.path.exists(self._path(key)):
+            with np.load(self._path(key)) as data:
+                condensation = Condensation(key, *(data[name] for name in ARRAY_NAMES))
+            self._entries[key] = condensation
+        if condensation is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return condensation
+
+    def put(self, condensation):
+        """
+        Store a condensation under its content hash.
+        """
+        self._entries[condensation.key] = condensation
+        if self.directory is not None:
+            np.savez(self._path(condensation.key), **{name: getattr(condensation, name) for name in ARRAY_NAMES})
+
+    def clear(self):
+        self._entries = {}
+
+    def __contains__(self, key):
+        return key in self._entries or (self.directory is not None and os.path.exists(self._path(key)))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return (f"CondensationCache:\n Entries = {len(self)}\n Hits = {self.hits}\n Misses = {self.misses}\n"
+                f" Directory = {self.directory}\n")
+
+
+ARRAY_NAMES = ('K', 'F', 'T', 'q0', 'boundary', 'interior', 'constrained', 'q_c')
+DEFAULT_CACHE = CondensationCache()  # Shared by substructures created without a cache
+
+
+class Substructure:
+    def __init__(self, model, interface, name=None, cache=None):
+        """
+        Initialize a Substructure, a sub-model used as a superelement of parent models (see
+        Superelement and ElementSuperSet). It is condensed onto the DOFs of its interface
+        nodes; its own constraints and loads stay inside and act in every parent solve.
+
+        :param model: Model of the substructure, defined in its own coordinates.
+        :param interface: Indices of the sub-model nodes connected to the parent, in the order
+                          of the superelement nodes. They must all have the same number of DOFs
+                          and must not be constrained in the sub-model.
+        :param name: Name of the substructure (default is the model name).
+        :param cache: CondensationCache (default is DEFAULT_CACHE).
+        """
+        self.model = model
+        self.interface = np.asarray(interface, dtype=np.int64)
+        self.name = name or model.name
+        self.id = self.name
+        self.cache = DEFAULT_CACHE if cache is None else cache
+        self.condensation = None
+
+        node_dof = model.mesh.node_dof[self.interface]
+        if len(np.unique(node_dof)) > 1:
+            raise ValueError("All interface nodes of a substructure must have the same number of DOFs.")
+
+    @property
+    def dof_per_node(self):
+        return int(self.model.mesh.node_dof[self.interface[0]])
+
+    @property
+    def interface_coords(self):
+        return self.model.mesh.coords[self.interface]
+
+    def content_hash(self):
+        """
+        Hash everything the condensation depends on: interface, node and element coordinates
+        relative to the lowest corner of the nodes (so that translated copies share one
+        condensation), element connectivity and properties, constraints and loads.
+
+        :return: Hexadecimal SHA-256 digest.
+        """
+        model = self.model
+        mesh = model.mesh
+        h = hashlib.sha256()
+        origin = mesh.coords.min(axis=0) if mesh.n_nodes else np.zeros(2)
+        scale = np.abs(mesh.coords - origin).max(initial=0) or 1.0
+        h.update(repr(float(scale)).encode())
+        h.update(np.round((mesh.coords - origin) / scale, 10).tobytes())
+        for array in (self.interface, mesh.node_dof, np.array([model.renumber])):
+            h.update(np.ascontiguousarray(array).tobytes())
+        for element_set in mesh.element_sets:
+            h.update(type(element_set).__name__.encode())
+            h.update(np.round((element_set.coords - origin) / scale, 10).tobytes())
+            h.update(np.ascontiguousarray(element_set.connectivity).tobytes())
+            h.update(np.ascontiguousarray(element_set.property_index).tobytes())
+            h.update(''.join(repr(p.key()) for p in element_set.properties).encode())
+        for conditions in (model.constraints, model.loads):
+            h.update(np.array([(c.node, c.dof, c.value) for c in conditions], dtype=float).tobytes())
+            h.update(b'|')
+        return h.hexdigest()
+
+    def condense(self):
+        """
+        Condense the substructure, or take its condensation from the cache.
+
+        :return: Condensation object.
+        """
+        key = self.content_hash()
+        if self.condensation is None or self.condensation.key != key:
+            condensation = self.cache.get(key)
+            if condensation is None:
+                condensation = condense_model(self.model, self.interface, key)
+                self.cache.put(condensation)
+            self.condensation = condensation
+        return self.condensation
+
+    def recover(self, q_b):
+        """
+        Recover the full solution of the substructure from its interface displacements.
+        The forces of the returned Output hold the reactions at the sub-model supports and
+        the interface forces exerted by the parent at the interface DOFs.
+
+        :param q_b: Interface displacements in substructure coordinates, shape (n_b,).
+        :return: Output of the sub-model.
+        """
+        condensation = self.condense()
+        model = self.model
+        model.assign_global_dof()
+        model.assemble_stiffness_matrix()
+        model.assemble_displacements_vector()
+        model.assemble_force_vector()
+
+        q = model.q[:, 0]
+        q[condensation.boundary] = q_b
+        q[condensation.interior] = condensation.q0 + condensation.T @ q_b
+        supports = np.concatenate([condensation.boundary, condensation.constrained])
+        model.F[supports, 0] = (model.K @ q)[supports]
+        model.load_cases = None
+        return Output(model)
+
+    def __repr__(self):
+        return (f"Substructure:\n Name = {self.name}\n Interface nodes = {len(self.interface)}\n"
+                f" DOF per node = {self.dof_per_node}\n")
+
+
+def condense_model(model, interface, key=None):
+    """
+    Assemble a sub-model and condense it onto the DOFs of its interface nodes. This is a
+    module-level function so that process pools can run it.
+
+    :param model: Model of the substructure.
+    :param interface: Indices of the interface nodes.
+    :param key: Content hash stored with the result.
+    :return: Condensation object.
+    """
+    if model.matrix_free:
+        raise ValueError("Substructures need an assembled stiffness matrix.")
+    model.assign_global_dof()
+    model.assemble_stiffness_matrix()
+    model.assemble_displacements_vector()
+    model.assemble_force_vector()
+
+    global_dof = model.mesh.global_dof[interface]
+    boundary = global_dof[global_dof >= 0]
+    dof_free = np.isnan(model.q[:, 0])
+    if not dof_free[boundary].all():
+        raise ValueError("Interface DOFs of a substructure cannot be constrained in the sub-model.")
+    is_interior = dof_free.copy()
+    is_interior[boundary] = False
+    interior = np.flatnonzero(is_interior)
+    constrained = np.flatnonzero(~dof_free)
+    q_c = model.q[constrained, 0]
+
+    K = sp.csr_matrix(model.K)
+    K_i = K[interior]
+    K_b = K[boundary]
+    K_ib = K_i[:, boundary].toarray()
+    F_i = model.F[interior, 0] - K_i[:, constrained] @ q_c
+    F_b = model.F[boundary, 0] - K_b[:, constrained] @ q_c
+
+    if len(interior):
+        solve = model.solver.factorize(K_i[:, interior])
+        T = -np.asarray(solve(K_ib)).reshape(K_ib.shape)
+        q0 = np.asarray(solve(F_i)).reshape(F_i.shape)
+    else:
+        T, q0 = np.zeros(K_ib.shape), np.zeros(0)
+    K_condensed = K_b[:, boundary].toarray() + K_ib.T @ T
+    K_condensed = (K_condensed + K_condensed.T) / 2  # Remove the round-off asymmetry of the solve
+    return Condensation(key, K_condensed, F_b - K_ib.T @ q0, T, q0, boundary, interior, constrained, q_c)
+
+
+def condense_substructures(substructures, workers=1):
+    """
+    Condense substructures, each distinct content once. Those not found in their cache are
+    condensed in parallel on a process pool of up to workers processes.
+
+    :param substructures: List of Substructure objects.
+    :param workers: Maximum number of processes.
+    """
+    pending = {}
+    for substructure in substructures:
+        key = substructure.content_hash()
+        if substructure.condensation is not None and substructure.condensation.key == key:
+            continue
+        if key in pending:
+            substructure.cache.hits += 1  # Shares the condensation of an identical substructure
+            pending[key].append(substructure)
+            continue
+        condensation = substructure.cache.get(key)
+        if condensation is not None:
+            substructure.condensation = condensation
+        else:
+            pending.setdefault(key, []).append(substructure)
+
+    keys = list(pending)
+    models = [pending[key][0].model for key in keys]
+    interfaces = [pending[key][0].interface for key in keys]
+    if workers > 1 and len(keys) > 1:
+        with ProcessPoolExecutor(min(workers, len(keys))) as pool:
+            condensations = list(pool.map(condense_model, models, interfaces, keys))
+    else:
+        condensations = [condense_model(*task) for task in zip(models, interfaces, keys)]
+
+    for key, condensation in zip(keys, condensations):
+        for substructure in pending[key]:
+            substructure.cache.put(condensation)
+            substructure.condensation = condensation
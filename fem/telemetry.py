@@ -0,0 +1,259 @@
+import time
+import tracemalloc
+from contextlib import nullcontext
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import LinearOperator, onenormest
+
+NO_PHASE = nullcontext()  # Shared by all phases of models without observers
+
+
+class SolveObserver:
+    """
+    Base class of the observers notified around each phase of Model.solve and Model.reanalyze.
+    Subclasses override the hooks they need; all of them do nothing by default.
+    """
+
+    def solve_started(self, model):
+        """
+        Called before the first phase of a solve.
+
+        :param model: Model being solved.
+        """
+
+    def phase_started(self, model, phase):
+        """
+        Called before a phase ('assign_global_dof', 'condense', 'assemble_stiffness_matrix',
+        'assemble_displacements_vector', 'assemble_force_vector', 'partition', 'factorize',
+        'solve', 'reactions', 'update_stiffness' in a reanalysis, 'assemble_mass_matrix',
+        'factorize_shifted' and 'eigensolve' in a modal analysis, 'initial_acceleration',
+        'factorize_effective' and 'time_integration' in a transient analysis, or 'load_stepping'
+        in a nonlinear analysis).
+
+        :param model: Model being solved.
+        :param phase: Name of the phase.
+        """
+
+    def phase_finished(self, model, phase):
+        """
+        Called after a phase, with the model holding its results (e.g. model.K after assembly).
+
+        :param model: Model being solved.
+        :param phase: Name of the phase.
+        """
+
+    def solve_finished(self, model):
+        """
+        Called after the last phase of a solve.
+
+        :param model: Solved Model.
+        """
+
+
+class Phase:
+    def __init__(self, model, name):
+        """
+        Initialize a Phase, the context that notifies the observers of a model around one phase.
+
+        :param model: Model being solved.
+        :param name: Name of the phase.
+        """
+        self.model = model
+        self.name = name
+
+    def __enter__(self):
+        for observer in self.model.observers:
+            observer.phase_started(self.model, self.name)
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            for observer in reversed(self.model.observers):
+                observer.phase_finished(self.model, self.name)
+
+
+class PhaseRecord:
+    def __init__(self, name, wall_time, allocated_bytes=None, size=None, nnz=None, condition=None,
+                 residual=None, relative_residual=None):
+        """
+        Initialize a PhaseRecord, the measurements of one solve phase.
+
+        :param name: Name of the phase.
+        :param wall_time: Wall time in seconds.
+        :param allocated_bytes: Peak memory allocated during the phase (None unless traced).
+        :param size: Number of rows of the matrix built or factorized by the phase.
+        :param nnz: Number of stored non-zeros of that matrix (None for matrix-free operators).
+        :param condition: 1-norm condition number estimate of the factorized K_ff.
+        :param residual: Largest residual norm ||K q - F|| over the load cases, after the solve.
+        :param relative_residual: Largest ||K q - F|| / ||F|| over the load cases.
+        """
+        self.name = name
+        self.wall_time = wall_time
+        self.allocated_bytes = allocated_bytes
+        self.size = size
+        self.nnz = nnz
+        self.condition = condition
+        self.residual = residual
+        self.relative_residual = relative_residual
+
+    def to_dict(self):
+        """
+        :return: Dict of the measurements, with None for those not taken.
+        """
+        return dict(vars(self))
+
+    def __repr__(self):
+        fields = ''.join(f" {key.replace('_', ' ').capitalize()} = {value}\n"
+                         for key, value in vars(self).items() if value is not None and key != 'name')
+        return f"PhaseRecord:\n Name = {self.name}\n{fields}"
+
+
+class SolveTelemetry:
+    def __init__(self, model_name):
+        """
+        Initialize a SolveTelemetry, the structured record of one solve.
+
+        :param model_name: Name of the solved model.
+        """
+        self.model_name = model_name
+        self.records = []  # PhaseRecord objects in execution order
+        self.wall_time = None  # Total wall time of the solve in seconds
+
+    def __getitem__(self, phase):
+        """
+        Get the record of a phase by name (the last one if the phase ran several times).
+        """
+        for record in reversed(self.records):
+            if record.name == phase:
+                return record
+        raise KeyError(phase)
+
+    def __contains__(self, phase):
+        return any(record.name == phase for record in self.records)
+
+    def to_dict(self):
+        """
+        :return: JSON-serializable dict of the solve and its phases.
+        """
+        return {'model': self.model_name, 'wall_time': self.wall_time,
+                'phases': [record.to_dict() for record in self.records]}
+
+    def __repr__(self):
+        phases = ''.join(f"  {record.name} = {1000 * record.wall_time:.3f} ms\n" for record in self.records)
+        return f"SolveTelemetry:\n Model = {self.model_name}\n Wall time = {self.wall_time}\n Phases =\n{phases}"
+
+
+class TelemetryRecorder(SolveObserver):
+    def __init__(self, memory=False, condition=True, residual=True, callback=None):
+        """
+        Initialize a TelemetryRecorder, which records a PhaseRecord per solve phase. The record of
+        the last solve is kept in recorder.telemetry and in the Output objects of the solve.
+
+        :param memory: If True, trace the peak allocation of each phase with tracemalloc (started
+                       for the solve if not already running). Tracing slows Python code down.
+        :param condition: If True, estimate the 1-norm condition number of K_ff after a direct
+                          factorization, at the cost of a few extra back-substitutions.
+        :param residual: If True, compute ||K q - F|| after the solve (one product with K).
+        :param callback: Optional function called with (model, record) after every phase, e.g.
+                         to log or export the records as they arrive.
+        """
+        self.memory = memory
+        self.condition = condition
+        self.residual = residual
+        self.callback = callback
+        self.telemetry = None
+        self._stop_tracing = False
+
+    def solve_started(self, model):
+        self.telemetry = SolveTelemetry(model.name)
+        self._solve_start = time.perf_counter()
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._stop_tracing = True
+
+    def phase_started(self, model, phase):
+        if self.memory:
+            tracemalloc.reset_peak()
+            self._memory_start = tracemalloc.get_traced_memory()[0]
+        self._phase_start = time.perf_counter()
+
+    def phase_finished(self, model, phase):
+        record = PhaseRecord(phase, time.perf_counter() - self._phase_start)
+        if self.memory:
+            record.allocated_bytes = tracemalloc.get_traced_memory()[1] - self._memory_start
+        if phase in ('assemble_stiffness_matrix', 'update_stiffness'):
+            record.size, record.nnz = _matrix_size(model.K)
+        elif phase == 'assemble_mass_matrix':
+            record.size, record.nnz = _matrix_size(model.M)
+        elif phase == 'partition':
+            record.size, record.nnz = _matrix_size(model.partition.K_ff)
+        elif phase == 'factorize':
+            record.size, record.nnz = _matrix_size(model.partition.K_ff)
+            if self.condition and not model.solver.iterative:
+                record.condition = condition_estimate(model.partition)
+        elif phase == 'reactions' and self.residual:
+            record.residual, record.relative_residual = residual_norm(model.K, model.q, model.F)
+        if self.telemetry is None or self.telemetry.wall_time is not None:
+            # Phases run outside a solve (e.g. direct calls to assemble_stiffness_matrix) start a new record
+            self.telemetry = SolveTelemetry(model.name)
+        self.telemetry.records.append(record)
+        if self.callback is not None:
+            self.callback(model, record)
+
+    def solve_finished(self, model):
+        self.telemetry.wall_time = time.perf_counter() - self._solve_start
+        if self._stop_tracing:
+            tracemalloc.stop()
+            self._stop_tracing = False
+
+    def __repr__(self):
+        return (f"TelemetryRecorder:\n Memory = {self.memory}\n Condition = {self.condition}\n"
+                f" Residual = {self.residual}\n")
+
+
+def _matrix_size(K):
+    """
+    :return: Tuple (rows, stored non-zeros) of a dense array, sparse matrix or linear operator.
+    """
+    if sp.issparse(K):
+        return K.shape[0], int(K.nnz)
+    if isinstance(K, np.ndarray):
+        return K.shape[0], int(np.count_nonzero(K))
+    return K.shape[0], None
+
+
+def condition_estimate(partition):
+    """
+    Estimate the 1-norm condition number ||K_ff||_1 ||K_ff^-1||_1 of a partitioned system,
+    reusing its factorization (Higham's block estimator on K_ff^-1, which is symmetric).
+
+    :param partition: Factorized PartitionedSystem.
+    :return: Condition number estimate, or None for matrix-free operators.
+    """
+    K_ff = partition.K_ff
+    n = K_ff.shape[0]
+    if n == 0 or not (sp.issparse(K_ff) or isinstance(K_ff, np.ndarray)):
+        return None
+    solve = partition.factorize(partition.solver)
+    norm = abs(K_ff).sum(axis=0).max()
+    inverse = LinearOperator((n, n), matvec=solve, rmatvec=solve, matmat=solve, dtype=float)
+    if n <= 4:  # onenormest needs more columns than its block size
+        inverse_norm = np.abs(solve(np.eye(n))).sum(axis=0).max()
+    else:
+        inverse_norm = onenormest(inverse)
+    return float(norm * inverse_norm)
+
+
+def residual_norm(K, q, F):
+    """
+    Compute the residual of the full system after a solve, F holding the reactions at the
+    constrained DOFs.
+
+    :param K: Global stiffness matrix or operator.
+    :param q: Global displacement vectors, shape (n, m).
+    :param F: Global force vectors, shape (n, m).
+    :return: Tuple (largest ||K q - F||, largest ||K q - F|| / ||F||) over the m columns.
+    """
+    r = np.linalg.norm(K @ q - F, axis=0)
+    scale = np.linalg.norm(F, axis=0)
+    relative = np.divide(r, scale, out=np.zeros_like(r), where=scale > 0)
+    return float(r.max(initial=0)), float(relative.max(initial=0))
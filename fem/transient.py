@@ -0,0 +1,284 @@
+import os
+import tempfile
+import weakref
+import numpy as np
+import scipy.sparse as sp
+
+FIELDS = ('displacement', 'velocity', 'acceleration')
+
+
+class LoadHistory:
+    def __init__(self, constant, matrix, functions):
+        """
+        Initialize a LoadHistory, the reduced force vector of a transient analysis as a function
+        of time: F(t) = constant + matrix @ [f_1(t), ..., f_g(t)].
+
+        :param constant: Time-independent part of the force on the free DOFs, shape (n,).
+        :param matrix: Sparse matrix with one column of load magnitudes per time function, shape (n, g).
+        :param functions: List of g time functions, each called with an array of times.
+        """
+        self.constant = constant
+        self.matrix = sp.csc_matrix(matrix)
+        self.functions = functions
+
+    def factors(self, times):
+        """
+        Evaluate all time functions at once.
+
+        :param times: Array of times, shape (m,).
+        :return: Array of load factors, shape (m, g).
+        """
+        times = np.asarray(times, dtype=float)
+        factors = np.empty((len(times), len(self.functions)))
+        for j, function in enumerate(self.functions):
+            factors[:, j] = np.broadcast_to(np.asarray(function(times), dtype=float), times.shape)
+        return factors
+
+    def force(self, factors):
+        """
+        :param factors: Load factors at one time, shape (g,).
+        :return: Force on the free DOFs, shape (n,).
+        """
+        if not self.functions:
+            return self.constant
+        return self.constant + self.matrix @ factors
+
+    def __repr__(self):
+        return f"LoadHistory:\n DOFs = {len(self.constant)}\n Time functions = {len(self.functions)}\n"
+
+
+class HistoryWriter:
+    def __init__(self, n_rows, template, path=None, rows_per_chunk=1, temporary=False):
+        """
+        Initialize a HistoryWriter, which stores one global vector per output step. In memory
+        the whole history is preallocated; on disk it is written as a .npy file in chunks of
+        rows_per_chunk rows, so the memory used does not depend on the number of steps.
+
+        :param n_rows: Number of output steps.
+        :param template: Global vector whose values fill the DOFs that are not written (e.g. the
+                         prescribed displacements of the constrained DOFs), shape (n_dof,).
+        :param path: Path of the .npy file, or None to keep the history in memory.
+        :param rows_per_chunk: Number of rows buffered between two writes to disk.
+        :param temporary: If True, the file is removed once the memory map returned by close()
+                          (and every view of it) is released.
+        """
+        self.n_rows = n_rows
+        self.path = path
+        self.temporary = temporary
+        self.rows_written = 0
+        self._row = 0  # Next row of the buffer
+        if path is None:
+            self._file = None
+            self._buffer = np.tile(template, (n_rows, 1))
+        else:
+            self._file = open(path, 'wb')
+            np.lib.format.write_array_header_1_0(self._file, {'descr': np.lib.format.dtype_to_descr(np.dtype(float)),
+                                                              'fortran_order': False, 'shape': (n_rows, len(template))})
+            self._buffer = np.tile(template, (min(rows_per_chunk, n_rows), 1))
+
+    def append(self, values, index):
+        """
+        Store the next output step.
+
+        :param values: Values of the written DOFs.
+        :param index: Global indices of the written DOFs.
+        """
+        self._buffer[self._row, index] = values
+        self._row += 1
+        if self._file is None:
+            self.rows_written = self._row
+        elif self._row == len(self._buffer):
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered rows to disk.
+        """
+        if self._file is not None and self._row:
+            self._file.write(self._buffer[:self._row].tobytes())
+            self.rows_written += self._row
+            self._row = 0
+
+    def close(self):
+        """
+        Flush and close the file.
+
+        :return: The history, shape (n_rows, n_dof): the in-memory array, or the file opened
+                 as a read-only memory map.
+        """
+        if self._file is None:
+            return self._buffer
+        self.flush()
+        self._file.close()
+        self._buffer = None
+        history = np.load(self.path, mmap_mode='r')
+        if self.temporary:
+            weakref.finalize(history, _remove, self.path)
+        return history
+
+    def __repr__(self):
+        return f"HistoryWriter:\n Path = {self.path}\n Rows = {self.rows_written}/{self.n_rows}\n"
+
+
+class TransientOutput:
+    def __init__(self, model, times, histories, alpha, beta, gamma):
+        """
+        Initialize a TransientOutput, the recorded time history of a transient analysis.
+
+        :param model: Model object the history belongs to.
+        :param times: Time of each output step, shape (n_out,).
+        :param histories: Dict mapping the recorded fields ('displacement', 'velocity',
+                          'acceleration') to arrays of global vectors, shape (n_out, n_dof).
+                          Histories written to disk are read-only memory maps.
+        :param alpha: HHT-alpha parameter of the integration.
+        :param beta: Newmark beta parameter.
+        :param gamma: Newmark gamma parameter.
+        """
+        self.mesh = model.mesh
+        self.times = times
+        self.displacements = histories.get('displacement')
+        self.velocities = histories.get('velocity')
+        self.accelerations = histories.get('acceleration')
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+
+    def nodal_history(self, node, dof, field='displacement'):
+        """
+        Read the history of one nodal DOF.
+
+        :param node: Node index.
+        :param dof: Local DOF of the node.
+        :param field: 'displacement', 'velocity' or 'acceleration'.
+        :return: Array with one value per output step.
+        """
+        history = {'displacement': self.displacements, 'velocity': self.velocities,
+                   'acceleration': self.accelerations}[field]
+        if history is None:
+            raise ValueError(f"The {field} history was not recorded.")
+        global_dof = self.mesh.global_dof[node, dof]
+        if global_dof < 0:
+            raise ValueError(f"Node {node} has no DOF {dof}.")
+        return np.array(history[:, global_dof])
+
+    def __len__(self):
+        return len(self.times)
+
+    def __repr__(self):
+        fields = [field for field, history in zip(FIELDS, (self.displacements, self.velocities, self.accelerations))
+                  if history is not None]
+        return (f"TransientOutput:\n Steps = {len(self)}\n End time = {self.times[-1]}\n"
+                f" Alpha = {self.alpha}\n Beta = {self.beta}\n Gamma = {self.gamma}\n Fields = {fields}\n")
+
+
+def newmark_parameters(alpha=0.0, beta=None, gamma=None):
+    """
+    Check the parameters of the HHT-alpha method, defaulting beta and gamma to the values
+    that keep it unconditionally stable and second order accurate. alpha = 0 is the
+    trapezoidal rule (Newmark average acceleration); negative alpha damps the high modes.
+
+    :param alpha: HHT-alpha parameter, -1/3 <= alpha <= 0.
+    :param beta: Newmark beta (default is (1 - alpha)^2 / 4).
+    :param gamma: Newmark gamma (default is 1/2 - alpha).
+    :return: Tuple (alpha, beta, gamma).
+    """
+    if not -1 / 3 <= alpha <= 0:
+        raise ValueError(f"HHT alpha must lie in [-1/3, 0], got {alpha}.")
+    beta = (1 - alpha) ** 2 / 4 if beta is None else beta
+    gamma = 0.5 - alpha if gamma is None else gamma
+    if beta <= 0:
+        raise ValueError(f"Newmark beta must be positive for an implicit integration, got {beta}.")
+    return alpha, beta, gamma
+
+
+def effective_coefficients(dt, alpha, beta, gamma, mass_damping=0.0, stiffness_damping=0.0):
+    """
+    Coefficients of the effective stiffness of a HHT-alpha step with Rayleigh damping
+    C = mass_damping M + stiffness_damping K: K_eff = m M + k K.
+
+    :return: Tuple (m, k).
+    """
+    c0 = 1 / (beta * dt ** 2)
+    c1 = gamma / (beta * dt)
+    return c0 + (1 + alpha) * c1 * mass_damping, (1 + alpha) * (1 + c1 * stiffness_damping)
+
+
+def newmark_steps(solve, M, K, loads, u, v, a, dt, n_steps, alpha=0.0, beta=0.25, gamma=0.5,
+                  mass_damping=0.0, stiffness_damping=0.0, iterative=False, block=1024):
+    """
+    Integrate M a + C v + K u = F(t) with the HHT-alpha method (Newmark for alpha = 0):
+
+        M a_n+1 + (1 + alpha) (C v_n+1 + K u_n+1) - alpha (C v_n + K u_n) = (1 + alpha) F_n+1 - alpha F_n
+
+    Every step solves with the same effective stiffness, factorized once by the caller, and
+    costs one back-substitution and two matrix-vector products with M and K.
+
+    :param solve: Function solving K_eff x = b (see effective_coefficients).
+    :param M: Reduced mass matrix.
+    :param K: Reduced stiffness matrix or operator.
+    :param loads: LoadHistory of the reduced force vector.
+    :param u: Initial displacements, shape (n,).
+    :param v: Initial velocities, shape (n,).
+    :param a: Initial accelerations, shape (n,).
+    :param dt: Time step.
+    :param n_steps: Number of steps.
+    :param alpha: HHT-alpha parameter.
+    :param beta: Newmark beta.
+    :param gamma: Newmark gamma.
+    :param mass_damping: Mass-proportional Rayleigh damping coefficient.
+    :param stiffness_damping: Stiffness-proportional Rayleigh damping coefficient.
+    :param iterative: If True, solve takes the predicted displacements as initial guess.
+    :param block: Number of steps whose load factors are evaluated together.
+    :return: Generator of (step, u, v, a) after each step.
+    """
+    c0 = 1 / (beta * dt ** 2)
+    c1 = gamma / (beta * dt)
+    a1 = 1 + alpha
+    F_previous = loads.force(loads.factors([0.0])[0])
+    for start in range(1, n_steps + 1, block):
+        steps = np.arange(start, min(start + block, n_steps + 1))
+        factors = loads.factors(steps * dt)
+        for step, factor in zip(steps, factors):
+            F = loads.force(factor)
+            u_predicted = u + dt * v + (0.5 - beta) * dt ** 2 * a
+            v_predicted = v + (1 - gamma) * dt * a
+            w = v_predicted - c1 * u_predicted
+
+            # Known terms of the step, grouped by the matrix they multiply
+            rhs = a1 * F - alpha * F_previous + M @ (c0 * u_predicted - a1 * mass_damping * w + alpha * mass_damping * v)
+            if alpha or stiffness_damping:
+                rhs = rhs + K @ (alpha * u + stiffness_damping * (alpha * v - a1 * w))
+
+            u = solve(rhs, u_predicted) if iterative else solve(rhs)
+            a = c0 * (u - u_predicted)
+            v = v_predicted + gamma * dt * a
+            F_previous = F
+            yield int(step), u, v, a
+
+
+def history_paths(path, fields, in_memory=False):
+    """
+    Create the output directory of a streamed history.
+
+    :param path: Directory, or None for a temporary directory.
+    :param fields: Recorded fields.
+    :param in_memory: If True, the history is kept in memory and no directory is created.
+    :return: Dict mapping each field to its .npy path (or None).
+    """
+    if in_memory:
+        return {field: None for field in fields}
+    if path is None:
+        path = tempfile.mkdtemp(prefix='fem_history_')
+    os.makedirs(path, exist_ok=True)
+    return {field: os.path.join(path, f"{field}.npy") for field in fields}
+
+
+def _remove(path):
+    """
+    Remove a temporary history file, and its directory once empty.
+    """
+    try:
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+    except OSError:
+        pass
@@ -1,9 +1,12 @@
+import sys
 import numpy as np
 from fem.node import Node
-from fem.element import Element
+from fem.element import ElementRod
+from fem.element_set import ElementRodSet, ElementCSTSet
 from fem.material import Material
-from fem.property import Rod
+from fem.property import Rod, Membrane
 from fem.boundary_condition import NodalConstraint, NodalLoad
+from fem.mesh_io import read_gmsh, read_csv, load_mesh
 from fem.model import Model
 
 def get_input(prompt, type_=str, default=None, valid_values=None):
@@ -26,7 +29,7 @@ def get_nodes():
     for i in range(num_nodes):
         x = get_input(f"Enter x position for node {i} (e.g., 100.0): ", float)
         y = get_input(f"Enter y position for node {i} (e.g., 200.0): ", float)
-        nodes.append(Node(i, [x, y]))
+        nodes.append(Node([x, y]))
     return nodes
 
 def get_materials():
@@ -35,7 +38,8 @@ def get_materials():
     for i in range(num_materials):
         name = get_input("Enter material name (e.g., Steel): ", str)
         youngs_modulus = get_input("Enter Young's modulus (e.g., 200000): ", float)
-        materials.append(Material(i, name, youngs_modulus))
+        poissons_ratio = get_input("Enter Poisson's ratio (e.g., 0.3): ", float, default=0.3)
+        materials.append(Material(name, youngs_modulus, poissons_ratio))
     return materials
 
 def get_properties(materials):
@@ -43,30 +47,23 @@ def get_properties(materials):
     properties = []
     for i in range(num_properties):
         name = get_input("Enter property name (e.g., MyRod): ", str)
-        material_id = get_input("Enter material ID for this property: ", int)
+        material_id = get_input("Enter material number for this property: ", int,
+                                valid_values=range(len(materials)))
         area = get_input("Enter cross-sectional area (e.g., 10.0): ", float)
-        # Find the material with the given ID
-        material = next((m for m in materials if m.material_id == material_id), None)
-        if material is None:
-            print(f"No material found with ID {material_id}.")
-            continue
-        properties.append(Rod(i, name, material, area))
+        properties.append(Rod(name, materials[material_id], area))
     return properties
 
 def get_elements(nodes, properties):
     num_elements = get_input("Enter the number of elements: ", int)
     elements = []
     for i in range(num_elements):
-        node_ids = list(map(int, get_input(f"Enter node IDs for element {i} (space-separated): ").split()))
-        if len(node_ids) < 2:
-            print("An element must connect at least two nodes.")
-            continue
-        property_id = get_input("Enter property ID for this element: ", int)
-        property = next((p for p in properties if p.property_id == property_id), None)
-        if property is None:
-            print(f"No property found with ID {property_id}.")
+        node_ids = list(map(int, get_input(f"Enter the 2 node IDs of element {i} (space-separated): ").split()))
+        if len(node_ids) != 2 or not all(0 <= id_ < len(nodes) for id_ in node_ids):
+            print("A rod element must connect two existing nodes.")
             continue
-        elements.append(Element(i, [nodes[id_] for id_ in node_ids], property=property))
+        property_id = get_input("Enter property number for this element: ", int,
+                                valid_values=range(len(properties)))
+        elements.append(ElementRod([nodes[id_] for id_ in node_ids], properties[property_id]))
     return elements
 
 def get_constraints():
@@ -89,14 +86,41 @@ def get_loads():
         loads.append(NodalLoad(node_id, dof, value))
     return loads
 
+def get_mesh(path, materials):
+    """
+    Load the nodes and elements from a Gmsh (.msh), CSV (nodes and elements tables) or native
+    (.npz file or .npy directory) mesh. Triangles are loaded as CST elements and lines as rods.
+    """
+    material = materials[0]
+    if path.endswith('.msh') or path.endswith('.csv'):
+        area = get_input("Enter cross-sectional area of the line elements (e.g., 10.0): ", float, default=1.0)
+        thickness = get_input("Enter thickness of the triangles (e.g., 1.0): ", float, default=1.0)
+        rod, membrane = Rod('MyRod', material, area), Membrane('MyMembrane', material, thickness)
+        if path.endswith('.msh'):
+            return read_gmsh(path, line_property=rod, triangle_property=membrane), [rod, membrane]
+        elements_path = get_input("Enter the path of the element table: ")
+        kind = get_input("Enter the element type (rod or cst): ", str, valid_values=('rod', 'cst'))
+        if kind == 'rod':
+            return read_csv(path, elements_path, rod, ElementRodSet), [rod]
+        return read_csv(path, elements_path, membrane, ElementCSTSet), [membrane]
+    thickness = get_input("Enter thickness of the elements (e.g., 1.0): ", float, default=1.0)
+    properties = [Membrane('MyMembrane', material, thickness)]
+    return load_mesh(path, properties), properties
+
 def main():
     print("Welcome to the FEM Model Setup.\n")
-    
-    # Get input from user
-    nodes = get_nodes()
-    materials = get_materials()
-    properties = get_properties(materials)
-    elements = get_elements(nodes, properties)
+
+    # Get input from user, reading the mesh from a file when one is given
+    if len(sys.argv) > 1:
+        materials = get_materials()
+        mesh, properties = get_mesh(sys.argv[1], materials)
+        nodes, elements = None, None
+    else:
+        mesh = None
+        nodes = get_nodes()
+        materials = get_materials()
+        properties = get_properties(materials)
+        elements = get_elements(nodes, properties)
     constraints = get_constraints()
     loads = get_loads()
 
@@ -107,20 +131,20 @@ def main():
         properties=properties,
         elements=elements,
         loads=loads,
-        constraints=constraints
+        constraints=constraints,
+        mesh=mesh
     )
-
-    model.assign_global_dof()
-    model.assemble_stiffness_matrix()
-    model.assemble_displacements_vector()
-    model.assemble_force_vector()
-    model.solve()
-    model.calculate_displacements()
-    model.calculate_forces()
+    output = model.solve()
+    output.compute_nodal_results()
+    output.compute_element_results()
 
     # Print results
-    model.generate_report()
-    model.plot(factor=1)
+    for node in model.nodes:
+        print(f"Node {node.id}: displacement = {node.displacement.tolist()}")
+    if mesh is None:
+        output.plot2DBars(factor=1, contour='Force', text='Force', show_constraints=True, show_force=True)
+    else:
+        output.plot2DArea(factor=1, show_constraints=True, show_force=True)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,68 @@
+from functools import lru_cache
+import numpy as np
+
+# Symmetric quadrature rules on the reference triangle (0, 0), (1, 0), (0, 1) by polynomial degree:
+# lists of (area coordinates of one orbit, weight of each point of the orbit). Weights sum to 1 and
+# are scaled by the reference area 1/2 in gauss_triangle. From Strang & Fix and Dunavant (1985).
+TRIANGLE_RULES = {
+    1: [((1 / 3, 1 / 3, 1 / 3), 1.0)],
+    2: [((2 / 3, 1 / 6, 1 / 6), 1 / 3)],
+    4: [((0.108103018168070, 0.445948490915965, 0.445948490915965), 0.223381589678011),
+        ((0.816847572980459, 0.091576213509771, 0.091576213509771), 0.109951743655322)],
+    5: [((1 / 3, 1 / 3, 1 / 3), 0.225),
+        ((0.059715871789770, 0.470142064105115, 0.470142064105115), 0.132394152788506),
+        ((0.797426985353087, 0.101286507323456, 0.101286507323456), 0.125939180544827)],
+}
+
+
+@lru_cache(maxsize=None)
+def gauss_legendre(n):
+    """
+    Gauss-Legendre quadrature on [-1, 1], exact for polynomials of degree 2 n - 1.
+
+    :param n: Number of points.
+    :return: Tuple (points, weights) of read-only arrays with shape (n,).
+    """
+    points, weights = np.polynomial.legendre.leggauss(n)
+    return _read_only(points), _read_only(weights)
+
+
+@lru_cache(maxsize=None)
+def gauss_quadrilateral(n):
+    """
+    Tensor-product Gauss-Legendre quadrature on the reference square [-1, 1] x [-1, 1].
+
+    :param n: Number of points along each direction.
+    :return: Tuple (points, weights) of read-only arrays with shapes (n * n, 2) and (n * n,).
+    """
+    x, w = gauss_legendre(n)
+    xi, eta = np.meshgrid(x, x, indexing='ij')
+    return _read_only(np.column_stack([xi.ravel(), eta.ravel()])), _read_only(np.outer(w, w).ravel())
+
+
+@lru_cache(maxsize=None)
+def gauss_triangle(degree):
+    """
+    Symmetric quadrature on the reference triangle (0, 0), (1, 0), (0, 1), exact for
+    polynomials up to a degree. The smallest tabulated rule of at least that degree is used.
+
+    :param degree: Polynomial degree to integrate exactly (1 to 5).
+    :return: Tuple (points, weights) of read-only arrays with shapes (n, 2) and (n,).
+    """
+    available = [d for d in sorted(TRIANGLE_RULES) if d >= degree]
+    if not available:
+        raise ValueError(f"No triangle rule of degree {degree}; the highest is {max(TRIANGLE_RULES)}.")
+    points, weights = [], []
+    for (a, b, c), weight in TRIANGLE_RULES[available[0]]:
+        # All distinct permutations of the area coordinates; (x, y) are the last two
+        orbit = {(a, b, c), (b, c, a), (c, a, b), (a, c, b), (c, b, a), (b, a, c)}
+        for area_coords in sorted(orbit):
+            points.append(area_coords[1:])
+            weights.append(weight / 2)
+    return _read_only(np.array(points)), _read_only(np.array(weights))
+
+
+def _read_only(array):
+    # Cached tables are shared by all callers
+    array.setflags(write=False)
+    return array